@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+异步传输基准测试
+对比旧的 run_in_executor 路径与原生异步客户端在大量并发节点摘要下的表现
+
+用法: python benchmarks/bench_async_transport.py [--requests 500] [--latency 0.2]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pageindex_adapters"))
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+os.environ.setdefault("ZHIPUAI_API_KEY", "benchmark.key")
+
+from pageindex import utils_gemini_rest, utils_zhipuai
+from pageindex.http_client import configure_http_client, close_http_client
+from mock_llm_server import MockLLMServer
+
+
+async def executor_path(total):
+    """旧实现：每个请求在默认线程池中执行同步调用"""
+    loop = asyncio.get_running_loop()
+    tasks = [
+        loop.run_in_executor(None, utils_gemini_rest.call_gemini_rest, "gemini-2.5-flash", f"node {i}")
+        for i in range(total)
+    ]
+    await asyncio.gather(*tasks)
+
+
+async def gemini_native_path(total):
+    tasks = [utils_gemini_rest.ChatGPT_API_async("gpt-4o", f"node {i}") for i in range(total)]
+    await asyncio.gather(*tasks)
+
+
+async def zhipuai_native_path(total):
+    tasks = [utils_zhipuai.ChatGPT_API_async("gpt-4o", f"node {i}") for i in range(total)]
+    await asyncio.gather(*tasks)
+
+
+def run_case(name, coro_fn, total):
+    start = time.perf_counter()
+    asyncio.run(coro_fn(total))
+    elapsed = time.perf_counter() - start
+    return name, elapsed, total / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark executor vs native async LLM transport")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.2,
+                        help="Simulated server latency in seconds")
+    args = parser.parse_args()
+
+    server = MockLLMServer(latency=args.latency).start()
+    utils_gemini_rest.GEMINI_API_BASE = f"{server.base_url}/v1/models"
+    utils_zhipuai.ZHIPUAI_API_BASE = server.base_url
+    # 连接池与并发数一致，让两种路径都不受连接数限制
+    configure_http_client(pool_size=args.requests)
+
+    try:
+        results = [
+            run_case("Gemini run_in_executor", executor_path, args.requests),
+            run_case("Gemini native async", gemini_native_path, args.requests),
+            run_case("GLM native async", zhipuai_native_path, args.requests),
+        ]
+    finally:
+        close_http_client()
+        server.stop()
+
+    print(f"\n{args.requests} 个并发请求, 服务器延迟 {args.latency * 1000:.0f} ms, "
+          f"默认线程池 {min(32, (os.cpu_count() or 1) + 4)} 线程")
+    print(f"{'模式':<28}{'耗时 s':>10}{'req/s':>10}")
+    for name, elapsed, rps in results:
+        print(f"{name:<28}{elapsed:>10.2f}{rps:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
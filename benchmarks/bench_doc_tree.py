@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+文档树节点查询基准测试
+构造一棵与 3GPP 规范三级书签规模相近的树（默认 18 × 10 × 8 个节点，每个节点附带页面文本），
+对每个 node_id 调用一次 is_leaf_node，比较旧实现（每次递归搜索整棵树）与缓存的 DocTree
+（每次查询沿祖先链逐级检查 holder[i] is node，确认节点仍在树中）的耗时，两者结果必须一致；
+并检查 DocTree.to_structure() 经 JSON 往返后与原树相同。
+
+用法: python benchmarks/bench_doc_tree.py [一级节点数] [二级节点数] [三级节点数]
+"""
+
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "pageindex_adapters"))
+
+from pageindex.doc_tree import DocTree, find_node_by_id
+
+
+def build_structure(widths, text_size=2000):
+    counter = iter(range(10 ** 6))
+
+    def build(level):
+        nodes = []
+        for i in range(widths[level]):
+            node_id = next(counter)
+            node = {
+                "title": f"{level + 1}.{i + 1} Clause",
+                "node_id": str(node_id).zfill(4),
+                "start_index": node_id,
+                "end_index": node_id + 1,
+                "text": "x" * text_size,
+            }
+            if level + 1 < len(widths):
+                node["nodes"] = build(level + 1)
+            nodes.append(node)
+        return nodes
+
+    return build(0)
+
+
+def legacy_is_leaf_node(data, node_id):
+    """旧实现：递归搜索整棵树"""
+    def find_node(data, node_id):
+        if isinstance(data, dict):
+            if data.get('node_id') == node_id:
+                return data
+            for key in data.keys():
+                if 'nodes' in key:
+                    result = find_node(data[key], node_id)
+                    if result:
+                        return result
+        elif isinstance(data, list):
+            for item in data:
+                result = find_node(item, node_id)
+                if result:
+                    return result
+        return None
+
+    node = find_node(data, node_id)
+    return bool(node and not node.get('nodes'))
+
+
+def indexed_is_leaf_node(data, node_id):
+    node = find_node_by_id(data, node_id)
+    return bool(node and not node.get('nodes'))
+
+
+def main():
+    widths = [int(arg) for arg in sys.argv[1:4]] or [18, 10, 8]
+    structure = build_structure(widths)
+    tree = DocTree(structure)
+    node_ids = [node.node_id for node in tree]
+    print(f"树: {len(tree)} 个节点, {len(tree.leaves())} 个叶子")
+
+    results = {}
+    for name, fn in [("legacy recursive search", legacy_is_leaf_node), ("cached DocTree", indexed_is_leaf_node)]:
+        start = time.perf_counter()
+        results[name] = [fn(structure, node_id) for node_id in node_ids]
+        print(f"{name:<26}{time.perf_counter() - start:>10.3f} s")
+    assert len(set(map(tuple, results.values()))) == 1
+
+    start = time.perf_counter()
+    copied = json.loads(json.dumps(DocTree(structure).to_structure()))
+    print(f"{'DocTree JSON round trip':<26}{time.perf_counter() - start:>10.3f} s")
+    assert copied == structure
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Gemini REST 连接池基准测试
+对比每次新建连接（requests.post）与共享 keep-alive 客户端的吞吐量和延迟
+
+用法: python benchmarks/bench_http_pool.py [--requests 500] [--concurrency 16] [--latency 0.01]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pageindex_adapters"))
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+
+from pageindex import utils_gemini_rest
+from pageindex.http_client import configure_http_client, close_http_client
+from mock_llm_server import MockLLMServer
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def run_case(name, total, concurrency, client=None):
+    """并发发送 total 个请求，返回 (名称, 请求/秒, p50 毫秒, p99 毫秒)"""
+    def one_call(_):
+        start = time.perf_counter()
+        utils_gemini_rest.call_gemini_rest("gemini-2.5-flash", "ping", client=client)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(one_call, range(total)))
+    elapsed = time.perf_counter() - start
+
+    return (
+        name,
+        total / elapsed,
+        percentile(latencies, 50) * 1000,
+        percentile(latencies, 99) * 1000,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pooled vs unpooled Gemini REST calls")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.01,
+                        help="Simulated server latency in seconds")
+    args = parser.parse_args()
+
+    server = MockLLMServer(latency=args.latency).start()
+    utils_gemini_rest.GEMINI_API_BASE = f"{server.base_url}/v1/models"
+    configure_http_client(pool_size=args.concurrency)
+
+    try:
+        results = [
+            run_case("unpooled (requests.post)", args.requests, args.concurrency, client=requests),
+            run_case("pooled (shared client)", args.requests, args.concurrency),
+        ]
+    finally:
+        close_http_client()
+        server.stop()
+
+    print(f"\n{args.requests} 请求, 并发 {args.concurrency}, 服务器延迟 {args.latency * 1000:.0f} ms")
+    print(f"{'模式':<28}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, rps, p50, p99 in results:
+        print(f"{name:<28}{rps:>10.1f}{p50:>10.2f}{p99:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
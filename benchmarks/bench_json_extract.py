@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+LLM 响应 JSON 提取基准测试与模糊测试
+语料 benchmarks/llm_json_corpus.jsonl 中的响应是按 PageIndex 各提示词（toc_detector_single_page、
+toc_transformer、generate_toc_init 等）的输出格式，以及 Gemini / GLM 实际出现过的问题
+（```json 围栏、前后说明文字、Python 的 None、尾随逗号、字符串内换行、单引号、输出被截断）重建的，
+并非直接录制的 API 响应。每条记录带有期望解析结果 expected。
+
+在语料之外，再以固定随机种子对每个期望结果生成变体（缩进/围栏/说明文字、尾随逗号、Python repr、
+字符串内原始换行、随机截断），比较旧 extract_json 与新实现：
+- 完全正确：解析结果与 expected 相同（截断变体只要求得到同类型的非空结果）
+- 旧实现返回 {} 或错误结果而新实现正确的条数，即可省去的重新调用次数
+最后比较两者解析一份大目录（1500 个条目）的耗时。
+
+用法: python benchmarks/bench_json_extract.py [每条语料的变体数]
+"""
+
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "pageindex_adapters"))
+
+from pageindex.json_extract import JsonExtractionError, extract_json
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_json_corpus.jsonl")
+PROSE = ["Here is the JSON you requested:\n", "根据提供的文本，结果如下：\n", "Sure.\n\n"]
+SUFFIX = ["\n\nLet me know if you need anything else.", "\n希望对你有帮助。", ""]
+
+
+def legacy_extract_json(content):
+    """旧实现（utils_*.py 中原来的 extract_json）"""
+    try:
+        start_idx = content.find("```json")
+        if start_idx != -1:
+            start_idx += 7
+            end_idx = content.rfind("```")
+            json_content = content[start_idx:end_idx].strip()
+        else:
+            json_content = content.strip()
+
+        json_content = json_content.replace('None', 'null')
+        json_content = json_content.replace('\n', ' ').replace('\r', ' ')
+        json_content = ' '.join(json_content.split())
+
+        return json.loads(json_content)
+    except json.JSONDecodeError:
+        try:
+            json_content = json_content.replace(',]', ']').replace(',}', '}')
+            return json.loads(json_content)
+        except:
+            return {}
+    except Exception:
+        return {}
+
+
+def add_newline(value, rng):
+    """在一个随机字符串值中插入换行"""
+    if isinstance(value, dict):
+        keys = [key for key, item in value.items() if isinstance(item, (str, dict, list))]
+        if keys:
+            key = rng.choice(keys)
+            value = dict(value, **{key: add_newline(value[key], rng)})
+    elif isinstance(value, list) and value:
+        index = rng.randrange(len(value))
+        value = value[:index] + [add_newline(value[index], rng)] + value[index + 1:]
+    elif isinstance(value, str):
+        cut = rng.randrange(len(value) + 1)
+        value = value[:cut] + "\n" + value[cut:]
+    return value
+
+
+def mutate(expected, kind, rng):
+    """返回 (响应文本, 期望结果)"""
+    if kind == "pretty":
+        text = json.dumps(expected, indent=rng.choice([None, 2, 4]), ensure_ascii=rng.random() < 0.5)
+        if rng.random() < 0.5:
+            text = f"```json\n{text}\n```"
+        return rng.choice(PROSE) + text + rng.choice(SUFFIX), expected
+    if kind == "trailing comma":
+        text = json.dumps(expected, indent=2, ensure_ascii=False)
+        text = text.replace("\n}", ",\n}", 1) if rng.random() < 0.5 else text.replace("\n  ]", ",\n  ]")
+        return f"```json\n{text}\n```", expected
+    if kind == "python repr":
+        return repr(expected), expected
+    if kind == "raw newline":
+        expected = add_newline(expected, rng)
+        text = json.dumps(expected, indent=2, ensure_ascii=False).replace("\\n", "\n")
+        return rng.choice(["", "```json\n"]) + text, expected
+    text = "```json\n" + json.dumps(expected, indent=2, ensure_ascii=False)
+    return text[:rng.randrange(10, len(text))], expected
+
+
+def is_correct(result, expected, kind):
+    if isinstance(result, JsonExtractionError):
+        return False
+    if kind == "truncated":
+        return type(result) is type(expected) and bool(result)
+    return result == expected
+
+
+def main():
+    variants = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    logging.disable(logging.CRITICAL)
+    with open(CORPUS, encoding="utf-8") as f:
+        corpus = [json.loads(line) for line in f]
+
+    print(f"语料: {len(corpus)} 条响应")
+    seed_legacy = sum(legacy_extract_json(item["response"]) == item["expected"] for item in corpus)
+    seed_new = sum(extract_json(item["response"]) == item["expected"] for item in corpus)
+    print(f"  旧实现正确 {seed_legacy}/{len(corpus)}, 新实现正确 {seed_new}/{len(corpus)}")
+
+    rng = random.Random(0)
+    kinds = ("pretty", "trailing comma", "python repr", "raw newline", "truncated")
+    cases = []
+    for item in corpus:
+        for _ in range(variants):
+            kind = rng.choice(kinds)
+            cases.append((kind,) + mutate(item["expected"], kind, rng))
+
+    print(f"\n模糊测试: {len(cases)} 个变体")
+    print(f"{'变体':<16}{'条数':>6}{'旧实现正确':>12}{'新实现正确':>12}{'省去重调用':>12}")
+    totals = [0, 0, 0, 0]
+    for kind in kinds:
+        subset = [(text, expected) for case_kind, text, expected in cases if case_kind == kind]
+        legacy_ok = [is_correct(legacy_extract_json(text), expected, kind) for text, expected in subset]
+        new_ok = [is_correct(extract_json(text), expected, kind) for text, expected in subset]
+        saved = sum(new and not old for old, new in zip(legacy_ok, new_ok))
+        row = [len(subset), sum(legacy_ok), sum(new_ok), saved]
+        totals = [total + value for total, value in zip(totals, row)]
+        print(f"{kind:<16}" + "".join(f"{value:>12}" if i else f"{value:>6}" for i, value in enumerate(row)))
+    print(f"{'合计':<16}" + "".join(f"{value:>12}" if i else f"{value:>6}" for i, value in enumerate(totals)))
+
+    toc = [{"structure": f"{i // 100}.{i % 100}", "title": f"Clause {i} procedure", "page": i // 3 + 1}
+           for i in range(1500)]
+    large = "```json\n" + json.dumps({"table_of_contents": toc}, indent=2) + "\n```"
+    print(f"\n大目录响应: {len(large) / 1024:.0f} KB")
+    for name, fn in [("legacy extract_json", legacy_extract_json), ("single-pass extract_json", extract_json)]:
+        start = time.perf_counter()
+        for _ in range(20):
+            fn(large)
+        print(f"  {name:<26}{(time.perf_counter() - start) / 20 * 1000:>8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+节点文本内存基准测试
+复用 bench_node_views 的完整规范树（1202 页真实文本，章节 → 节 → 叶子），执行 add_node_text，
+比较旧实现（每个节点用 += 逐页拼接出自己的页面文本）、共用页面缓冲区（整份文档只拼接一次，
+节点文本是其中的切片）和现在的 ''.join（get_text_of_pdf_pages）的耗时和峰值 RSS 增量，
+并检查两者 json.dump 的输出完全相同。每种模式在独立子进程中运行。
+
+用法: python benchmarks/bench_node_text.py [章节目录]
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from itertools import accumulate
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "pageindex_adapters"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_node_views import build_tree, memory_kb
+from pageindex.doc_tree import DocTree
+
+MODES = ("legacy strings", "page buffer", "join")
+
+
+def legacy_add_node_text(structure, pdf_pages):
+    """旧实现：get_text_of_pdf_pages 用 += 逐页拼接"""
+    for node in DocTree(structure).nodes():
+        text = ""
+        for page_num in range(node["start_index"] - 1, node["end_index"]):
+            text += pdf_pages[page_num][0]
+        node["text"] = text
+
+
+def buffer_add_node_text(structure, pdf_pages):
+    """整份文档拼接成一个缓冲区，节点文本是按页偏移取出的切片"""
+    buffer = "".join(page[0] for page in pdf_pages)
+    offsets = [0] + list(accumulate(len(page[0]) for page in pdf_pages))
+    for node in DocTree(structure).nodes():
+        node["text"] = buffer[offsets[node["start_index"] - 1]:offsets[node["end_index"]]]
+
+
+def join_add_node_text(structure, pdf_pages):
+    """当前实现：每个节点用 ''.join 拼接自己的页面"""
+    for node in DocTree(structure).nodes():
+        node["text"] = "".join(pdf_pages[page_num][0]
+                               for page_num in range(node["start_index"] - 1, node["end_index"]))
+
+
+ADD_NODE_TEXT = {"legacy strings": legacy_add_node_text, "page buffer": buffer_add_node_text,
+                 "join": join_add_node_text}
+
+
+def run_mode(mode, chapter_dir):
+    """子进程入口：执行一种模式并以 JSON 输出测量结果"""
+    structure, pages = build_tree(chapter_dir, with_text=False)
+    baseline = memory_kb("VmRSS")
+    start = time.perf_counter()
+    ADD_NODE_TEXT[mode](structure, pages)
+    elapsed = time.perf_counter() - start
+    peak = memory_kb("VmHWM") - baseline
+
+    start = time.perf_counter()
+    output = json.dumps(structure, ensure_ascii=False)
+    dump_seconds = time.perf_counter() - start
+    print(json.dumps({
+        "seconds": elapsed,
+        "peak_delta_mb": peak / 1024,
+        "dump_seconds": dump_seconds,
+        "output_size": len(output),
+        "output_hash": hash(output),
+    }))
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--run":
+        run_mode(sys.argv[2], sys.argv[3])
+        return
+
+    chapter_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "docs", "chapters", "ts_124501v181200p")
+    print(f"{'模式':<18}{'add_node_text s':>16}{'峰值 RSS 增量 MB':>20}{'json.dump s':>14}")
+    outputs = set()
+    for mode in MODES:
+        result = subprocess.run([sys.executable, __file__, "--run", mode, chapter_dir],
+                                check=True, capture_output=True, text=True,
+                                env=dict(os.environ, PYTHONHASHSEED="0"))
+        stats = json.loads(result.stdout.strip().splitlines()[-1])
+        outputs.add((stats["output_size"], stats["output_hash"]))
+        print(f"{mode:<18}{stats['seconds']:>16.3f}{stats['peak_delta_mb']:>20.1f}{stats['dump_seconds']:>14.3f}")
+    print("JSON 输出一致" if len(outputs) == 1 else "JSON 输出不一致!")
+
+
+if __name__ == "__main__":
+    main()
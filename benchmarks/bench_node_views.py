@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+节点列表内存基准测试
+用 docs/chapters/ts_124501v181200p 全部章节的真实页面文本构造一棵完整规范的树
+（章节 → 每 10 页一节 → 每 2 页一个叶子），像 if_add_node_text=yes 那样给每个节点附加其页面范围的文本，
+再调用 get_nodes 和 get_leaf_nodes。比较旧实现（deepcopy 每个节点）、浅拷贝实现和直接返回 DocTree.nodes() 中的节点
+的耗时与峰值 RSS 增量。每种模式在独立子进程中运行，峰值读取 /proc/self/status 的 VmHWM。
+
+注意: copy.deepcopy 对不可变的 str 直接返回原对象，旧实现实际复制的是每个节点的整棵子树（dict 和 list），
+而不是文本本身，因此 RSS 差异远小于文本总量；节点文本换成可变对象（如 UserString）时才会真正被复制。
+
+用法: python benchmarks/bench_node_views.py [章节目录]
+"""
+
+import copy
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pymupdf
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "pageindex_adapters"))
+
+from pageindex.doc_tree import DocTree, node_without_children
+
+MODES = ("legacy deepcopy", "shallow copy", "DocTree.nodes")
+
+
+def build_tree(chapter_dir, with_text=True):
+    """返回 (structure, pages)；pages 为 [(页面文本, 0), ...]"""
+    structure = []
+    pages = []
+    for pdf_path in sorted(glob.glob(os.path.join(chapter_dir, "*.pdf"))):
+        with pymupdf.open(pdf_path) as doc:
+            texts = [page.get_text() for page in doc]
+        if not texts:  # 跳过拆分时产生的空章节
+            continue
+        first = len(pages)
+        pages.extend(texts)
+        chapter = {"title": os.path.basename(pdf_path), "start_index": first + 1, "end_index": len(pages), "nodes": []}
+        for section_start in range(first, len(pages), 10):
+            section_end = min(section_start + 10, len(pages))
+            section = {"title": f"p{section_start + 1}", "start_index": section_start + 1,
+                       "end_index": section_end, "nodes": []}
+            for leaf_start in range(section_start, section_end, 2):
+                leaf_end = min(leaf_start + 2, section_end)
+                section["nodes"].append({"title": f"p{leaf_start + 1}", "start_index": leaf_start + 1,
+                                         "end_index": leaf_end})
+            chapter["nodes"].append(section)
+        structure.append(chapter)
+
+    if with_text:
+        for node in DocTree(structure).nodes():
+            node["text"] = "".join(pages[node["start_index"] - 1:node["end_index"]])
+    return structure, [(text, 0) for text in pages]
+
+
+def legacy_get_nodes(structure):
+    if isinstance(structure, dict):
+        structure_node = copy.deepcopy(structure)
+        structure_node.pop('nodes', None)
+        nodes = [structure_node]
+        for key in list(structure.keys()):
+            if 'nodes' in key:
+                nodes.extend(legacy_get_nodes(structure[key]))
+        return nodes
+    elif isinstance(structure, list):
+        nodes = []
+        for item in structure:
+            nodes.extend(legacy_get_nodes(item))
+        return nodes
+
+
+def legacy_get_leaf_nodes(structure):
+    if isinstance(structure, dict):
+        if not structure.get('nodes'):
+            structure_node = copy.deepcopy(structure)
+            structure_node.pop('nodes', None)
+            return [structure_node]
+        leaf_nodes = []
+        for key in list(structure.keys()):
+            if 'nodes' in key:
+                leaf_nodes.extend(legacy_get_leaf_nodes(structure[key]))
+        return leaf_nodes
+    elif isinstance(structure, list):
+        leaf_nodes = []
+        for item in structure:
+            leaf_nodes.extend(legacy_get_leaf_nodes(item))
+        return leaf_nodes
+
+
+def memory_kb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def run_mode(mode, chapter_dir):
+    """子进程入口：执行一种模式并以 JSON 输出测量结果"""
+    structure, pages = build_tree(chapter_dir)
+    baseline = memory_kb("VmRSS")
+    start = time.perf_counter()
+    if mode == "legacy deepcopy":
+        all_nodes, leaves = legacy_get_nodes(structure), legacy_get_leaf_nodes(structure)
+    elif mode == "shallow copy":
+        all_nodes = [node_without_children(node) for node in DocTree(structure).nodes()]
+        leaves = [node_without_children(node) for node in DocTree(structure).nodes(leaves_only=True)]
+    else:
+        all_nodes = DocTree(structure).nodes()
+        leaves = DocTree(structure).nodes(leaves_only=True)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "pages": len(pages),
+        "nodes": len(all_nodes),
+        "leaves": len(leaves),
+        "text_mb": sum(len(node["text"]) for node in all_nodes) / 1e6,
+        "seconds": elapsed,
+        "peak_delta_mb": (memory_kb("VmHWM") - baseline) / 1024,
+    }))
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--run":
+        run_mode(sys.argv[2], sys.argv[3])
+        return
+
+    chapter_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "docs", "chapters", "ts_124501v181200p")
+    header_printed = False
+    for mode in MODES:
+        result = subprocess.run([sys.executable, __file__, "--run", mode, chapter_dir],
+                                check=True, capture_output=True, text=True)
+        stats = json.loads(result.stdout.strip().splitlines()[-1])
+        if not header_printed:
+            print(f"树: {stats['pages']} 页, {stats['nodes']} 个节点, {stats['leaves']} 个叶子, "
+                  f"节点文本共 {stats['text_mb']:.1f} M 字符")
+            print(f"{'模式':<20}{'耗时 s':>10}{'峰值 RSS 增量 MB':>20}")
+            header_printed = True
+        print(f"{mode:<20}{stats['seconds']:>10.3f}{stats['peak_delta_mb']:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+并行页面文本提取扩展性基准测试
+将 docs/chapters/ts_124501v181200p 的全部章节合并为一份完整规范（内存中），
+分别用 PyPDF2、PyMuPDF 单进程和 PyMuPDF-parallel（1/2/4/8 个工作进程）执行 get_page_tokens。
+
+注意: 加速比受本机 CPU 核数限制；工作进程数超过核数时只会增加进程启动和结果回传的开销。
+
+用法: python benchmarks/bench_parallel_extract.py [章节目录]
+"""
+
+import glob
+import io
+import os
+import sys
+import time
+
+import pymupdf
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "pageindex_adapters"))
+
+from pageindex.pdf_document import PdfDocument, configure_pdf_extraction
+from pageindex.token_counter import count_tokens
+
+WORKER_COUNTS = (1, 2, 4, 8)
+
+
+def merge_chapters(chapter_dir):
+    merged = pymupdf.open()
+    for pdf_path in sorted(glob.glob(os.path.join(chapter_dir, "*.pdf"))):
+        with pymupdf.open(pdf_path) as doc:
+            if doc.page_count:  # 跳过拆分时产生的空章节
+                merged.insert_pdf(doc)
+    data = merged.tobytes()
+    merged.close()
+    return data
+
+
+def run(data, parser):
+    start = time.perf_counter()
+    document = PdfDocument(io.BytesIO(data), parser)
+    pages = document.get_page_tokens()
+    document.close()
+    return time.perf_counter() - start, pages
+
+
+def main():
+    chapter_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "docs", "chapters", "ts_124501v181200p")
+    data = merge_chapters(chapter_dir)
+    count_tokens("warm up")
+    print(f"CPU 核数: {os.cpu_count()}, PDF 大小: {len(data) / 1e6:.1f} MB")
+
+    cases = [("PyPDF2", "PyPDF2", 1), ("PyMuPDF", "PyMuPDF", 1)]
+    cases += [(f"PyMuPDF-parallel x{workers}", "PyMuPDF-parallel", workers) for workers in WORKER_COUNTS]
+
+    baseline = None
+    reference = None
+    print(f"{'解析器':<26}{'页数':>8}{'耗时 s':>10}{'加速比':>10}")
+    for name, parser, workers in cases:
+        configure_pdf_extraction(workers=workers)
+        elapsed, pages = run(data, parser)
+        if parser == "PyMuPDF":
+            baseline, reference = elapsed, pages
+        speedup = f"{baseline / elapsed:.2f}x" if baseline else "-"
+        print(f"{name:<26}{len(pages):>8}{elapsed:>10.2f}{speedup:>10}")
+        if parser == "PyMuPDF-parallel":
+            assert pages == reference, "并行提取结果与单进程不一致"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+PDF 解析耗时基准测试
+模拟一次 PageIndex 运行中的 PDF 访问模式：get_page_tokens 一次、get_number_of_pages 一次，
+再按节点逐段调用 get_text_of_pages。比较每次调用都新建 PyPDF2.PdfReader（旧实现）
+与共享 PdfDocument（页面文本缓存）的耗时。
+
+用法: python benchmarks/bench_pdf_document.py [PDF 路径] [分段页数]
+"""
+
+import glob
+import os
+import sys
+import time
+
+import PyPDF2
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "pageindex_adapters"))
+
+from pageindex.pdf_document import open_pdf_document, close_pdf_documents
+
+
+def legacy_text_of_pages(pdf_path, start_page, end_page):
+    """旧实现：每次调用都新建 PdfReader"""
+    pdf_reader = PyPDF2.PdfReader(pdf_path)
+    text = ""
+    for page_num in range(start_page - 1, end_page):
+        text += pdf_reader.pages[page_num].extract_text()
+    return text
+
+
+def legacy_run(pdf_path, ranges):
+    pdf_reader = PyPDF2.PdfReader(pdf_path)
+    [page.extract_text() for page in pdf_reader.pages]
+    len(PyPDF2.PdfReader(pdf_path).pages)
+    for start, end in ranges:
+        legacy_text_of_pages(pdf_path, start, end)
+
+
+def cached_run(pdf_path, ranges):
+    open_pdf_document(pdf_path).get_page_tokens()
+    open_pdf_document(pdf_path).num_pages
+    for start, end in ranges:
+        open_pdf_document(pdf_path).text_of_pages(start, end, tag=False)
+
+
+def main():
+    chapter_dir = os.path.join(ROOT, "docs", "chapters", "ts_124501v181200p")
+    pdf_path = sys.argv[1] if len(sys.argv) > 1 else max(glob.glob(os.path.join(chapter_dir, "*.pdf")), key=os.path.getsize)
+    span = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    num_pages = len(PyPDF2.PdfReader(pdf_path).pages)
+    ranges = [(start, min(start + span - 1, num_pages)) for start in range(1, num_pages + 1, span)]
+    print(f"{os.path.basename(pdf_path)}: {num_pages} 页, {len(ranges)} 个节点区间")
+
+    for name, fn in [("legacy PdfReader per call", legacy_run), ("shared PdfDocument", cached_run)]:
+        start = time.perf_counter()
+        fn(pdf_path, ranges)
+        print(f"{name:<28}{time.perf_counter() - start:>10.2f} s")
+        close_pdf_documents()
+
+
+if __name__ == "__main__":
+    main()
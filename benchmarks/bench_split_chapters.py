@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+章节切割基准测试
+仓库中只有切割后的章节文件，因此先把 docs/chapters/ts_124501v181200p 下的非空章节
+按文件名顺序合并成一份带顶级书签的完整规范（临时目录），再对它比较：
+旧实现（逐页 add_page）、流式切割（默认 / --dedup / --jobs 多进程）和虚拟章节（只写清单）的
+墙钟时间、峰值 RSS 和输出总字节数。每种模式在独立子进程中运行，RSS 互不影响；
+峰值 RSS 读取 /proc/self/status 的 VmHWM（ru_maxrss 在 Linux 上会继承父进程的值），
+多进程模式只统计主进程。
+
+注意: 合并出的规范中各章节本来就各自携带字体等资源，章节间没有可共享的对象，
+因此去重对输出字节数的影响会比原始规范小。
+
+用法: python benchmarks/bench_split_chapters.py [章节目录]
+"""
+
+import contextlib
+import glob
+import io
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from pypdf import PdfReader, PdfWriter
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+import split_pdf_by_chapters as splitter
+
+MODES = ("legacy", "streaming", "streaming-dedup", "jobs-2", "jobs-4", "virtual")
+
+
+def build_spec(chapter_dir, spec_path):
+    writer = PdfWriter()
+    for pdf_path in sorted(glob.glob(os.path.join(chapter_dir, "*.pdf"))):
+        reader = PdfReader(pdf_path)
+        if not reader.pages:  # 跳过拆分时产生的空章节
+            continue
+        title = re.sub(r"^\d+_", "", Path(pdf_path).stem)
+        writer.append(reader, outline_item=title)
+    with open(spec_path, "wb") as f:
+        writer.write(f)
+
+
+def legacy_split(pdf_path, output_dir):
+    """旧实现：每章新建 PdfWriter 并逐页 add_page"""
+    reader = PdfReader(pdf_path)
+    for idx, (title, start_page, end_page) in enumerate(splitter.get_chapter_ranges(reader), 1):
+        writer = PdfWriter()
+        for page_num in range(start_page, end_page + 1):
+            writer.add_page(reader.pages[page_num])
+        with open(Path(output_dir) / splitter.chapter_filename(idx, title), "wb") as f:
+            writer.write(f)
+
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(mode, spec_path, output_dir):
+    """子进程入口：执行一种模式并以 JSON 输出测量结果"""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == "legacy":
+            legacy_split(spec_path, output_dir)
+        else:
+            jobs = int(mode.split("-")[1]) if mode.startswith("jobs-") else 1
+            splitter.split_pdf_by_chapters(spec_path, output_dir, virtual=mode == "virtual",
+                                           dedup=mode == "streaming-dedup", jobs=jobs)
+    elapsed = time.perf_counter() - start
+    output_bytes = sum(path.stat().st_size for path in Path(output_dir).iterdir())
+    print(json.dumps({
+        "seconds": elapsed,
+        "peak_rss_mb": peak_rss_mb(),
+        "output_bytes": output_bytes,
+    }))
+
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == "--run":
+        run_mode(*sys.argv[2:])
+        return
+
+    chapter_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "docs", "chapters", "ts_124501v181200p")
+    with tempfile.TemporaryDirectory() as tmp:
+        spec_path = os.path.join(tmp, "spec.pdf")
+        build_spec(chapter_dir, spec_path)
+        print(f"合并规范: {len(PdfReader(spec_path).pages)} 页, {os.path.getsize(spec_path) / 1e6:.1f} MB")
+
+        print(f"{'模式':<22}{'耗时 s':>10}{'峰值 RSS MB':>14}{'输出 MB':>10}")
+        for mode in MODES:
+            output_dir = os.path.join(tmp, mode)
+            os.makedirs(output_dir)
+            result = subprocess.run([sys.executable, __file__, "--run", mode, spec_path, output_dir],
+                                    check=True, capture_output=True, text=True)
+            stats = json.loads(result.stdout.strip().splitlines()[-1])
+            print(f"{mode:<22}{stats['seconds']:>10.2f}{stats['peak_rss_mb']:>14.1f}"
+                  f"{stats['output_bytes'] / 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+摘要打包的请求数
+以带完整书签的 TS 24.501 PDF 构造与 outline-first 相同粒度的树：每个书签条目的文本从其标题所在位置
+开始，到下一个同级或更高层级条目为止（父节点包含子节点的文本，与 PageIndex 的 start/end_index 一致）。
+不调用真实 API：用假的 summarize_node / summarize_batch 统计 summarize_packed 发出的请求数和
+提示 token 数（节点文本按 approximate_tokens 估计，每个请求另计固定的提示开销），
+并以一定概率让打包响应漏掉节点或整体无法解析，观察拆分重试的代价。
+
+用法: python benchmarks/bench_summary_packing.py PDF路径（需带书签，如按目录页生成书签的 ts_124501v181200p.pdf）
+"""
+
+import asyncio
+import os
+import random
+import sys
+
+import pymupdf
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "pageindex_adapters"))
+
+from pageindex.outline_tree import read_outline, title_position
+from pageindex.summary_packing import (get_summary_packing_stats, packed_summary_prompt, record_summary_request,
+                                       summarize_packed)
+from pageindex.token_counter import approximate_tokens
+
+BATCH_TOKENS = (2000, 4000, 8000)
+# (漏掉单个节点的概率, 整个响应无法解析的概率)
+FAILURE_RATES = ((0.0, 0.0), (0.05, 0.0), (0.05, 0.1))
+PROMPT_OVERHEAD = approximate_tokens(packed_summary_prompt([]))
+
+
+def node_texts(pdf_path):
+    """每个书签条目的节点文本"""
+    with pymupdf.open(pdf_path) as pdf:
+        pages = [page.get_text() for page in pdf]
+    offsets = [0]
+    for text in pages:
+        offsets.append(offsets[-1] + len(text))
+    document = "".join(pages)
+    outline = read_outline(pdf_path)
+    starts = []
+    for _, title, page in outline:
+        position = title_position(title, pages[page - 1])
+        starts.append(offsets[page - 1] + max(position, 0))
+    texts = []
+    for index, (level, _, _) in enumerate(outline):
+        end = next((starts[later] for later in range(index + 1, len(outline)) if outline[later][0] <= level),
+                   len(document))
+        texts.append(document[starts[index]:max(end, starts[index])])
+    return texts
+
+
+def simulate(nodes, batch_tokens, drop_rate, garble_rate):
+    """(统计, 提示 token 数)"""
+    rng = random.Random(0)
+    prompt_tokens = 0
+
+    async def summarize_node(node, model=None):
+        nonlocal prompt_tokens
+        record_summary_request()
+        prompt_tokens += PROMPT_OVERHEAD + approximate_tokens(node["text"])
+        return "summary"
+
+    async def summarize_batch(batch, model=None):
+        nonlocal prompt_tokens
+        record_summary_request(len(batch))
+        prompt_tokens += PROMPT_OVERHEAD + sum(approximate_tokens(node["text"]) for node in batch)
+        if rng.random() < garble_rate:
+            return [None] * len(batch)
+        return [None if rng.random() < drop_rate else "summary" for _ in batch]
+
+    before = get_summary_packing_stats()
+    summaries = asyncio.run(summarize_packed(nodes, None, summarize_node, summarize_batch, batch_tokens))
+    assert all(summary == "summary" for summary in summaries)
+    after = get_summary_packing_stats()
+    return {name: after[name] - before[name] for name in after}, prompt_tokens
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    nodes = [{"text": text} for text in node_texts(sys.argv[1])]
+    sizes = sorted(approximate_tokens(node["text"]) for node in nodes)
+    baseline_tokens = sum(PROMPT_OVERHEAD + size for size in sizes)
+    print(f"{len(nodes)} 个节点, 文本 token 中位数 {sizes[len(sizes) // 2]}, "
+          f"≤500 token 的节点 {sum(size <= 500 for size in sizes)} 个")
+    print(f"不打包: {len(nodes)} 个请求, 提示约 {baseline_tokens:,} token")
+    print(f"\n{'批次token':>10}{'漏节点':>8}{'整批失败':>10}{'打包请求':>10}{'单节点请求':>12}"
+          f"{'拆分':>6}{'请求合计':>10}{'减少':>8}{'提示token':>12}")
+    for batch_tokens in BATCH_TOKENS:
+        for drop_rate, garble_rate in FAILURE_RATES:
+            stats, prompt_tokens = simulate(nodes, batch_tokens, drop_rate, garble_rate)
+            requests = stats["packed_requests"] + stats["single_requests"]
+            saved = 1 - requests / len(nodes)
+            print(f"{batch_tokens:>10}{drop_rate:>8.0%}{garble_rate:>10.0%}{stats['packed_requests']:>10}"
+                  f"{stats['single_requests']:>12}{stats['splits']:>6}{requests:>10}{saved:>8.1%}"
+                  f"{prompt_tokens:>12,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+本地标题匹配准确率与节省调用数
+以带完整书签的 TS 24.501 PDF 为标注来源：书签标题和页码取自目录页，但规范自带的目录页码并不总是准确
+（例如 9.11.3.42 目录写在第 912 页，正文实际从第 913 页开始）。因此真值页取书签页码前后 2 页内
+逐字出现该标题行（条款号 + 标题，空白归一化后精确比较，不做模糊匹配）的物理页；找不到的条目不参与评估。
+对每个条目模拟上游三类 LLM 调用：
+
+- check_title_appearance，正确页码：本地应判"是"，判"否"即误判
+- check_title_appearance，错误页码（真值页 ±2）：本地应判"否"，判"是"即误判
+- check_title_appearance_in_start：没有独立真值，与 outline_tree.starts_page（页眉前缀法）对比一致率；
+  与上一条目同页的标题不可能位于页首，据此统计确定的误判
+- single_toc_item_index_fixer，给出书签页码前后各 3 页：本地返回真值页为正确，返回其他页即误判
+
+"待LLM" 为本地无法判定、仍需调用 LLM 的条目数。
+
+用法: python benchmarks/bench_title_matcher.py PDF路径（需带书签，如按目录页生成书签的 ts_124501v181200p.pdf）
+"""
+
+import os
+import sys
+import time
+
+import pymupdf
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "pageindex_adapters"))
+
+from pageindex.outline_tree import header_length, read_outline, starts_page
+from pageindex.pdf_document import PdfDocument
+from pageindex.title_matcher import HAS_RAPIDFUZZ, TitleIndex, locate_title, title_on_page
+
+WRONG_PAGE_OFFSET = 2
+FIX_RANGE = 3
+HEADING_SEARCH = (0, 1, -1, 2, -2)
+
+
+def heading_pages(pdf_path, outline):
+    """[(标题, 书签页码, 真值页或 None), ...]：书签页码附近逐字出现标题行的页"""
+    with pymupdf.open(pdf_path) as pdf:
+        pages = [[" ".join(line.split()).lower() for line in page.get_text().splitlines() if line.strip()]
+                 for page in pdf]
+    entries = []
+    for _, title, page in outline:
+        number, _, rest = title.partition("\t") if "\t" in title else ("", "", title)
+        heading = " ".join(f"{number} {rest}".split()).lower()
+        rest = " ".join(rest.split()).lower()
+        truth = None
+        for offset in HEADING_SEARCH:
+            lines = pages[page + offset - 1] if 1 <= page + offset <= len(pages) else []
+            if any(" ".join(lines[i:i + 3]).startswith(heading)
+                   or (number and lines[i] == number.lower() and " ".join(lines[i + 1:i + 3]).startswith(rest))
+                   for i in range(len(lines))):
+                truth = page + offset
+                break
+        entries.append((title, page, truth))
+    return entries
+
+
+def fixer_content(page_list, first, last):
+    """上游 fix_incorrect_toc 传给 single_toc_item_index_fixer 的页面文本"""
+    return "".join(f"<physical_index_{page}>\n{page_list[page - 1][0]}\n<physical_index_{page}>\n\n"
+                   for page in range(first, last + 1))
+
+
+def evaluate(pdf_path, parser):
+    document = PdfDocument(pdf_path, parser)
+    page_list = document.get_page_tokens()
+    document.close()
+    entries = heading_pages(pdf_path, read_outline(pdf_path))
+    num_pages = len(page_list)
+    index = TitleIndex(page_list)
+    header = header_length([text for text, _ in page_list])
+    rows = {name: {"yes": 0, "no": 0, "llm": 0, "wrong": 0}
+            for name in ("正确页码", "错误页码", "标题在页首", "页码修正")}
+    agree = decided_start = evaluated = 0
+
+    started = time.perf_counter()
+    previous_truth = None
+    for title, toc_page, page in entries:
+        if page is None:
+            continue
+        evaluated += 1
+        answer = title_on_page(title, index.page(page))
+        row = rows["正确页码"]
+        row["llm" if answer is None else answer] += 1
+        row["wrong"] += answer == "no"
+
+        wrong_page = page + WRONG_PAGE_OFFSET if page + WRONG_PAGE_OFFSET <= num_pages else page - WRONG_PAGE_OFFSET
+        answer = title_on_page(title, index.page(wrong_page))
+        row = rows["错误页码"]
+        row["llm" if answer is None else answer] += 1
+        row["wrong"] += answer == "yes"
+
+        answer = index.title_starts_page(title, page)
+        row = rows["标题在页首"]
+        row["llm" if answer is None else answer] += 1
+        shares_page = previous_truth == page
+        previous_truth = page
+        row["wrong"] += answer == "yes" and shares_page
+        if answer is not None:
+            decided_start += 1
+            reference = not shares_page and starts_page(title, page_list[page - 1][0], header)
+            agree += (answer == "yes") == reference
+
+        found = locate_title(title, fixer_content(page_list, max(toc_page - FIX_RANGE, 1),
+                                                  min(toc_page + FIX_RANGE, num_pages)))
+        row = rows["页码修正"]
+        row["llm" if found is None else "yes"] += 1
+        row["wrong"] += found is not None and found != page
+    elapsed = time.perf_counter() - started
+    moved = sum(truth is not None and truth != toc_page for _, toc_page, truth in entries)
+    return len(entries), evaluated, moved, rows, agree, decided_start, elapsed
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    print(f"相似度: {'rapidfuzz' if HAS_RAPIDFUZZ else 'difflib'}")
+    for parser in ("PyPDF2", "PyMuPDF"):
+        entries, evaluated, moved, rows, agree, decided_start, elapsed = evaluate(sys.argv[1], parser)
+        print(f"\n{parser}: {entries} 个书签条目, 找到真值页 {evaluated} 个（其中 {moved} 个与目录页码不同）, "
+              f"本地匹配耗时 {elapsed:.1f} s")
+        print(f"{'检查':<10}{'判是':>6}{'判否':>6}{'待LLM':>7}{'误判':>6}{'本地判定':>10}")
+        for name, row in rows.items():
+            local = (row["yes"] + row["no"]) / evaluated
+            print(f"{name:<10}{row['yes']:>6}{row['no']:>6}{row['llm']:>7}{row['wrong']:>6}{local:>10.1%}")
+        print(f"标题在页首: 本地判定与 starts_page 一致 {agree}/{decided_start}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+本地目录页检测准确率与节省调用数
+对 docs/chapters/ts_124501v181200p 中每个章节 PDF 的页面（PyPDF2 和 PyMuPDF 两种提取结果）运行
+classify_toc_page，统计本地判定为目录 / 非目录 / 无法判定（仍需调用 LLM）的页数。
+
+标注（人工核对）: 目录页只有 "03_Modal verbs terminology.pdf" 的第 2-24 页
+（从 "Contents" 标题到 "History ... 1202" 条目），其余页面都不是目录。
+
+- 精确率/召回率只针对本地直接判定的页面：本地判"是"的页面中真正是目录的比例，以及目录页中被本地判"是"的比例
+- 误判"否"的目录页会让 PageIndex 漏掉目录，单独列出
+- 节省调用: 上游对每个待检查页面调用一次 toc_detector_single_page，本地判定的页面不再调用；
+  分别按 "每个文档前 20 页"（--toc-check-pages 默认值）和 "全部页面" 统计
+
+用法: python benchmarks/bench_toc_detector.py [章节目录]
+"""
+
+import glob
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "pageindex_adapters"))
+
+from pageindex.pdf_document import PdfDocument
+from pageindex.toc_heuristics import classify_toc_page
+
+TOC_PAGES = {"03_Modal verbs terminology.pdf": set(range(2, 25))}
+TOC_CHECK_PAGES = 20
+
+
+def evaluate(chapter_dir, parser, limit=None):
+    counts = {"pages": 0, "yes": 0, "no": 0, "ambiguous": 0, "true_yes": 0, "false_yes": 0, "false_no": 0, "toc": 0}
+    for pdf_path in sorted(glob.glob(os.path.join(chapter_dir, "*.pdf"))):
+        truth = TOC_PAGES.get(os.path.basename(pdf_path), set())
+        document = PdfDocument(pdf_path, parser)
+        try:
+            num_pages = document.num_pages if limit is None else min(document.num_pages, limit)
+            for page in range(1, num_pages + 1):
+                verdict = classify_toc_page(document.page_text(page))
+                is_toc = page in truth
+                counts["pages"] += 1
+                counts["toc"] += is_toc
+                counts["ambiguous" if verdict is None else verdict] += 1
+                counts["true_yes"] += verdict == "yes" and is_toc
+                counts["false_yes"] += verdict == "yes" and not is_toc
+                counts["false_no"] += verdict == "no" and is_toc
+        finally:
+            document.close()
+    return counts
+
+
+def main():
+    chapter_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "docs", "chapters", "ts_124501v181200p")
+    print(f"{'解析器':<10}{'范围':<10}{'页数':>6}{'判是':>6}{'判否':>6}{'待LLM':>7}"
+          f"{'精确率':>8}{'召回率':>8}{'误判否':>8}{'节省调用':>10}")
+    for parser in ("PyPDF2", "PyMuPDF"):
+        for scope, limit in ((f"前{TOC_CHECK_PAGES}页", TOC_CHECK_PAGES), ("全部", None)):
+            c = evaluate(chapter_dir, parser, limit)
+            precision = c["true_yes"] / c["yes"] if c["yes"] else 1.0
+            recall = c["true_yes"] / c["toc"] if c["toc"] else 1.0
+            saved = (c["yes"] + c["no"]) / c["pages"]
+            print(f"{parser:<10}{scope:<10}{c['pages']:>6}{c['yes']:>6}{c['no']:>6}{c['ambiguous']:>7}"
+                  f"{precision:>8.1%}{recall:>8.1%}{c['false_no']:>8}{saved:>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
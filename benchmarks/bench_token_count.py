@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Token 计数微基准测试
+在 docs/chapters/ts_124501v181200p 的全部页面上比较：
+每次调用重新获取编码器（旧实现）、缓存编码器、批量计数与近似计数的单页耗时
+
+注意: 旧实现的主要开销出现在 BPE 文件无法加载（离线环境）时——每次调用都会重新尝试下载，
+失败后才退回 len // 4；缓存后的编码器只尝试一次。
+
+用法: python benchmarks/bench_token_count.py [章节目录]
+"""
+
+import glob
+import os
+import sys
+import time
+
+import pymupdf
+import tiktoken
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "pageindex_adapters"))
+
+from pageindex.token_counter import count_tokens, count_tokens_batch, DEFAULT_BATCH_THREADS
+
+
+def legacy_count_tokens(text):
+    """旧实现：每次调用都执行 tiktoken.get_encoding"""
+    if not text:
+        return 0
+    enc = tiktoken.get_encoding("cl100k_base")
+    return len(enc.encode(text))
+
+
+def load_pages(chapter_dir):
+    pages = []
+    for pdf_path in sorted(glob.glob(os.path.join(chapter_dir, "*.pdf"))):
+        with pymupdf.open(pdf_path) as doc:
+            pages.extend(page.get_text() for page in doc)
+    return pages
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    chapter_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "docs", "chapters", "ts_124501v181200p")
+    pages = load_pages(chapter_dir)
+    print(f"{len(pages)} 页, {sum(len(p) for p in pages) / 1e6:.1f}M 字符, 批量线程数 {DEFAULT_BATCH_THREADS}")
+
+    count_tokens("warm up")  # 编码器只加载一次，不计入测量
+    cases = [
+        ("legacy get_encoding per call", lambda: [legacy_count_tokens(p) for p in pages]),
+        ("cached encoder", lambda: [count_tokens(p) for p in pages]),
+        ("count_tokens_batch", lambda: count_tokens_batch(pages)),
+        ("count_tokens_batch (4 threads)", lambda: count_tokens_batch(pages, num_threads=4)),
+        ("approximate", lambda: count_tokens_batch(pages, approximate=True)),
+    ]
+
+    exact = None
+    print(f"{'模式':<32}{'总耗时 s':>10}{'单页 µs':>12}{'总 tokens':>12}")
+    for name, fn in cases:
+        elapsed, counts = timed(fn)
+        total = sum(counts)
+        exact = exact or total
+        print(f"{name:<32}{elapsed:>10.3f}{elapsed / len(pages) * 1e6:>12.1f}{total:>12}")
+    print(f"\n近似计数与精确计数的偏差: {(total - exact) / exact:+.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+本地模拟 LLM 服务器（用于基准测试）
+模拟 Gemini generateContent 与 OpenAI 兼容的 chat/completions 接口（智谱AI），支持 HTTP/1.1 keep-alive
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    """按固定延迟返回固定回答的请求处理器"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+
+        # 超过并发上限时返回 429，模拟服务端限流
+        with self.server.lock:
+            self.server.requests += 1
+            throttled = 0 < self.server.max_concurrent <= self.server.active
+            if throttled:
+                self.server.throttled += 1
+            else:
+                self.server.active += 1
+        if throttled:
+            headers = {"Retry-After": str(self.server.retry_after)} if self.server.retry_after else {}
+            self.send_json(429, {"error": {"code": 429, "message": "Resource has been exhausted"}}, headers)
+            return
+
+        try:
+            time.sleep(self.server.latency)
+        finally:
+            with self.server.lock:
+                self.server.active -= 1
+
+        if self.path.split("?")[0].endswith(":generateContent"):
+            body = {
+                "candidates": [{
+                    "content": {"parts": [{"text": self.server.answer}]},
+                    "finishReason": "STOP",
+                }]
+            }
+        elif self.path.split("?")[0].endswith("/chat/completions"):
+            body = {
+                "choices": [{
+                    "message": {"role": "assistant", "content": self.server.answer},
+                    "finish_reason": "stop",
+                }]
+            }
+        else:
+            self.send_error(404)
+            return
+
+        self.send_json(200, body)
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, latency=0.0, answer="mock answer", port=0, max_concurrent=0, retry_after=None):
+        super().__init__(("127.0.0.1", port), MockLLMHandler)
+        self.latency = latency
+        self.answer = answer
+        self.max_concurrent = max_concurrent
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.active = 0
+        self.requests = 0
+        self.throttled = 0
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        """在后台线程中启动服务器"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    server = MockLLMServer(latency=0.05, port=8765)
+    print(f"模拟服务器已启动: {server.base_url}")
+    server.serve_forever()
@@ -0,0 +1,27 @@
+"""
+Revision-independent fingerprints of document text
+Version numbers, release dates and bare page-number lines (the 3GPP/ETSI page header)
+are removed before hashing, so a clause that did not change between two releases of a
+spec keeps its fingerprint. split_pdf_by_chapters.py fingerprints pages with the same
+normalize_text.
+"""
+
+import hashlib
+import re
+
+IGNORE_PATTERNS = [
+    re.compile(r"\bV\d+\.\d+\.\d+\b"),
+    re.compile(r"\bversion \d+\.\d+\.\d+\b"),
+    re.compile(r"\bRelease \d+\b"),
+    re.compile(r"\(\d{4}-\d{2}\)"),
+    re.compile(r"^\s*\d+\s*$", re.MULTILINE),
+]
+
+def normalize_text(text):
+    for pattern in IGNORE_PATTERNS:
+        text = pattern.sub("", text)
+    return " ".join(text.split())
+
+def content_fingerprint(text):
+    """sha256 hex digest of the normalized text"""
+    return hashlib.sha256(normalize_text(str(text or "")).encode("utf-8")).hexdigest()
@@ -0,0 +1,162 @@
+"""
+Indexed document tree
+PageIndex passes trees around as nested dicts ({'title': ..., 'node_id': ..., 'nodes': [...]}).
+DocTree indexes such a structure without copying it: each TreeNode wraps one of the tree's
+own dicts together with its parent and the list position it is held at, so preorder walks,
+parent/child/leaf queries and node_id lookups need no search of the whole tree.
+to_structure() copies the tree back into the dict/JSON shape.
+find_node_by_id keeps the DocTree of recently queried structures and checks a cached node
+in O(depth) before returning it.
+"""
+
+from .identity_cache import IdentityCache
+
+CHILD_KEY = "nodes"
+INDEX_CACHE_SIZE = 8
+
+class TreeNode:
+    """
+    One node dict of a structure
+    key is the parent's child key holding the dict (None at the top level) and position
+    its index in that list (None when the key or the structure is the dict itself).
+    """
+    __slots__ = ("data", "parent", "key", "position", "children")
+
+    def __init__(self, data, parent=None, key=None, position=None):
+        self.data = data
+        self.parent = parent
+        self.key = key
+        self.position = position
+        self.children = []
+
+    @property
+    def node_id(self):
+        return self.data.get("node_id")
+
+    @property
+    def is_leaf(self):
+        return not self.data.get(CHILD_KEY)
+
+    def is_held(self, structure):
+        """Whether the dict is still held where it was indexed (its parent is not checked)"""
+        holder = structure if self.parent is None else self.parent.data.get(self.key)
+        if self.position is None:
+            return holder is self.data
+        return isinstance(holder, list) and self.position < len(holder) and holder[self.position] is self.data
+
+    def to_dict(self):
+        """Copy of the node dict, with the children copied the same way"""
+        data = {key: [] if CHILD_KEY in key and isinstance(value, list) else value
+                for key, value in self.data.items()}
+        for child in self.children:
+            if child.position is None:
+                data[child.key] = child.to_dict()
+            else:
+                data[child.key].append(child.to_dict())
+        return data
+
+    def __repr__(self):
+        return f"TreeNode(node_id={self.node_id!r}, title={self.data.get('title')!r}, children={len(self.children)})"
+
+def _push_children(stack, value, parent, key):
+    # Reversed so that the first child is popped first
+    if isinstance(value, dict):
+        stack.append((value, parent, key, None))
+    elif isinstance(value, list):
+        stack.extend((item, parent, key, position) for position, item in reversed(list(enumerate(value)))
+                     if isinstance(item, dict))
+
+class DocTree:
+    """Index of a PageIndex structure (a node dict or a list of them) in preorder"""
+    def __init__(self, structure):
+        self.structure = structure
+        self.roots = []
+        self._preorder = []
+        self._by_id = {}
+        stack = []
+        _push_children(stack, structure, None, None)
+        while stack:
+            data, parent, key, position = stack.pop()
+            node = TreeNode(data, parent, key, position)
+            (parent.children if parent is not None else self.roots).append(node)
+            self._preorder.append(node)
+            self._by_id.setdefault(node.node_id, node)
+            for child_key in reversed([child_key for child_key in data if CHILD_KEY in child_key]):
+                _push_children(stack, data[child_key], node, child_key)
+
+    def to_structure(self):
+        """Copy of the structure in the same shape (a dict or a list of node dicts)"""
+        if isinstance(self.structure, dict):
+            return self.roots[0].to_dict()
+        return [root.to_dict() for root in self.roots]
+
+    def __len__(self):
+        return len(self._preorder)
+
+    def __iter__(self):
+        return iter(self._preorder)
+
+    def nodes(self, leaves_only=False):
+        """
+        The tree's own node dicts in preorder, not copies
+        Children are still under 'nodes'; treat the dicts as read-only views, or copy the
+        few fields you change.
+        """
+        return [node.data for node in self._preorder if not leaves_only or node.is_leaf]
+
+    def get(self, node_id):
+        """First TreeNode in preorder with this node_id, or None"""
+        return self._by_id.get(node_id)
+
+    def parent(self, node_id):
+        node = self._by_id.get(node_id)
+        return node.parent if node is not None else None
+
+    def children(self, node_id):
+        node = self._by_id.get(node_id)
+        return list(node.children) if node is not None else []
+
+    def is_leaf(self, node_id):
+        node = self._by_id.get(node_id)
+        return node is not None and node.is_leaf
+
+    def leaves(self):
+        return [node for node in self._preorder if node.is_leaf]
+
+    def ancestors(self, node_id):
+        """Parent, grandparent, ... up to the top level"""
+        node = self._by_id.get(node_id)
+        result = []
+        while node is not None and node.parent is not None:
+            node = node.parent
+            result.append(node)
+        return result
+
+    def holds(self, node):
+        """Whether the node and all its ancestors are still held where they were indexed"""
+        while node is not None:
+            if not node.is_held(self.structure):
+                return False
+            node = node.parent
+        return True
+
+def node_without_children(node):
+    """Shallow copy of a node dict without its 'nodes' list (field values are shared)"""
+    return {key: value for key, value in node.items() if key != CHILD_KEY}
+
+_tree_cache = IdentityCache(INDEX_CACHE_SIZE)
+
+def find_node_by_id(structure, node_id):
+    """
+    Node dict with the given node_id in a structure, or None
+    The DocTrees of the last few structures queried are kept, so repeated lookups in the
+    same tree are O(depth); the tree is re-indexed when the node was removed, replaced or
+    renumbered.
+    """
+    tree = _tree_cache.get(structure)
+    node = tree.get(node_id) if tree is not None else None
+    if node is None or node.node_id != node_id or not tree.holds(node):
+        tree = DocTree(structure)
+        _tree_cache.put(structure, tree)
+        node = tree.get(node_id)
+    return node.data if node is not None else None
@@ -0,0 +1,154 @@
+"""
+Shared HTTP clients for PageIndex LLM adapters
+Keeps connections alive across prompts so each call does not pay a fresh TCP+TLS handshake.
+The sync client is process-wide; async clients are native (no thread pool) and one per event loop.
+"""
+
+import asyncio
+import threading
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+    HAS_HTTPX = True
+except ImportError:
+    HAS_HTTPX = False
+
+try:
+    import h2  # noqa: F401 - httpx needs h2 installed to negotiate HTTP/2
+    HAS_HTTP2 = HAS_HTTPX
+except ImportError:
+    HAS_HTTP2 = False
+
+try:
+    import aiohttp
+    HAS_AIOHTTP = True
+except ImportError:
+    HAS_AIOHTTP = False
+
+# Default pool size matches the default asyncio executor (min(32, cpu + 4) threads)
+DEFAULT_POOL_SIZE = 32
+DEFAULT_TIMEOUT = 120
+
+_client = None
+_client_lock = threading.Lock()
+_client_options = {
+    "pool_size": DEFAULT_POOL_SIZE,
+    "http2": True,
+}
+
+class LLMAPIError(Exception):
+    """Non-200 answer from an LLM endpoint; keeps the HTTP status and headers for retry/backoff decisions"""
+    def __init__(self, message, status_code=None, headers=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.headers = headers
+
+# One async client per event loop; entries vanish when the loop is garbage collected
+_async_clients = weakref.WeakKeyDictionary()
+
+def _create_client(pool_size, http2):
+    """Build a keep-alive client, preferring httpx with HTTP/2 when available"""
+    if http2 and HAS_HTTP2:
+        limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+        )
+        return httpx.Client(http2=True, limits=limits, timeout=DEFAULT_TIMEOUT)
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def configure_http_client(pool_size=None, http2=None):
+    """Change pool options; the shared client is rebuilt on next use"""
+    global _client
+    with _client_lock:
+        if pool_size is not None:
+            _client_options["pool_size"] = max(1, int(pool_size))
+        if http2 is not None:
+            _client_options["http2"] = bool(http2)
+        if _client is not None:
+            _client.close()
+            _client = None
+
+def get_http_client():
+    """Return the process-wide pooled HTTP client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _create_client(**_client_options)
+    return _client
+
+def close_http_client():
+    """Close the shared client and release its pooled connections"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+class AsyncHTTPClient:
+    """
+    Minimal async JSON POST client backed by aiohttp.ClientSession or httpx.AsyncClient
+    aiohttp is preferred: httpx's async pool degrades badly with hundreds of concurrent requests
+    """
+    def __init__(self, pool_size, http2):
+        if HAS_AIOHTTP:
+            self._client = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=pool_size),
+                timeout=aiohttp.ClientTimeout(total=DEFAULT_TIMEOUT),
+            )
+            self.backend = "aiohttp"
+        elif HAS_HTTPX:
+            limits = httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+            )
+            self._client = httpx.AsyncClient(
+                http2=http2 and HAS_HTTP2,
+                limits=limits,
+                timeout=DEFAULT_TIMEOUT,
+            )
+            self.backend = "httpx"
+        else:
+            raise ImportError("Native async transport requires aiohttp or httpx")
+
+    async def post_json(self, url, payload, headers=None, params=None):
+        """POST a JSON payload and return (status_code, response_headers, response_text)"""
+        if self.backend == "httpx":
+            response = await self._client.post(url, json=payload, headers=headers, params=params)
+            return response.status_code, response.headers, response.text
+        async with self._client.post(url, json=payload, headers=headers, params=params) as response:
+            return response.status, response.headers.copy(), await response.text()
+
+    async def aclose(self):
+        if self.backend == "httpx":
+            await self._client.aclose()
+        else:
+            await self._client.close()
+
+async def _close_on_loop_shutdown(client):
+    """Async generator parked at yield; asyncio.run() finalizes it in shutdown_asyncgens"""
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+async def get_async_http_client():
+    """Return the async client bound to the running event loop, creating it on first use"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = AsyncHTTPClient(_client_options["pool_size"], _client_options["http2"])
+        # Keep a reference so the closer is only finalized when the loop shuts down
+        client._closer = _close_on_loop_shutdown(client)
+        await client._closer.__anext__()
+        _async_clients[loop] = client
+    return client
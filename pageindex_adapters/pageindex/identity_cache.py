@@ -0,0 +1,51 @@
+"""
+Identity-keyed LRU cache
+The adapters keep small per-document indexes (node_id index of a tree, title index and
+checkpoint hash of a page list) keyed on the object they were built from. Lists and dicts
+are neither hashable nor weakly referenceable, so IdentityCache keys them by id() and holds
+the key itself, which keeps the id from being reused while the entry exists. Every cache is
+bounded, and clear_identity_caches() empties all of them; the runners call it at the end of
+each document so no document is kept alive by a cache after it is done.
+"""
+
+import threading
+import weakref
+from collections import OrderedDict
+
+_caches = weakref.WeakSet()
+
+class IdentityCache:
+    """LRU cache of at most size entries keyed on the identity of the key object"""
+    def __init__(self, size=8):
+        self.size = size
+        self._entries = OrderedDict()  # id(key) -> (key, value), least recently used first
+        self._lock = threading.Lock()
+        _caches.add(self)
+
+    def get(self, key):
+        """Value stored for this very object, or None"""
+        with self._lock:
+            entry = self._entries.get(id(key))
+            if entry is None or entry[0] is not key:
+                return None
+            self._entries.move_to_end(id(key))
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[id(key)] = (key, value)
+            self._entries.move_to_end(id(key))
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+def clear_identity_caches():
+    """Drop the entries of every IdentityCache (call at the end of each document)"""
+    for cache in list(_caches):
+        cache.clear()
@@ -0,0 +1,194 @@
+"""
+JSON extraction from LLM responses
+One left-to-right scan locates the outermost object or array (inside a ```json fence if
+there is one) and repairs what models commonly get wrong while copying it: trailing
+commas, Python literals (None/True/False) outside strings, raw newlines and control
+characters inside strings, single-quoted strings, and a response cut off before its
+closing brackets. String values are never rewritten otherwise. A well-formed response
+is handed straight to json.loads; only one that fails is scanned. When nothing can be
+recovered, the result is a JsonExtractionError: an empty (falsy) dict, so callers that
+expect {} keep working, carrying the parse error for logging.
+"""
+
+import json
+import re
+
+LITERALS = {"None": "null", "True": "true", "False": "false", "NaN": "null"}
+CLOSERS = {"{": "}", "[": "]"}
+
+# Runs that are copied unchanged: outside strings, inside "..." and inside '...'
+_PLAIN_RUN = re.compile(r"[^\"'{}\[\],:A-Za-z_]+")
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_DOUBLE_QUOTED_RUN = re.compile(r"[^\"\\\x00-\x1f]+")
+_SINGLE_QUOTED_RUN = re.compile(r"[^'\"\\\x00-\x1f]+")
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+
+class JsonExtractionError(dict):
+    """Empty dict returned when no JSON could be recovered; carries the error"""
+    def __init__(self, message, position=None, snippet=""):
+        super().__init__()
+        self.message = message
+        self.position = position
+        self.snippet = snippet
+
+    def __repr__(self):
+        return f"JsonExtractionError({self.message!r}, position={self.position})"
+
+def _json_start(content):
+    """Offsets of the first '{' and '[' (after a ```json fence, if any), in order"""
+    fence = content.find("```json")
+    begin = fence + 7 if fence != -1 else 0
+    starts = [content.find(opener, begin) for opener in CLOSERS]
+    return sorted(start for start in starts if start != -1)
+
+def _drop_trailing_comma(out):
+    end = len(out)
+    while end and not out[end - 1].strip():
+        end -= 1
+    if end and out[end - 1] == ",":
+        del out[end - 1:]
+        return True
+    return False
+
+def _close(out, stack):
+    """Finish a truncated document: drop a dangling comma, fill a missing value, close brackets"""
+    _drop_trailing_comma(out)
+    end = len(out)
+    while end and not out[end - 1].strip():
+        end -= 1
+    if end and out[end - 1] == ":":
+        out.append("null")
+    out.extend(CLOSERS[opener] for opener in reversed(stack))
+    return "".join(out)
+
+def repair_json(content, start=0):
+    """
+    Scan content from start (an opening bracket) to the matching closer
+    Returns (candidates, repairs): repaired JSON texts to try in order, and the names of
+    the repairs applied.
+    """
+    out, stack, repairs = [], [], []
+    opened_at = []  # len(out) where each open bracket in stack starts
+    safe_point = None  # (len(out), stack) after the last complete element: where to cut a truncated response
+    in_string, quote = False, '"'
+    i, n = start, len(content)
+    while i < n:
+        ch = content[i]
+        if in_string:
+            run = (_DOUBLE_QUOTED_RUN if quote == '"' else _SINGLE_QUOTED_RUN).match(content, i)
+            if run:
+                out.append(run.group())
+                i = run.end()
+                continue
+            if ch == "\\":
+                escaped = content[i:i + 2]
+                if escaped == "\\'":
+                    out.append("'")
+                elif len(escaped) == 2:
+                    out.append(escaped)
+                i += 2
+            elif ch == quote:
+                out.append('"')
+                in_string = False
+                i += 1
+            elif ch == '"':
+                out.append('\\"')
+                i += 1
+            else:
+                out.append(_CONTROL_ESCAPES.get(ch, f"\\u{ord(ch):04x}"))
+                repairs.append("control character in string")
+                i += 1
+            continue
+
+        run = _PLAIN_RUN.match(content, i)
+        if run:
+            out.append(run.group())
+            i = run.end()
+            continue
+        if ch in "\"'":
+            if ch == "'":
+                repairs.append("single-quoted string")
+            in_string, quote = True, ch
+            out.append('"')
+        elif ch in CLOSERS:
+            stack.append(ch)
+            opened_at.append(len(out))
+            out.append(ch)
+        elif ch in "}]":
+            if _drop_trailing_comma(out):
+                repairs.append("trailing comma")
+            if not stack:
+                break
+            opener = stack.pop()
+            opened_at.pop()
+            if CLOSERS[opener] != ch:
+                repairs.append("mismatched bracket")
+            out.append(CLOSERS[opener])
+            if not stack:
+                return ["".join(out)], repairs
+            safe_point = (len(out), list(stack))
+        elif ch == ",":
+            safe_point = (len(out), list(stack))
+            out.append(",")
+        elif ch == ":":
+            out.append(":")
+        else:
+            word = _WORD.match(content, i).group()
+            i += len(word)
+            if word in LITERALS:
+                repairs.append(f"{word} literal")
+            out.append(LITERALS.get(word, word))
+            continue
+        i += 1
+
+    # Ran out of input with brackets still open: the response was truncated. Prefer dropping
+    # the unfinished object of an array (a half-written TOC entry), then the partial last
+    # element; keep the partial element (string closed, missing value null) if both fail.
+    repairs.append("truncated")
+    candidates = []
+    for depth in range(len(stack) - 1, 0, -1):
+        if stack[depth] == "{" and stack[depth - 1] == "[":
+            candidates.append(_close(out[:opened_at[depth]], stack[:depth]))
+            break
+    if safe_point is not None:
+        cut, safe_stack = safe_point
+        candidates.append(_close(out[:cut], safe_stack))
+    if in_string:
+        out.append('"')
+    candidates.append(_close(out, stack))
+    return candidates, repairs
+
+def extract_json_with_repairs(content):
+    """(value, repairs) for an LLM response; value is a JsonExtractionError on failure"""
+    content = str(content or "")
+    error = None
+    for start in _json_start(content):
+        # Well-formed responses are parsed by json.loads directly, at C speed
+        end = content.rfind(CLOSERS[content[start]])
+        if end > start:
+            try:
+                return json.loads(content[start:end + 1]), []
+            except json.JSONDecodeError:
+                pass
+        candidates, repairs = repair_json(content, start)
+        for candidate in candidates:
+            try:
+                return json.loads(candidate), repairs
+            except json.JSONDecodeError as e:
+                if error is None:
+                    error = JsonExtractionError(e.msg, e.pos, candidate[max(e.pos - 40, 0):e.pos + 40])
+
+    if error is None:
+        # No object or array: accept a bare JSON scalar, as json.loads would
+        fence = content.find("```json")
+        body = content[fence + 7:] if fence != -1 else content
+        body = body.split("```")[0].strip()
+        try:
+            return json.loads(body), []
+        except json.JSONDecodeError:
+            error = JsonExtractionError("no JSON object or array found", None, body[:80])
+    return error, []
+
+def extract_json(content):
+    """Parsed JSON value of an LLM response, or a (falsy) JsonExtractionError"""
+    return extract_json_with_repairs(content)[0]
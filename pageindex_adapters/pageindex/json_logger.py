@@ -0,0 +1,142 @@
+"""
+Append-only JSON Lines logger for PageIndex runs
+Each log() call appends one line to logs/<pdf_name>_<time>.jsonl through a buffered
+handle, so a run costs O(entries) instead of rewriting the whole file every time.
+The file is fsynced periodically and on close; with background=True a writer thread
+takes file I/O off the calling thread. read_json_log() also reads the old
+JSON-array logs (<pdf_name>_<time>.json), and convert_json_log() rewrites them as JSONL.
+
+Usage: python json_logger.py logs/old_log.json [...]
+"""
+
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import weakref
+from datetime import datetime
+
+DEFAULT_LOG_DIR = "logs"
+DEFAULT_BUFFER_SIZE = 64 * 1024
+DEFAULT_FSYNC_INTERVAL = 5.0
+
+_open_loggers = weakref.WeakSet()
+
+class JsonLogger:
+    """Logger that appends JSON Lines records to a file"""
+    def __init__(self, file_path, log_dir=DEFAULT_LOG_DIR, fsync_interval=DEFAULT_FSYNC_INTERVAL,
+                 background=False):
+        pdf_name = file_path if isinstance(file_path, str) else 'Untitled'
+        if isinstance(file_path, str):
+            pdf_name = os.path.basename(file_path)
+
+        current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.filename = f"{pdf_name}_{current_time}.jsonl"
+        self.log_dir = log_dir
+        self.fsync_interval = fsync_interval
+        os.makedirs(log_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._file = open(self._filepath(), "a", encoding="utf-8", buffering=DEFAULT_BUFFER_SIZE)
+        self._last_fsync = time.monotonic()
+        self._queue = None
+        self._writer = None
+        if background:
+            self._queue = queue.SimpleQueue()
+            self._writer = threading.Thread(target=self._drain, name=f"JsonLogger-{pdf_name}", daemon=True)
+            self._writer.start()
+        _open_loggers.add(self)
+
+    def log(self, level, message, **kwargs):
+        record = message if isinstance(message, dict) else {'message': message}
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        if self._queue is not None:
+            self._queue.put(line)
+        else:
+            self._write(line)
+
+    def info(self, message, **kwargs):
+        self.log("INFO", message, **kwargs)
+
+    def error(self, message, **kwargs):
+        self.log("ERROR", message, **kwargs)
+
+    def debug(self, message, **kwargs):
+        self.log("DEBUG", message, **kwargs)
+
+    def exception(self, message, **kwargs):
+        kwargs["exception"] = True
+        self.log("ERROR", message, **kwargs)
+
+    def _write(self, line):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(line)
+            if time.monotonic() - self._last_fsync >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_fsync = time.monotonic()
+
+    def _drain(self):
+        while True:
+            line = self._queue.get()
+            if line is None:
+                return
+            self._write(line)
+
+    def flush(self):
+        """Write buffered records and fsync (records still queued for the writer thread are not waited for)"""
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+
+    def close(self):
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+        _open_loggers.discard(self)
+
+    def _filepath(self):
+        return os.path.join(self.log_dir, self.filename)
+
+@atexit.register
+def _close_open_loggers():
+    for logger in list(_open_loggers):
+        logger.close()
+
+def read_json_log(path):
+    """Records of a JSONL log, or of an old-format log holding a single JSON array"""
+    with open(path, encoding="utf-8") as f:
+        first = f.read(1)
+        while first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == "[":
+            return json.load(f)
+        return [json.loads(line) for line in f if line.strip()]
+
+def convert_json_log(path, output_path=None):
+    """Rewrite an old JSON-array log as JSON Lines; returns the new path"""
+    records = read_json_log(path)
+    if output_path is None:
+        output_path = os.path.splitext(path)[0] + ".jsonl"
+    with open(output_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    return output_path
+
+if __name__ == "__main__":
+    for old_path in sys.argv[1:]:
+        print(f"{old_path} -> {convert_json_log(old_path)}")
@@ -0,0 +1,287 @@
+"""
+Request scheduler for PageIndex LLM adapters
+Bounds in-flight requests, enforces requests/min and tokens/min budgets and backs off
+(AIMD) when the provider answers 429/503. Shared by sync callers and every event loop.
+
+Callers that cannot be admitted at once queue up and are admitted in arrival order:
+release() hands freed slots to the queue, and a timer retries the head of the queue
+when it is waiting for rpm/tpm budget. Async waiters await a future, sync waiters block
+on an event; nobody polls.
+
+Upstream calls the sync ChatGPT_API from inside coroutines, which blocks that event loop
+for the whole call. Such a call is held to the same limits, but when every slot in flight
+belongs to its own (now blocked) loop it could never be admitted: it fails at once with
+SchedulerDeadlockError instead of hanging.
+"""
+
+import asyncio
+import collections
+import threading
+import time
+
+DEFAULT_MAX_CONCURRENCY = 16
+THROTTLE_STATUS_CODES = (429, 503)
+
+class SchedulerDeadlockError(RuntimeError):
+    """A sync call on an event loop thread waits for slots only that loop can free"""
+
+class TokenBucket:
+    """Continuously refilled token bucket sized to one minute of budget"""
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` tokens are available (0 if they are available now)"""
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+def get_status_code(error):
+    """Best-effort HTTP status of an adapter or SDK exception"""
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        response = getattr(error, "response", None)
+        status_code = getattr(response, "status_code", None)
+    return status_code
+
+def is_throttle_error(error):
+    return get_status_code(error) in THROTTLE_STATUS_CODES
+
+class RequestScheduler:
+    """
+    Admission control for LLM calls
+    - at most `limit` requests in flight, where limit adapts between min and max concurrency
+      (additive increase on success, multiplicative decrease on 429/503)
+    - optional token buckets for requests per minute (rpm) and tokens per minute (tpm)
+    """
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY, rpm=None, tpm=None,
+                 min_concurrency=1, decrease_factor=0.5, decrease_cooldown=2.0):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.min_concurrency = max(1, min(int(min_concurrency), self.max_concurrency))
+        self.limit = float(self.max_concurrency)
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.request_bucket = TokenBucket(rpm) if rpm else None
+        self.token_bucket = TokenBucket(tpm) if tpm else None
+
+        self.in_flight = 0
+        self.throttled = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self._waiters = collections.deque()
+        self._held = {}  # event loop -> slots held by its coroutines and sync calls
+        self._blocked = {}  # event loop -> queued sync calls made on its thread
+        self._timer = None
+
+    @property
+    def tracks_tokens(self):
+        """Whether callers need to pass a token cost (skip tokenizing prompts otherwise)"""
+        return self.token_bucket is not None
+
+    def _admit(self, cost, loop):
+        """Take a slot and budget; None if no slot is free, else seconds of budget to wait (0: admitted)"""
+        if self.in_flight >= int(self.limit):
+            return None
+        now = time.monotonic()
+        wait = 0.0
+        if self.request_bucket:
+            self.request_bucket.refill(now)
+            wait = max(wait, self.request_bucket.wait_time(1))
+        if self.token_bucket:
+            self.token_bucket.refill(now)
+            wait = max(wait, self.token_bucket.wait_time(cost))
+        if wait > 0:
+            return wait
+
+        if self.request_bucket:
+            self.request_bucket.take(1)
+        if self.token_bucket:
+            self.token_bucket.take(cost)
+        self.in_flight += 1
+        if loop is not None:
+            self._held[loop] = self._held.get(loop, 0) + 1
+        return 0.0
+
+    def _free(self, loop):
+        self.in_flight -= 1
+        if loop is not None:
+            self._held[loop] -= 1
+            if not self._held[loop]:
+                del self._held[loop]
+
+    def _dispatch(self):
+        """Admit queued waiters in order while slots and budget last (lock held)"""
+        index = 0
+        while index < len(self._waiters):
+            waiter = self._waiters[index]
+            if waiter.future is not None and waiter.loop in self._blocked:
+                index += 1  # its loop is stuck in a sync call and could not use the slot
+                continue
+            wait = self._admit(waiter.cost, waiter.loop)
+            if wait is None:
+                self._fail_deadlocked()
+                return  # release() dispatches again
+            if wait > 0:
+                if self._timer is None:
+                    self._timer = threading.Timer(wait, self._on_timer)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+            del self._waiters[index]
+            self._unblock(waiter)
+            if not waiter.wake():
+                self._free(waiter.loop)  # its event loop is gone
+
+    def _unblock(self, waiter):
+        if waiter.future is None and waiter.loop is not None:
+            self._blocked[waiter.loop] -= 1
+            if not self._blocked[waiter.loop]:
+                del self._blocked[waiter.loop]
+
+    def _fail_deadlocked(self):
+        """Fail sync waiters whose own blocked loop holds every slot in flight"""
+        for loop in [loop for loop in self._blocked if self._held.get(loop, 0) >= self.in_flight]:
+            for waiter in [waiter for waiter in self._waiters if waiter.future is None and waiter.loop is loop]:
+                self._waiters.remove(waiter)
+                self._unblock(waiter)
+                waiter.fail(SchedulerDeadlockError(
+                    "sync LLM call on an event loop thread while that loop holds every request slot; "
+                    "use the async API"))
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+            self._dispatch()
+
+    def acquire(self, cost=0):
+        loop = _running_loop()
+        with self._lock:
+            if not self._waiters and self._admit(cost, loop) == 0:
+                return
+            waiter = _Waiter(cost, loop)
+            self._waiters.append(waiter)
+            if loop is not None:
+                self._blocked[loop] = self._blocked.get(loop, 0) + 1
+            self._dispatch()
+        waiter.event.wait()
+        if waiter.error is not None:
+            raise waiter.error
+
+    async def acquire_async(self, cost=0):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if not self._waiters and self._admit(cost, loop) == 0:
+                return
+            waiter = _Waiter(cost, loop, loop.create_future())
+            self._waiters.append(waiter)
+            self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.admitted:
+                    self._free(loop)
+                    self._dispatch()
+                else:
+                    self._waiters.remove(waiter)
+            raise
+
+    def release(self, error=None):
+        """Free a slot, adapt the concurrency limit to the outcome of the call and admit waiters"""
+        loop = _running_loop()
+        with self._lock:
+            self._free(loop)
+            if error is not None and is_throttle_error(error):
+                self.throttled += 1
+                now = time.monotonic()
+                # One decrease per congestion event, not one per concurrent failure
+                if now - self._last_decrease >= self.decrease_cooldown:
+                    self.limit = max(self.min_concurrency, self.limit * self.decrease_factor)
+                    self._last_decrease = now
+            elif error is None:
+                self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+            self._dispatch()
+
+    def run(self, func, cost=0):
+        """Call func() once admitted"""
+        self.acquire(cost)
+        error = None
+        try:
+            return func()
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.release(error)
+
+    async def run_async(self, coro_func, cost=0):
+        """Await coro_func() once admitted"""
+        await self.acquire_async(cost)
+        error = None
+        try:
+            return await coro_func()
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.release(error)
+
+class _Waiter:
+    """A queued acquire: an async one resolves its future, a sync one sets its event"""
+    __slots__ = ("cost", "loop", "future", "event", "admitted", "error")
+
+    def __init__(self, cost, loop, future=None):
+        self.cost = cost
+        self.loop = loop
+        self.future = future
+        self.event = threading.Event() if future is None else None
+        self.admitted = False
+        self.error = None
+
+    def fail(self, error):
+        self.error = error
+        self.event.set()
+
+    def wake(self):
+        """Hand the slot over; False if the waiter's event loop is closed"""
+        self.admitted = True
+        if self.future is None:
+            self.event.set()
+            return True
+        try:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+        except RuntimeError:
+            return False
+        return True
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+_scheduler = RequestScheduler()
+
+def configure_scheduler(max_concurrency=DEFAULT_MAX_CONCURRENCY, rpm=None, tpm=None):
+    """Replace the process-wide scheduler used by all ChatGPT_API* entry points"""
+    global _scheduler
+    _scheduler = RequestScheduler(max_concurrency=max_concurrency, rpm=rpm, tpm=tpm)
+    return _scheduler
+
+def get_scheduler():
+    return _scheduler
@@ -0,0 +1,160 @@
+"""
+Outline-first tree building
+3GPP/ETSI specs carry complete multi-level bookmarks, so the PageIndex tree can be read
+from the PDF outline instead of detecting, transforming and verifying the table of
+contents with the LLM. The outline is turned into the same flat TOC items the LLM path
+produces (structure, title, physical_index, appear_start) and finished by the adapter's
+own add_preface_if_needed/post_processing, so start_index/end_index follow the usual
+PageIndex rules. appear_start is decided locally: the title counts as starting its page
+when it follows directly after the running page header (page numbers and other digits
+are ignored when comparing).
+
+install_outline_first() wraps tree_parser of a loaded page_index module: documents whose
+outline is missing or fails check_outline() go through the original LLM pipeline. The
+outcome is sent to the run logger and kept per document for the runners to print
+(get_outline_outcome()); library code does not print.
+Oversized nodes are not split further in outline mode; bookmarks are already fine-grained.
+"""
+
+import functools
+import os
+import re
+import statistics
+import threading
+
+import pymupdf
+
+MIN_OUTLINE_ENTRIES = 3
+MIN_ORDERED_RATIO = 0.95
+MIN_TITLE_HIT_RATIO = 0.6
+TITLE_SAMPLE_SIZE = 30
+TITLE_MATCH_CHARS = 50
+HEADER_SAMPLE_PAGES = 11
+HEADER_SLACK = 20
+
+_DIGITS = re.compile(r"\d")
+
+_outcomes = {}
+_outcomes_lock = threading.Lock()
+
+def normalize(text):
+    return " ".join(str(text).split()).lower()
+
+def read_outline(doc):
+    """[(level, title, page), ...] of a PDF path or BytesIO; pages are 1-based"""
+    if isinstance(doc, str):
+        pdf = pymupdf.open(doc)
+    else:
+        pdf = pymupdf.open(stream=doc.getvalue(), filetype="pdf")
+    with pdf:
+        return [(level, title.strip(), page) for level, title, page in pdf.get_toc(simple=True)
+                if page >= 1 and title.strip()]
+
+def strip_digits(text):
+    return _DIGITS.sub("", normalize(text))
+
+def header_length(page_texts):
+    """Length of the running header (in strip_digits text): median prefix shared by pages spread over the document"""
+    step = max(len(page_texts) // HEADER_SAMPLE_PAGES, 1)
+    samples = [strip_digits(text) for text in page_texts[::step] if text.strip()]
+    if len(samples) < 2:
+        return 0
+    return int(statistics.median(len(os.path.commonprefix(pair)) for pair in zip(samples, samples[1:])))
+
+def starts_page(title, page_text, header):
+    """Whether the title directly follows the running header of the page"""
+    title = strip_digits(title)[:TITLE_MATCH_CHARS].strip()
+    return bool(title) and strip_digits(page_text).find(title, 0, header + len(title) + HEADER_SLACK) != -1
+
+def title_position(title, page_text):
+    """Offset of the title in the normalized page text, or -1"""
+    return normalize(page_text).find(normalize(title)[:TITLE_MATCH_CHARS])
+
+def check_outline(outline, page_texts):
+    """(ok, reason): whether the outline is complete and consistent enough to trust"""
+    if len(outline) < MIN_OUTLINE_ENTRIES:
+        return False, f"outline has {len(outline)} entries"
+    total_pages = len(page_texts)
+    if any(page > total_pages for _, _, page in outline):
+        return False, "outline points past the last page"
+    ordered = sum(prev[2] <= item[2] for prev, item in zip(outline, outline[1:]))
+    if ordered < MIN_ORDERED_RATIO * (len(outline) - 1):
+        return False, "outline pages are out of order"
+
+    step = max(len(outline) // TITLE_SAMPLE_SIZE, 1)
+    sample = outline[::step]
+    hits = sum(
+        any(title_position(title, page_texts[p - 1]) != -1 for p in (page, page + 1) if p <= total_pages)
+        for _, title, page in sample
+    )
+    if hits < MIN_TITLE_HIT_RATIO * len(sample):
+        return False, f"only {hits}/{len(sample)} sampled titles found on their pages"
+    return True, f"{len(outline)} entries, {hits}/{len(sample)} sampled titles found"
+
+def outline_to_toc_items(outline, page_texts):
+    """Flat TOC items (structure like '5.4.1', title, physical_index, appear_start) from the outline"""
+    header = header_length(page_texts)
+    counters = []
+    items = []
+    for level, title, page in outline:
+        depth = min(level, len(counters) + 1)
+        del counters[depth:]
+        if len(counters) < depth:
+            counters.append(0)
+        counters[depth - 1] += 1
+        # A title sharing its page with the previous entry cannot start that page
+        appear_start = (not items or items[-1]["physical_index"] != page) and starts_page(title, page_texts[page - 1], header)
+        items.append({
+            "structure": ".".join(map(str, counters)),
+            "title": title,
+            "physical_index": page,
+            "appear_start": "yes" if appear_start else "no",
+        })
+    return items
+
+def build_outline_tree(doc, page_list, page_index_module):
+    """(structure, reason): the PageIndex tree from the PDF outline, or (None, reason)"""
+    try:
+        outline = read_outline(doc)
+    except Exception as e:
+        return None, f"cannot read outline: {e}"
+    page_texts = [str(page[0]) for page in page_list]
+    ok, reason = check_outline(outline, page_texts)
+    if not ok:
+        return None, reason
+    items = page_index_module.add_preface_if_needed(outline_to_toc_items(outline, page_texts))
+    return page_index_module.post_processing(items, len(page_list)), reason
+
+def _document_name(doc):
+    return os.path.abspath(doc) if isinstance(doc, str) else f"<stream {id(doc):x}>"
+
+def get_outline_outcome(doc):
+    """{'outline_first': bool, 'reason': str} of the last tree_parser call for a document, or None"""
+    with _outcomes_lock:
+        outcome = _outcomes.get(_document_name(doc))
+        return dict(outcome) if outcome else None
+
+def format_outline_outcome(outcome):
+    if outcome["outline_first"]:
+        return f"tree built from the PDF outline ({outcome['reason']})"
+    return f"outline not usable ({outcome['reason']}); TOC detected with the LLM"
+
+def install_outline_first(page_index_module):
+    """Build trees from the PDF outline when it passes check_outline(), else call tree_parser"""
+    tree_parser = page_index_module.tree_parser
+
+    @functools.wraps(tree_parser)
+    async def outline_first_tree_parser(page_list, opt, doc=None, logger=None):
+        structure, reason = build_outline_tree(doc, page_list, page_index_module) if doc is not None else (None, "no document")
+        outcome = {"outline_first": structure is not None, "reason": reason}
+        if doc is not None:
+            with _outcomes_lock:
+                _outcomes[_document_name(doc)] = outcome
+        if logger is not None:
+            logger.info(outcome)
+        if structure is not None:
+            return structure
+        return await tree_parser(page_list, opt, doc=doc, logger=logger)
+
+    page_index_module.tree_parser = outline_first_tree_parser
+    return outline_first_tree_parser
@@ -0,0 +1,170 @@
+"""
+Persistent cache of extracted PDF pages
+Page texts are keyed by (sha256 of the file, parser) and tagged with the parser version;
+token counts are stored separately per tokenizer. A parser upgrade drops only that
+parser's pages for that file, and a tokenizer change keeps the texts and recounts tokens,
+so an unchanged PDF is loaded on later runs without being parsed at all.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import PyPDF2
+import pymupdf
+
+DEFAULT_CACHE_DIR = ".llm_cache"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+PARSER_VERSIONS = {
+    "PyPDF2": f"PyPDF2-{PyPDF2.__version__}",
+    "PyMuPDF": f"PyMuPDF-{pymupdf.VersionBind}",
+}
+
+def cache_parser_name(parser):
+    """Parsers that produce identical text share cache entries"""
+    return "PyMuPDF" if parser == "PyMuPDF-parallel" else parser
+
+def hash_pdf_source(source):
+    """sha256 hex digest of a PDF path or BytesIO"""
+    digest = hashlib.sha256()
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    else:
+        digest.update(source.getbuffer())
+    return digest.hexdigest()
+
+class PageCache:
+    """SQLite store of (page_text, token_length) lists"""
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "pages.sqlite")
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS extractions ("
+            "file_sha TEXT NOT NULL, parser TEXT NOT NULL, parser_version TEXT NOT NULL, "
+            "num_pages INTEGER NOT NULL, created REAL NOT NULL, PRIMARY KEY (file_sha, parser));"
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "file_sha TEXT NOT NULL, parser TEXT NOT NULL, page INTEGER NOT NULL, text TEXT NOT NULL, "
+            "PRIMARY KEY (file_sha, parser, page));"
+            "CREATE TABLE IF NOT EXISTS page_tokens ("
+            "file_sha TEXT NOT NULL, parser TEXT NOT NULL, tokenizer TEXT NOT NULL, page INTEGER NOT NULL, "
+            "tokens INTEGER NOT NULL, PRIMARY KEY (file_sha, parser, tokenizer, page));"
+        )
+
+    def load(self, file_sha, parser, tokenizer):
+        """
+        Return (texts, tokens) for a cached extraction, or None
+        tokens is None when the texts are cached but were counted with a different tokenizer.
+        An entry written by another version of the parser is dropped.
+        """
+        parser = cache_parser_name(parser)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT parser_version, num_pages FROM extractions WHERE file_sha = ? AND parser = ?",
+                (file_sha, parser),
+            ).fetchone()
+            if row is not None and row[0] != PARSER_VERSIONS[parser]:
+                self._invalidate(file_sha, parser)
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            texts = [text for (text,) in self._conn.execute(
+                "SELECT text FROM pages WHERE file_sha = ? AND parser = ? ORDER BY page", (file_sha, parser))]
+            tokens = [count for (count,) in self._conn.execute(
+                "SELECT tokens FROM page_tokens WHERE file_sha = ? AND parser = ? AND tokenizer = ? ORDER BY page",
+                (file_sha, parser, tokenizer))]
+        if len(texts) != row[1]:
+            return None
+        return texts, tokens if len(tokens) == row[1] else None
+
+    def store(self, file_sha, parser, tokenizer, texts, tokens):
+        parser = cache_parser_name(parser)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO extractions VALUES (?, ?, ?, ?, ?)",
+                    (file_sha, parser, PARSER_VERSIONS[parser], len(texts), time.time()),
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)",
+                    [(file_sha, parser, page, text) for page, text in enumerate(texts)],
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO page_tokens VALUES (?, ?, ?, ?, ?)",
+                    [(file_sha, parser, tokenizer, page, count) for page, count in enumerate(tokens)],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def load_tokens(self, file_sha, parser, tokenizer):
+        """Token counts of a cached extraction under another tokenizer key, or None"""
+        parser = cache_parser_name(parser)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT parser_version, num_pages FROM extractions WHERE file_sha = ? AND parser = ?",
+                (file_sha, parser),
+            ).fetchone()
+            if row is None or row[0] != PARSER_VERSIONS[parser]:
+                return None
+            tokens = [count for (count,) in self._conn.execute(
+                "SELECT tokens FROM page_tokens WHERE file_sha = ? AND parser = ? AND tokenizer = ? ORDER BY page",
+                (file_sha, parser, tokenizer))]
+        return tokens if len(tokens) == row[1] else None
+
+    def store_tokens(self, file_sha, parser, tokenizer, tokens):
+        """Add token counts under another tokenizer key to a stored extraction"""
+        parser = cache_parser_name(parser)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO page_tokens VALUES (?, ?, ?, ?, ?)",
+                    [(file_sha, parser, tokenizer, page, count) for page, count in enumerate(tokens)],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _invalidate(self, file_sha, parser):
+        for table in ("extractions", "pages", "page_tokens"):
+            self._conn.execute(f"DELETE FROM {table} WHERE file_sha = ? AND parser = ?", (file_sha, parser))
+
+    def stats(self):
+        with self._lock:
+            documents = self._conn.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "documents": documents}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_cache = None
+
+def configure_page_cache(cache_dir=DEFAULT_CACHE_DIR, enabled=True):
+    """Enable (or disable with enabled=False) the process-wide page cache"""
+    global _cache
+    if _cache is not None:
+        _cache.close()
+    _cache = PageCache(cache_dir) if enabled else None
+    return _cache
+
+def get_page_cache():
+    """The active PageCache, or None when page caching is disabled (the default)"""
+    return _cache
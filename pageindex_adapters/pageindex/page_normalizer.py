@@ -0,0 +1,151 @@
+"""
+Page text normalization
+3GPP/ETSI PDFs repeat the same running header on every page ("ETSI TS 124 501 V18.12.0
+(2025-10)", "3GPP TS 24.501 version 18.12.0 Release 18", the page number), and every
+prompt built from the page list (TOC detection, get_text_of_pdf_pages_with_labels, node
+summaries) carries it once per page. normalize_page_list() runs after get_page_tokens:
+it counts which lines recur among the first and last EDGE_LINES lines of most pages,
+strips them from the page edges, collapses runs of spaces and blank lines, and recounts
+the tokens of changed pages. PdfDocument.get_normalized_page_tokens keeps the result per
+document and stores the normalized token counts in the page cache (under
+normalized_tokenizer_id()), so later calls and runs do not retokenize the document.
+
+Lines are compared with digit runs replaced and whitespace then removed, so page "132"
+matches page "133". A line without letters only counts if it holds a single number: clause
+numbers such as "8.2.4" and bit-number rows such as "8 7 6 5 4 3 2 1" end many pages of some
+chapters but are never boilerplate. In lines with letters, digits separated only by spaces
+form one group, because PyPDF2 sometimes splits the numbers of a header ("1 08", "18.12 .0"). Only an
+unbroken run of such lines at each edge is removed, each recurring line at most once per
+page, so text below the header (a table of bit numbers, say) is kept. A line must recur on
+MIN_PAGE_RATIO of the pages, which leaves table headings repeated on continuation pages alone.
+"""
+
+import os
+import re
+import threading
+from collections import Counter
+
+from .token_counter import count_tokens_batch, tokenizer_id
+
+# Bump when a change to the rules below changes normalized page texts
+NORMALIZER_VERSION = 2
+EDGE_LINES = 5
+MIN_PAGE_RATIO = 0.8
+MIN_PAGES = 3
+
+_WHITESPACE = re.compile(r"\s+")
+_SPACES = re.compile(r"[^\S\n]+")
+_DIGIT_RUN = re.compile(r"\d+")
+_SPACED_DIGIT_RUN = re.compile(r"\d(?:\s*\d)*")
+_LETTER = re.compile(r"[^\W\d_]")
+
+_settings = {"enabled": True}
+_reports = {}
+_reports_lock = threading.Lock()
+
+def configure_page_normalization(enabled=None):
+    """Turn header/footer stripping in get_page_tokens on or off (on by default)"""
+    if enabled is not None:
+        _settings["enabled"] = bool(enabled)
+
+def normalization_enabled():
+    return _settings["enabled"]
+
+def normalized_tokenizer_id():
+    """Page cache tokenizer key of normalized token counts"""
+    return f"{tokenizer_id()}+normalized-v{NORMALIZER_VERSION}"
+
+def line_key(line):
+    """Lowercase line with digit runs replaced by '#', then whitespace removed"""
+    digit_run = _SPACED_DIGIT_RUN if _LETTER.search(line) else _DIGIT_RUN
+    return _WHITESPACE.sub("", digit_run.sub("#", line.lower()))
+
+def page_lines(text):
+    """Non-empty lines of a page with runs of spaces collapsed"""
+    return [line for line in (_SPACES.sub(" ", line).strip() for line in str(text).split("\n")) if line]
+
+def find_boilerplate(pages):
+    """(top keys, bottom keys): line keys that recur at the top/bottom edge of most pages"""
+    top, bottom = Counter(), Counter()
+    for lines in pages:
+        top.update({line_key(line) for line in lines[:EDGE_LINES]})
+        bottom.update({line_key(line) for line in lines[-EDGE_LINES:]})
+    threshold = max(MIN_PAGES, MIN_PAGE_RATIO * len(pages))
+    return ({key for key, count in top.items() if count >= threshold and _may_repeat(key)},
+            {key for key, count in bottom.items() if count >= threshold and _may_repeat(key)})
+
+def _may_repeat(key):
+    """Text lines, or a bare page number ("#", "-#-"); not clause numbers ("#.#.#") or bit rows ("########")"""
+    return _LETTER.search(key) is not None or key.count("#") == 1
+
+def _edge_run(lines, keys):
+    """Length of the run of boilerplate lines at the start of lines (each key once)"""
+    used = set()
+    for count, line in enumerate(lines[:EDGE_LINES]):
+        key = line_key(line)
+        if key not in keys or key in used:
+            return count
+        used.add(key)
+    return min(len(lines), EDGE_LINES)
+
+def strip_boilerplate(lines, top, bottom):
+    """lines without the running header and footer"""
+    start = _edge_run(lines, top)
+    end = len(lines) - _edge_run(lines[start:][::-1], bottom)
+    return lines[start:end]
+
+def normalize_page_list(page_list, model=None, document=None, known_tokens=None):
+    """
+    [(page_text, token_length), ...] with running headers/footers stripped and whitespace
+    collapsed; token counts are recounted for changed pages unless known_tokens (the counts
+    of an earlier normalization of the same pages) is given. The token reduction is recorded
+    under document (see get_normalization_report). Returns page_list unchanged when disabled.
+    """
+    if not _settings["enabled"] or not page_list:
+        return page_list
+    pages = [page_lines(text) for text, _ in page_list]
+    top, bottom = find_boilerplate(pages)
+    texts, lines_removed = [], 0
+    for lines in pages:
+        kept = strip_boilerplate(lines, top, bottom)
+        lines_removed += len(lines) - len(kept)
+        texts.append("\n".join(kept) + "\n" if kept else "")
+
+    if known_tokens is not None and len(known_tokens) == len(page_list):
+        tokens = list(known_tokens)
+    else:
+        changed = [index for index, (text, (original, _)) in enumerate(zip(texts, page_list)) if text != original]
+        tokens = [token_length for _, token_length in page_list]
+        for index, count in zip(changed, count_tokens_batch([texts[index] for index in changed], model)):
+            tokens[index] = count
+
+    if document is not None:
+        report = {
+            "pages": len(page_list),
+            "tokens_before": sum(token_length for _, token_length in page_list),
+            "tokens_after": sum(tokens),
+            "lines_removed": lines_removed,
+        }
+        with _reports_lock:
+            _reports[_document_name(document)] = report
+    return list(zip(texts, tokens))
+
+def _document_name(document):
+    return os.path.abspath(document) if isinstance(document, str) else f"<stream {id(document):x}>"
+
+def get_normalization_report(document):
+    """{'pages', 'tokens_before', 'tokens_after', 'lines_removed'} of a normalized document, or None"""
+    with _reports_lock:
+        report = _reports.get(_document_name(document))
+        return dict(report) if report else None
+
+def get_normalization_reports():
+    """Reports of every document normalized in this process, by absolute path"""
+    with _reports_lock:
+        return {name: dict(report) for name, report in _reports.items()}
+
+def format_report(report):
+    before, after = report["tokens_before"], report["tokens_after"]
+    saved = (before - after) / before if before else 0.0
+    return (f"{before:,} -> {after:,} tokens ({saved:.1%} fewer), "
+            f"{report['lines_removed']:,} header/footer lines removed from {report['pages']} pages")
@@ -0,0 +1,276 @@
+"""
+Single-open PDF handle for PageIndex
+A PdfDocument parses its file once (memory-mapped for PyPDF2), then extracts page text
+and token counts lazily and keeps them. open_pdf_document() hands out documents from a
+small process-wide LRU so repeated get_page_tokens/get_text_of_pages/... calls on the
+same PDF never re-parse it. With a page cache configured (page_cache.py), a PDF that was
+extracted before is not parsed at all.
+The "PyMuPDF-parallel" parser shards page ranges across a process pool for the initial
+full-document extraction; every worker opens its own PyMuPDF handle and counts tokens.
+"""
+
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import PyPDF2
+import pymupdf
+
+from .page_cache import get_page_cache, hash_pdf_source
+from .page_normalizer import normalization_enabled, normalize_page_list, normalized_tokenizer_id
+from .token_counter import count_tokens_batch, tokenizer_id
+
+SUPPORTED_PARSERS = ("PyPDF2", "PyMuPDF", "PyMuPDF-parallel")
+MAX_OPEN_DOCUMENTS = 8
+DEFAULT_WORKERS = os.cpu_count() or 1
+# Shards per worker; smaller shards balance pages with very different extraction cost
+SHARDS_PER_WORKER = 4
+
+_settings = {"parser": "PyPDF2", "workers": DEFAULT_WORKERS}
+
+def configure_pdf_extraction(parser=None, workers=None):
+    """Set the process-wide default parser (used when callers pass pdf_parser=None) and worker count"""
+    if parser is not None:
+        if parser not in SUPPORTED_PARSERS:
+            raise ValueError(f"Unsupported PDF parser: {parser}")
+        _settings["parser"] = parser
+    if workers is not None:
+        _settings["workers"] = max(1, workers)
+
+def get_default_parser():
+    return _settings["parser"]
+
+_worker_doc = None
+
+def _init_extract_worker(source):
+    global _worker_doc
+    if isinstance(source, bytes):
+        _worker_doc = pymupdf.open(stream=source, filetype="pdf")
+    else:
+        _worker_doc = pymupdf.open(source)
+
+def _extract_page_range(start, end, model):
+    """Worker task: [(page_text, token_length), ...] for 0-based pages start..end-1"""
+    texts = [_worker_doc[index].get_text() for index in range(start, end)]
+    return list(zip(texts, count_tokens_batch(texts, model, num_threads=1)))
+
+def _shard_pages(num_pages, workers):
+    size = max(1, -(-num_pages // (workers * SHARDS_PER_WORKER)))
+    return [(start, min(start + size, num_pages)) for start in range(0, num_pages, size)]
+
+class PdfDocument:
+    """An open PDF with cached per-page text and token counts (pages are 1-based in the public API)"""
+    def __init__(self, source, parser=None):
+        parser = parser or get_default_parser()
+        if parser not in SUPPORTED_PARSERS:
+            raise ValueError(f"Unsupported PDF parser: {parser}")
+        if not isinstance(source, BytesIO) and not (isinstance(source, str) and os.path.isfile(source)):
+            raise ValueError(f"Not a PDF file or stream: {source!r}")
+        self.source = source
+        self.parser = parser
+        self._lock = threading.RLock()
+        self._file = None
+        self._mmap = None
+        self._reader = None
+        self._texts = None
+        self._tokens = None
+        self._normalized = None
+
+        # A page cache hit fills texts (and usually tokens) without opening the PDF at all
+        self._file_sha = None
+        self._stored_tokenizer = None
+        page_cache = get_page_cache()
+        if page_cache is not None:
+            self._file_sha = hash_pdf_source(source)
+            cached = page_cache.load(self._file_sha, parser, tokenizer_id())
+            if cached is not None:
+                self._texts, tokens = cached
+                self._tokens = tokens or [None] * len(self._texts)
+                self._stored_tokenizer = tokenizer_id() if tokens else None
+
+    def _open(self):
+        """Parse the PDF on first use"""
+        with self._lock:
+            if self._reader is not None:
+                return self._reader
+            if self.parser == "PyPDF2":
+                if isinstance(self.source, BytesIO):
+                    stream = self.source
+                else:
+                    self._file = open(self.source, "rb")
+                    self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                    stream = self._mmap
+                self._reader = PyPDF2.PdfReader(stream)
+                num_pages = len(self._reader.pages)
+            else:
+                if isinstance(self.source, BytesIO):
+                    self._reader = pymupdf.open(stream=self.source.getvalue(), filetype="pdf")
+                else:
+                    self._reader = pymupdf.open(self.source)
+                num_pages = self._reader.page_count
+            if self._texts is None:
+                self._texts = [None] * num_pages
+                self._tokens = [None] * num_pages
+            return self._reader
+
+    @property
+    def num_pages(self):
+        if self._texts is None:
+            self._open()
+        return len(self._texts)
+
+    @property
+    def title(self):
+        """Title from the PDF metadata, or 'Untitled'"""
+        reader = self._open()
+        if self.parser == "PyPDF2":
+            meta = reader.metadata
+            return meta.title if meta and meta.title else 'Untitled'
+        return (reader.metadata or {}).get("title") or 'Untitled'
+
+    def page_text(self, page_num):
+        """Text of a 1-based page, extracted on first access"""
+        index = page_num - 1
+        text = self._texts[index] if self._texts is not None else None
+        if text is None:
+            with self._lock:
+                reader = self._open()
+                text = self._texts[index]
+                if text is None:
+                    if self.parser == "PyPDF2":
+                        text = reader.pages[index].extract_text()
+                    else:
+                        text = reader[index].get_text()
+                    self._texts[index] = text
+        return text
+
+    def page_tokens(self, page_num, model=None):
+        """Token count of a 1-based page"""
+        index = page_num - 1
+        text = self.page_text(page_num)
+        if self._tokens[index] is None:
+            self._tokens[index] = count_tokens_batch([text], model)[0]
+        return self._tokens[index]
+
+    def get_page_tokens(self, model=None):
+        """[(page_text, token_length), ...] for every page, counting missing pages in one batch"""
+        num_pages = self.num_pages
+        if self.parser == "PyMuPDF-parallel" and _settings["workers"] > 1 and None in self._texts:
+            self._extract_parallel(model, _settings["workers"])
+        texts = [self.page_text(page_num) for page_num in range(1, num_pages + 1)]
+        missing = [index for index, tokens in enumerate(self._tokens) if tokens is None]
+        if missing:
+            counts = count_tokens_batch([texts[index] for index in missing], model)
+            for index, tokens in zip(missing, counts):
+                self._tokens[index] = tokens
+        self._store_in_page_cache(texts)
+        return list(zip(texts, self._tokens))
+
+    def get_normalized_page_tokens(self, model=None):
+        """get_page_tokens after normalize_page_list; normalized once per document and tokenizer"""
+        page_list = self.get_page_tokens(model)
+        if not normalization_enabled():
+            return page_list
+        tokenizer = normalized_tokenizer_id()
+        with self._lock:
+            if self._normalized is None or self._normalized[0] != tokenizer:
+                page_cache = get_page_cache()
+                known_tokens = None
+                if page_cache is not None:
+                    known_tokens = page_cache.load_tokens(self._file_sha, self.parser, tokenizer)
+                normalized = normalize_page_list(page_list, model, document=self.source, known_tokens=known_tokens)
+                if page_cache is not None and known_tokens is None:
+                    page_cache.store_tokens(self._file_sha, self.parser, tokenizer,
+                                            [tokens for _, tokens in normalized])
+                self._normalized = (tokenizer, normalized)
+            return list(self._normalized[1])
+
+    def _store_in_page_cache(self, texts):
+        page_cache = get_page_cache()
+        tokenizer = tokenizer_id()
+        if page_cache is None or self._stored_tokenizer == tokenizer:
+            return
+        if self._file_sha is None:
+            self._file_sha = hash_pdf_source(self.source)
+        page_cache.store(self._file_sha, self.parser, tokenizer, texts, self._tokens)
+        self._stored_tokenizer = tokenizer
+
+    def _extract_parallel(self, model, workers):
+        """Fill the page text and token caches from a process pool, keeping page order"""
+        source = self.source.getvalue() if isinstance(self.source, BytesIO) else self.source
+        shards = _shard_pages(self.num_pages, workers)
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards)), initializer=_init_extract_worker,
+                                 initargs=(source,)) as pool:
+            futures = [pool.submit(_extract_page_range, start, end, model) for start, end in shards]
+            results = [future.result() for future in futures]
+        with self._lock:
+            for (start, _), pages in zip(shards, results):
+                for offset, (text, tokens) in enumerate(pages):
+                    self._texts[start + offset] = text
+                    self._tokens[start + offset] = tokens
+
+    def text_of_pages(self, start_page, end_page, tag=True):
+        """Text of pages start_page..end_page (inclusive), optionally wrapped in <start_index_N> tags"""
+        parts = []
+        for page_num in range(start_page, end_page + 1):
+            page_text = self.page_text(page_num)
+            if tag:
+                parts.append(f"<start_index_{page_num}>\n{page_text}\n<end_index_{page_num}>\n")
+            else:
+                parts.append(page_text)
+        return "".join(parts)
+
+    def extract_text(self):
+        return self.text_of_pages(1, self.num_pages, tag=False)
+
+    def close(self):
+        with self._lock:
+            if self._reader is not None and self.parser != "PyPDF2":
+                self._reader.close()
+            self._reader = None
+            if self._mmap is not None:
+                self._mmap.close()
+            if self._file is not None:
+                self._file.close()
+
+_documents = OrderedDict()
+_documents_lock = threading.Lock()
+
+def _document_key(source, parser):
+    if isinstance(source, str):
+        stat = os.stat(source)
+        return (os.path.realpath(source), stat.st_mtime_ns, stat.st_size, parser)
+    # Streams are keyed by identity; the cached document keeps the stream alive
+    return (id(source), parser)
+
+def open_pdf_document(source, parser=None):
+    """Return a cached PdfDocument for a path or BytesIO, opening it on first use"""
+    parser = parser or get_default_parser()
+    key = _document_key(source, parser)
+    with _documents_lock:
+        document = _documents.get(key)
+        if document is not None:
+            _documents.move_to_end(key)
+            return document
+
+    document = PdfDocument(source, parser)
+    with _documents_lock:
+        existing = _documents.get(key)
+        if existing is not None:
+            document.close()
+            return existing
+        _documents[key] = document
+        while len(_documents) > MAX_OPEN_DOCUMENTS:
+            _, evicted = _documents.popitem(last=False)
+            evicted.close()
+    return document
+
+def close_pdf_documents():
+    """Close every cached document"""
+    with _documents_lock:
+        while _documents:
+            _, document = _documents.popitem()
+            document.close()
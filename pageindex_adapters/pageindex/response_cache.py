@@ -0,0 +1,109 @@
+"""
+Content-addressed on-disk cache for LLM responses
+Keyed by sha256(provider, resolved model, temperature, chat_history, prompt) and stored
+in SQLite with size-based LRU eviction. With temperature=0 a re-run over the same PDF
+answers every repeated TOC/summary prompt locally.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_DIR = ".llm_cache"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+def make_cache_key(provider, model, temperature, chat_history, prompt):
+    """Stable hex digest of everything that determines the model's answer"""
+    material = json.dumps(
+        [provider, model, temperature, chat_history or [], prompt],
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """SQLite-backed LRU cache of (text, finish_reason) responses"""
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "responses.sqlite")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses(last_access)")
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key):
+        """Return the cached (text, finish_reason) or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+        return tuple(json.loads(row[0]))
+
+    def put(self, key, value):
+        data = json.dumps(list(value), ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        with self._lock:
+            row = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, data, size, time.time()),
+            )
+            self._total_bytes += size - (row[0] if row else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is at 90% of max_bytes"""
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall()
+        victims = []
+        for key, size in rows:
+            if self._total_bytes <= target:
+                break
+            victims.append((key,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": entries,
+                "bytes": self._total_bytes,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_cache = None
+
+def configure_response_cache(cache_dir=DEFAULT_CACHE_DIR, enabled=True, max_bytes=DEFAULT_MAX_BYTES):
+    """Enable (or disable with enabled=False) the process-wide response cache"""
+    global _cache
+    if _cache is not None:
+        _cache.close()
+    _cache = ResponseCache(cache_dir, max_bytes) if enabled else None
+    return _cache
+
+def get_response_cache():
+    """The active ResponseCache, or None when caching is disabled (the default)"""
+    return _cache
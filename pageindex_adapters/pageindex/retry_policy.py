@@ -0,0 +1,209 @@
+"""
+Retry policy for PageIndex LLM adapters
+Classifies errors as retryable or fatal, honors Retry-After and backs off with
+decorrelated jitter under a total deadline. Retry counts and backoff time of every
+call are added to process-wide totals (get_retry_metrics), which the runners print.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from .llm_scheduler import SchedulerDeadlockError, get_status_code
+
+# Request timeout, conflict, too early, throttling and transient server errors
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+class RetryStats:
+    """Outcome of one retried call (kept by call/call_async for logging and the totals)"""
+    def __init__(self):
+        self.attempts = 0
+        self.retries = 0
+        self.backoff_seconds = 0.0
+        self.fatal = False
+        self.last_error = None
+
+class RetryMetrics:
+    """Thread-safe process-wide retry counters"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.failed_calls = 0
+        self.fatal_errors = 0
+        self.retries = 0
+        self.backoff_seconds = 0.0
+        self.max_retries_per_call = 0
+
+    def record(self, stats, failed):
+        with self._lock:
+            self.calls += 1
+            self.failed_calls += int(failed)
+            self.fatal_errors += int(stats.fatal)
+            self.retries += stats.retries
+            self.backoff_seconds += stats.backoff_seconds
+            self.max_retries_per_call = max(self.max_retries_per_call, stats.retries)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "failed_calls": self.failed_calls,
+                "fatal_errors": self.fatal_errors,
+                "retries": self.retries,
+                "backoff_seconds": round(self.backoff_seconds, 3),
+                "max_retries_per_call": self.max_retries_per_call,
+            }
+
+_metrics = RetryMetrics()
+
+def get_retry_metrics():
+    """Totals across all calls made through a RetryPolicy in this process"""
+    return _metrics.as_dict()
+
+def _get_headers(error):
+    headers = getattr(error, "headers", None)
+    if headers is None:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+    return headers
+
+def parse_retry_after(value):
+    """Retry-After as seconds; accepts delta-seconds or an HTTP date"""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class RetryPolicy:
+    """
+    Retry loop configuration
+    - fatal: 4xx other than RETRYABLE_STATUS_CODES, local ValueError/TypeError (e.g. missing API key)
+      and SchedulerDeadlockError
+    - retryable: everything else (throttling, 5xx, connection errors, malformed responses)
+    - delay: min(max_delay, uniform(base_delay, 3 * previous)), but never less than server Retry-After
+    """
+    def __init__(self, max_attempts=10, base_delay=1.0, max_delay=60.0, deadline=600.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def is_retryable(self, error):
+        status_code = get_status_code(error)
+        if status_code is not None:
+            return status_code in RETRYABLE_STATUS_CODES or status_code >= 500
+        if isinstance(error, json.JSONDecodeError):
+            return True
+        return not isinstance(error, (ValueError, TypeError, SchedulerDeadlockError))
+
+    def retry_after(self, error):
+        headers = _get_headers(error)
+        if not headers:
+            return None
+        return parse_retry_after(headers.get("Retry-After"))
+
+    def next_delay(self, previous_delay):
+        """Decorrelated jitter backoff"""
+        upper = max(self.base_delay, previous_delay * 3)
+        return min(self.max_delay, random.uniform(self.base_delay, upper))
+
+    def _plan(self, error, stats, previous_delay, started):
+        """Record the failure and return the delay before the next attempt, or None to give up"""
+        stats.last_error = error
+        if not self.is_retryable(error):
+            stats.fatal = True
+            return None
+        if stats.attempts >= self.max_attempts:
+            return None
+
+        # Retry-After is a lower bound; jitter still spreads out clients throttled together
+        delay = self.next_delay(previous_delay)
+        retry_after = self.retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        if time.monotonic() - started + delay > self.deadline:
+            return None
+        return delay
+
+    def _finish(self, stats, error, label):
+        _metrics.record(stats, failed=error is not None)
+        if error is None and stats.retries:
+            logging.info(f"{label} succeeded after {stats.retries} retries, "
+                         f"{stats.backoff_seconds:.1f}s backoff")
+        elif error is not None:
+            reason = "fatal error" if stats.fatal else "retries exhausted"
+            logging.error(f"{label} giving up ({reason}) after {stats.attempts} attempts, "
+                          f"{stats.backoff_seconds:.1f}s backoff: {error}")
+
+    def _log_retry(self, error, delay, label):
+        print(f'************* Retrying ({label}) ************* {error}')
+        logging.error(f"{label} Error: {error} (retrying in {delay:.1f}s)")
+
+    def call(self, func, label="LLM"):
+        """Call func() until it succeeds; re-raises the last error when giving up"""
+        stats = RetryStats()
+        started = time.monotonic()
+        delay = self.base_delay
+        while True:
+            stats.attempts += 1
+            try:
+                result = func()
+            except Exception as e:
+                next_delay = self._plan(e, stats, delay, started)
+                if next_delay is None:
+                    self._finish(stats, e, label)
+                    raise
+                self._log_retry(e, next_delay, label)
+                time.sleep(next_delay)
+                delay = next_delay
+                stats.retries += 1
+                stats.backoff_seconds += next_delay
+                continue
+            self._finish(stats, None, label)
+            return result
+
+    async def call_async(self, coro_func, label="LLM"):
+        """Await coro_func() until it succeeds; re-raises the last error when giving up"""
+        stats = RetryStats()
+        started = time.monotonic()
+        delay = self.base_delay
+        while True:
+            stats.attempts += 1
+            try:
+                result = await coro_func()
+            except Exception as e:
+                next_delay = self._plan(e, stats, delay, started)
+                if next_delay is None:
+                    self._finish(stats, e, label)
+                    raise
+                self._log_retry(e, next_delay, label)
+                await asyncio.sleep(next_delay)
+                delay = next_delay
+                stats.retries += 1
+                stats.backoff_seconds += next_delay
+                continue
+            self._finish(stats, None, label)
+            return result
+
+_policy = RetryPolicy()
+
+def configure_retry_policy(**kwargs):
+    """Replace the process-wide retry policy used by all ChatGPT_API* entry points"""
+    global _policy
+    _policy = RetryPolicy(**kwargs)
+    return _policy
+
+def get_retry_policy():
+    return _policy
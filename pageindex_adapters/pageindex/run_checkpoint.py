@@ -0,0 +1,235 @@
+"""
+Stage checkpoints for page_index_main runs
+A run directory (runs/<run_id>/) holds run.json (document, options, status), one JSON
+file per completed pipeline stage call and summaries.jsonl with one line per finished
+node summary. install_checkpoints() wraps the stage functions of an already loaded
+page_index module, so a resumed run returns stored results instead of calling the LLM
+again. Stage results are keyed by a hash of the call arguments: a call with different
+pages or options is simply recomputed. Page lists are hashed once per list object rather
+than serialized on every stage call, and a resumed run keeps the options stored in run.json.
+"""
+
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from types import SimpleNamespace
+
+from .content_fingerprint import content_fingerprint
+from .identity_cache import IdentityCache
+
+DEFAULT_RUNS_DIR = "runs"
+PAGE_LIST_KEYS_KEPT = 8
+
+# page_index.py functions whose results are checkpointed, in pipeline order:
+# TOC detection, TOC transform, physical index verification, whole tree (incl. post-processing)
+CHECKPOINT_STAGES = ("check_toc", "toc_transformer", "verify_toc", "tree_parser")
+
+def _key_default(obj):
+    # Options count towards the key; loggers and other handles do not
+    if isinstance(obj, SimpleNamespace):
+        return vars(obj)
+    return type(obj).__name__
+
+def _result_default(obj):
+    # Stored results must load back unchanged, so anything json cannot store is an error
+    raise TypeError(f"Stage result of type {type(obj).__name__} cannot be checkpointed")
+
+def _is_page_list(value):
+    """A [(page_text, token_length), ...] argument"""
+    return (isinstance(value, list) and bool(value) and isinstance(value[0], tuple)
+            and len(value[0]) == 2 and isinstance(value[0][0], str))
+
+def _write_json(path, data):
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, default=_result_default)
+    except TypeError:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+def new_run_id(doc):
+    name = os.path.splitext(os.path.basename(doc))[0] if isinstance(doc, str) else "document"
+    return f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+class RunCheckpoint:
+    """Persistent state of one page_index_main run"""
+    def __init__(self, run_id, runs_dir=DEFAULT_RUNS_DIR):
+        self.run_id = run_id
+        self.run_dir = os.path.join(runs_dir, run_id)
+        self.stage_dir = os.path.join(self.run_dir, "stages")
+        os.makedirs(self.stage_dir, exist_ok=True)
+        self.stage_hits = 0
+        self.summary_hits = 0
+        self._lock = threading.Lock()
+        self._page_list_keys = IdentityCache(PAGE_LIST_KEYS_KEPT)  # page list -> key
+
+        self.summaries = {}
+        summary_path = os.path.join(self.run_dir, "summaries.jsonl")
+        if os.path.exists(summary_path):
+            with open(summary_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # last line cut off by a crash
+                    self.summaries[record["key"]] = record["summary"]
+        self._summary_file = open(summary_path, "a", encoding="utf-8")
+
+    @classmethod
+    def create(cls, doc, opt, runs_dir=DEFAULT_RUNS_DIR, run_id=None):
+        checkpoint = cls(run_id or new_run_id(doc), runs_dir)
+        checkpoint.info = {
+            "run_id": checkpoint.run_id,
+            "doc": doc if isinstance(doc, str) else None,
+            "opt": vars(opt) if opt is not None else None,
+            "status": "running",
+            "created": datetime.now().isoformat(timespec="seconds"),
+        }
+        _write_json(checkpoint._info_path(), checkpoint.info)
+        return checkpoint
+
+    @classmethod
+    def resume(cls, run_id, runs_dir=DEFAULT_RUNS_DIR):
+        info_path = os.path.join(runs_dir, run_id, "run.json")
+        if not os.path.exists(info_path):
+            raise FileNotFoundError(f"No run to resume: {info_path}")
+        checkpoint = cls(run_id, runs_dir)
+        with open(info_path, encoding="utf-8") as f:
+            checkpoint.info = json.load(f)
+        return checkpoint
+
+    def _info_path(self):
+        return os.path.join(self.run_dir, "run.json")
+
+    def resumed_options(self, opt):
+        """(options stored for this run, names of options that differ in opt); a resumed run keeps its own"""
+        stored = self.info.get("opt")
+        if stored is None:
+            return opt, []
+        current = vars(opt)
+        changed = sorted(name for name in set(stored) | set(current) if stored.get(name) != current.get(name))
+        return SimpleNamespace(**stored), changed
+
+    def _page_list_key(self, page_list):
+        """Fingerprint of a page list argument, computed once per list object"""
+        key = self._page_list_keys.get(page_list)
+        if key is not None:
+            return key
+        digest = hashlib.sha256()
+        for text, token_length in page_list:
+            digest.update(str(text).encode("utf-8"))
+            digest.update(f"\0{token_length}\0".encode("utf-8"))
+        key = {"page_list": digest.hexdigest()}
+        self._page_list_keys.put(page_list, key)
+        return key
+
+    def _stage_path(self, name, args, kwargs):
+        args = [self._page_list_key(arg) if _is_page_list(arg) else arg for arg in args]
+        kwargs = {key: self._page_list_key(value) if _is_page_list(value) else value for key, value in kwargs.items()}
+        payload = json.dumps([args, kwargs], sort_keys=True, ensure_ascii=False, default=_key_default)
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.stage_dir, f"{name}-{digest}.json")
+
+    def _load_stage(self, path):
+        if not os.path.exists(path):
+            return False, None
+        with open(path, encoding="utf-8") as f:
+            result = json.load(f)["result"]
+        with self._lock:
+            self.stage_hits += 1
+        return True, result
+
+    def wrap_stage(self, name, func):
+        """Checkpointed version of a sync or async stage function"""
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                path = self._stage_path(name, args, kwargs)
+                found, result = self._load_stage(path)
+                if found:
+                    return result
+                result = await func(*args, **kwargs)
+                _write_json(path, {"stage": name, "result": result})
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            path = self._stage_path(name, args, kwargs)
+            found, result = self._load_stage(path)
+            if found:
+                return result
+            result = func(*args, **kwargs)
+            _write_json(path, {"stage": name, "result": result})
+            return result
+        return wrapper
+
+    def _record_summary(self, key, summary):
+        if summary is None or summary == "Error":
+            return
+        with self._lock:
+            self.summaries[key] = summary
+            self._summary_file.write(json.dumps({"key": key, "summary": summary}, ensure_ascii=False) + "\n")
+            self._summary_file.flush()
+
+    def wrap_summary(self, func):
+        """Checkpointed generate_node_summary; each summary is appended as soon as it arrives"""
+        @functools.wraps(func)
+        async def wrapper(node, model=None):
+            key = f"{model}:{content_fingerprint(node['text'])}"
+            if key in self.summaries:
+                with self._lock:
+                    self.summary_hits += 1
+                return self.summaries[key]
+            summary = await func(node, model=model)
+            self._record_summary(key, summary)
+            return summary
+        return wrapper
+
+    def wrap_summary_batch(self, func):
+        """Checkpointed summarize_node_batch; only nodes without a stored summary are sent"""
+        @functools.wraps(func)
+        async def wrapper(nodes, model=None):
+            keys = [f"{model}:{content_fingerprint(node['text'])}" for node in nodes]
+            summaries = [self.summaries.get(key) for key in keys]
+            missing = [index for index, summary in enumerate(summaries) if summary is None]
+            with self._lock:
+                self.summary_hits += len(nodes) - len(missing)
+            if missing:
+                fresh = await func([nodes[index] for index in missing], model=model)
+                for index, summary in zip(missing, fresh):
+                    summaries[index] = summary
+                    self._record_summary(keys[index], summary)
+            return summaries
+        return wrapper
+
+    def mark_finished(self, output_file):
+        self.info.update(status="finished", output=output_file,
+                         finished=datetime.now().isoformat(timespec="seconds"))
+        _write_json(self._info_path(), self.info)
+
+    def close(self):
+        self._page_list_keys.clear()
+        with self._lock:
+            if not self._summary_file.closed:
+                self._summary_file.close()
+
+def install_checkpoints(checkpoint, page_index_module, utils_module):
+    """Route the pipeline stages and node summaries of page_index_main through checkpoint"""
+    for name in CHECKPOINT_STAGES:
+        original = getattr(page_index_module, name)
+        original = getattr(original, "__wrapped__", original)
+        setattr(page_index_module, name, checkpoint.wrap_stage(name, original))
+    # generate_summaries_for_structure looks generate_node_summary (and summarize_node_batch) up in the utils module
+    original = getattr(utils_module.generate_node_summary, "__wrapped__", utils_module.generate_node_summary)
+    utils_module.generate_node_summary = checkpoint.wrap_summary(original)
+    if hasattr(utils_module, "summarize_node_batch"):
+        original = getattr(utils_module.summarize_node_batch, "__wrapped__", utils_module.summarize_node_batch)
+        utils_module.summarize_node_batch = checkpoint.wrap_summary_batch(original)
+    return checkpoint
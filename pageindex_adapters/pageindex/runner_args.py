@@ -0,0 +1,105 @@
+"""
+Command line options shared by the PageIndex runners
+run_pageindex_gemini.py, run_pageindex_zhipuai.py and run_pageindex_batch.py add the
+document, scheduling, extraction and cache options with add_pipeline_arguments() and
+apply them with configure_pipeline(), so a new option shows up in every runner at once.
+Runner-specific options (input documents, model, checkpoints, batch settings) stay in the runners.
+"""
+
+def add_pipeline_arguments(parser):
+    """Add the options every runner accepts to an argparse parser"""
+    parser.add_argument('--toc-check-pages', type=int, default=20,
+                      help='Number of pages to check for table of contents (PDF only)')
+    parser.add_argument('--max-pages-per-node', type=int, default=10,
+                      help='Maximum number of pages per node (PDF only)')
+    parser.add_argument('--max-tokens-per-node', type=int, default=20000,
+                      help='Maximum number of tokens per node (PDF only)')
+
+    parser.add_argument('--if-add-node-id', type=str, default='yes',
+                      help='Whether to add node id to the node')
+    parser.add_argument('--if-add-node-summary', type=str, default='yes',
+                      help='Whether to add summary to the node')
+    parser.add_argument('--if-add-doc-description', type=str, default='no',
+                      help='Whether to add doc description to the doc')
+    parser.add_argument('--if-add-node-text', type=str, default='no',
+                      help='Whether to add text to the node')
+    parser.add_argument('--pack-summaries', action='store_true',
+                      help='Summarize several small nodes per LLM request (PDF only)')
+    parser.add_argument('--summary-batch-tokens', type=int, default=4000,
+                      help='Node text tokens per packed summary request (default: 4000)')
+
+    # Markdown specific arguments
+    parser.add_argument('--if-thinning', type=str, default='no',
+                      help='Whether to apply tree thinning for markdown (markdown only)')
+    parser.add_argument('--thinning-threshold', type=int, default=5000,
+                      help='Minimum token threshold for thinning (markdown only)')
+    parser.add_argument('--summary-token-threshold', type=int, default=200,
+                      help='Token threshold for generating summaries (markdown only)')
+
+    # LLM request scheduling (one budget per process, shared by all documents of a batch)
+    parser.add_argument('--max-concurrency', type=int, default=16,
+                      help='Maximum number of LLM requests in flight')
+    parser.add_argument('--rpm', type=int, default=None,
+                      help='Requests per minute limit (default: unlimited)')
+    parser.add_argument('--tpm', type=int, default=None,
+                      help='Prompt tokens per minute limit (default: unlimited)')
+    parser.add_argument('--http-pool-size', type=int, default=None,
+                      help='Number of keep-alive connections to the LLM API (default: --max-concurrency)')
+
+    # PDF text extraction
+    parser.add_argument('--pdf-parser', type=str, default='PyPDF2',
+                      choices=['PyPDF2', 'PyMuPDF', 'PyMuPDF-parallel'],
+                      help='PDF text extractor (default: PyPDF2)')
+    parser.add_argument('--workers', type=int, default=None,
+                      help='Worker processes for --pdf-parser PyMuPDF-parallel (default: CPU count)')
+    parser.add_argument('--no-page-normalization', action='store_true',
+                      help='Keep running page headers/footers and whitespace in the page text')
+
+    # LLM response and page caches
+    parser.add_argument('--cache-dir', type=str, default='.llm_cache',
+                      help='Directory of the on-disk LLM response and page caches')
+    parser.add_argument('--no-cache', action='store_true',
+                      help='Disable the LLM response cache')
+    parser.add_argument('--no-page-cache', action='store_true',
+                      help='Disable the extracted page text cache (stored in --cache-dir)')
+
+    # Tree construction (PDF only)
+    parser.add_argument('--outline-first', action='store_true',
+                      help='Build the tree from the PDF bookmarks; detect the TOC with the LLM only if they are missing or fail a sanity check')
+    parser.add_argument('--no-toc-heuristics', action='store_true',
+                      help='Ask the LLM about every TOC candidate page instead of deciding clear-cut pages locally')
+    parser.add_argument('--no-title-matcher', action='store_true',
+                      help='Verify TOC titles and page numbers with the LLM only, without local title matching')
+    return parser
+
+
+def install_pipeline_patches(args, page_index_module):
+    """Install the optional page_index.py patches selected by args into the loaded page_index module"""
+    if args.outline_first:
+        from .outline_tree import install_outline_first
+        install_outline_first(page_index_module)
+    if not args.no_toc_heuristics:
+        from .toc_heuristics import install_toc_heuristics
+        install_toc_heuristics(page_index_module)
+    if not args.no_title_matcher:
+        from .title_matcher import install_title_matcher
+        install_title_matcher(page_index_module)
+
+
+def configure_pipeline(args):
+    """Apply the scheduling, extraction and cache options; returns (response cache, page cache)"""
+    from .http_client import configure_http_client
+    from .llm_scheduler import configure_scheduler
+    from .page_cache import configure_page_cache
+    from .page_normalizer import configure_page_normalization
+    from .pdf_document import configure_pdf_extraction
+    from .response_cache import configure_response_cache
+    from .summary_packing import configure_summary_packing
+    configure_scheduler(max_concurrency=args.max_concurrency, rpm=args.rpm, tpm=args.tpm)
+    configure_pdf_extraction(parser=args.pdf_parser, workers=args.workers)
+    configure_page_normalization(enabled=not args.no_page_normalization)
+    configure_summary_packing(enabled=args.pack_summaries, batch_tokens=args.summary_batch_tokens)
+    response_cache = configure_response_cache(cache_dir=args.cache_dir, enabled=not args.no_cache)
+    page_cache = configure_page_cache(cache_dir=args.cache_dir, enabled=not args.no_page_cache)
+    configure_http_client(pool_size=args.http_pool_size or args.max_concurrency)
+    return response_cache, page_cache
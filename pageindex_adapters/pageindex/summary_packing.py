@@ -0,0 +1,122 @@
+"""
+Packed node summaries
+generate_summaries_for_structure sends one request per node, even for clauses of a few
+hundred tokens ("Void" annexes, one-paragraph subclauses). With packing on, nodes are
+bin-packed (first-fit decreasing on estimated tokens) into prompts of up to batch_tokens
+of node text, and the model returns a JSON array of {"node_id", "summary"} objects; node_id
+is the node's position in the prompt, so nodes need no node_id of their own. Nodes missing
+from the response, or all of them when it cannot be parsed, are asked again in two halves,
+down to the usual single-node request. Nodes larger than batch_tokens always get their own
+request with the original prompt. Requests are counted by the adapters when they actually
+call the model (record_summary_request), so summaries served from a cache are not counted.
+"""
+
+import asyncio
+import threading
+
+from .json_extract import extract_json
+from .token_counter import approximate_tokens
+
+DEFAULT_BATCH_TOKENS = 4000
+MAX_BATCH_NODES = 20
+
+_settings = {"enabled": False, "batch_tokens": DEFAULT_BATCH_TOKENS}
+_stats = {"nodes": 0, "packed_requests": 0, "packed_nodes": 0, "single_requests": 0, "splits": 0}
+_stats_lock = threading.Lock()
+
+def configure_summary_packing(enabled=None, batch_tokens=None):
+    """Turn packed summaries on or off and set the node-text token budget of a packed prompt"""
+    if enabled is not None:
+        _settings["enabled"] = bool(enabled)
+    if batch_tokens is not None:
+        _settings["batch_tokens"] = max(1, batch_tokens)
+
+def get_summary_packing():
+    return dict(_settings)
+
+def get_summary_packing_stats():
+    """Nodes summarized, and the packed/single requests (and batch splits) it took"""
+    with _stats_lock:
+        return dict(_stats)
+
+def _count(**counts):
+    with _stats_lock:
+        for name, value in counts.items():
+            _stats[name] += value
+
+def record_summary_request(nodes=1):
+    """Count a summary request sent to the model: packed when it covers several nodes"""
+    if nodes > 1:
+        _count(packed_requests=1, packed_nodes=nodes)
+    else:
+        _count(single_requests=1)
+
+def pack_nodes(sizes, batch_tokens, max_nodes=MAX_BATCH_NODES):
+    """First-fit decreasing: lists of indices (in order) whose sizes sum to at most batch_tokens"""
+    bins = []  # [remaining tokens, indices]
+    for index in sorted(range(len(sizes)), key=lambda i: -sizes[i]):
+        for packed in bins:
+            if sizes[index] <= packed[0] and len(packed[1]) < max_nodes:
+                packed[0] -= sizes[index]
+                packed[1].append(index)
+                break
+        else:
+            bins.append([batch_tokens - sizes[index], [index]])
+    return sorted((sorted(indices) for _, indices in bins), key=lambda indices: indices[0])
+
+def packed_summary_prompt(texts):
+    """Prompt asking for one summary per text, as a JSON array of {node_id, summary}"""
+    parts = "".join(f'<node id="{node_id}">\n{text}\n</node>\n' for node_id, text in enumerate(texts, 1))
+    return f"""You are given several parts of a document, each inside a <node id="..."> element. For each part, generate a description of the partial document about what are main points covered in the partial document.
+
+    {parts}
+    Return a JSON array with one object per part, in the same order:
+    [{{"node_id": 1, "summary": "<description of part 1>"}}, ...]
+    Directly return the JSON array, do not include any other text.
+    """
+
+def parse_packed_summaries(response, count):
+    """{node_id: summary} for the well-formed entries of a packed response (node_id 1..count)"""
+    data = extract_json(response)
+    if isinstance(data, dict):
+        # {"summaries": [...]} or a single object
+        data = next((value for value in data.values() if isinstance(value, list)), [data])
+    summaries = {}
+    for entry in data if isinstance(data, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            node_id = int(entry.get("node_id"))
+        except (TypeError, ValueError):
+            continue
+        summary = entry.get("summary")
+        if 1 <= node_id <= count and isinstance(summary, str) and summary.strip():
+            summaries[node_id] = summary.strip()
+    return summaries
+
+async def summarize_packed(nodes, model, summarize_node, summarize_batch, batch_tokens):
+    """
+    Summaries of nodes, in order
+    summarize_node(node, model=) is the single-node request; summarize_batch(nodes, model=)
+    returns one summary per node, None where the packed response had none.
+    """
+    _count(nodes=len(nodes))
+
+    async def run(batch):
+        if len(batch) == 1:
+            return {batch[0]: await summarize_node(nodes[batch[0]], model=model)}
+        summaries = await summarize_batch([nodes[index] for index in batch], model=model)
+        done = {index: summary for index, summary in zip(batch, summaries) if summary is not None}
+        missing = [index for index in batch if index not in done]
+        if missing:
+            _count(splits=1)
+            halves = [missing[:len(missing) // 2], missing[len(missing) // 2:]]
+            for results in await asyncio.gather(*(run(half) for half in halves if half)):
+                done.update(results)
+        return done
+
+    sizes = [approximate_tokens(node.get('text')) for node in nodes]
+    summaries = {}
+    for results in await asyncio.gather(*(run(batch) for batch in pack_nodes(sizes, batch_tokens))):
+        summaries.update(results)
+    return [summaries[index] for index in range(len(nodes))]
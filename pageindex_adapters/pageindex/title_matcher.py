@@ -0,0 +1,297 @@
+"""
+Local title-to-page matching
+Upstream PageIndex checks every TOC entry with the LLM: check_title_appearance (is the
+title on its physical_index page?), check_title_appearance_in_start (does the page start
+with it?) and single_toc_item_index_fixer (which page of a range holds it?). For TS 24.501
+that is two prompts per entry, over a thousand entries. TitleIndex splits each page into
+lines once and matches titles against windows of 1-3 consecutive lines (PyMuPDF puts the
+clause number and the title on separate lines), comparing text with spaces and punctuation
+removed so extraction artefacts ("SM F", "1 24 501") do not matter. Clause numbers must
+agree exactly: "5.5.3.1 General" never matches "5.5.2.1 General". Lines ending in dotted
+leaders are TOC entries, not headings, and are skipped.
+
+Only clear-cut entries are decided locally; the rest still go to the LLM.
+install_title_matcher() wraps the three functions of a loaded page_index module.
+"""
+
+import asyncio
+import difflib
+import functools
+import re
+import threading
+from collections import Counter
+
+from .identity_cache import IdentityCache
+
+try:
+    from rapidfuzz.fuzz import ratio as _rapidfuzz_ratio
+    HAS_RAPIDFUZZ = True
+except ImportError:
+    HAS_RAPIDFUZZ = False
+
+ACCEPT_SCORE = 0.9
+REJECT_SCORE = 0.6
+MAX_WINDOW_LINES = 3
+MIN_MENTION_CHARS = 8
+BOILERPLATE_PAGE_RATIO = 0.5
+BOILERPLATE_MIN_PAGES = 3
+INDEX_CACHE_SIZE = 8
+PAGE_LINES_CACHE_SIZE = 64
+
+_NON_WORD = re.compile(r"[\W_]+")
+_DIGITS = re.compile(r"\d+")
+# "5.5.1.3.7", "5.3.13A", "D.6.1", "4", "Annex D" followed by the title
+_CLAUSE_NUMBER = re.compile(r"\s*((?i:annex)\s+[A-Z]{1,2}\b|(?:[A-Z]|\d+[A-Z]?)(?:\.\d+[A-Z]?)+\.?|\d+[A-Z]?\.?)(?:\s+|$)")
+_LEADER = re.compile(r"(?:\.\s?){4,}\s*\d{1,4}\s*$")
+# Page blocks of the single_toc_item_index_fixer prompt
+_PAGE_BLOCK = re.compile(r"<physical_index_(\d+)>\n?(.*?)\n?<physical_index_\1>", re.DOTALL)
+
+def compact(text):
+    """Lowercase text without whitespace, punctuation or underscores"""
+    return _NON_WORD.sub("", str(text).lower())
+
+def split_title(text):
+    """(clause number, compact title without it, compact whole text)"""
+    text = str(text)
+    match = _CLAUSE_NUMBER.match(text)
+    if match:
+        number = match.group(1).rstrip(".").lower()
+        return number, compact(text[match.end():]), compact(text)
+    return "", compact(text), compact(text)
+
+class Scorer:
+    """Similarity in [0, 1] of strings to one key (rapidfuzz if installed, else difflib)
+    Scores below REJECT_SCORE are cheap upper bounds, not exact ratios."""
+    def __init__(self, key):
+        self.key = key
+        self._matcher = difflib.SequenceMatcher(None, autojunk=False)
+        self._matcher.set_seq2(key)
+
+    def bound(self, text):
+        """Cheap upper bound of the score (the exact score with rapidfuzz)"""
+        if not text or not self.key:
+            return 0.0
+        if 2 * min(len(text), len(self.key)) < REJECT_SCORE * (len(text) + len(self.key)):
+            return 0.0
+        if HAS_RAPIDFUZZ:
+            return _rapidfuzz_ratio(self.key, text) / 100
+        self._matcher.set_seq1(text)
+        return self._matcher.quick_ratio()
+
+    def __call__(self, text):
+        bound = self.bound(text)
+        if bound < REJECT_SCORE or HAS_RAPIDFUZZ:
+            return bound
+        return self._matcher.ratio()
+
+class Title:
+    """A TOC title split into clause number and compact text, with scorers for both forms"""
+    __slots__ = ("number", "body", "full", "score_body", "score_full")
+
+    def __init__(self, text):
+        self.number, self.body, self.full = split_title(text)
+        self.score_body = Scorer(self.body)
+        self.score_full = Scorer(self.full)
+
+    def score(self, window):
+        """Score against a split_title() line window; 0 when the clause numbers differ"""
+        number, body, full = window
+        if not self.number:
+            return self.score_full(full)
+        if number:
+            return self.score_body(body) if number == self.number else 0.0
+        # A numbered title matching text without its number may be another clause's heading
+        # or running text: never enough to decide locally
+        return min(self.score_body(full), REJECT_SCORE)
+
+class PageLines:
+    """Lines of one page, their line windows and compact text"""
+    __slots__ = ("lines", "keys", "windows", "text")
+
+    def __init__(self, page_text):
+        self.lines = [line.strip() for line in str(page_text).splitlines() if line.strip()]
+        parts = [split_title(line) for line in self.lines]
+        # Digit-free keys identify running headers and footers across pages
+        self.keys = [_DIGITS.sub("", full) for _, _, full in parts]
+        self.text = compact(page_text)
+        self.windows = []
+        for start, (number, body, full) in enumerate(parts):
+            # A title line under a bare clause number belongs to that numbered heading
+            if not number and start and parts[start - 1][0] and not parts[start - 1][1]:
+                continue
+            rest = ""
+            for end in range(start, min(start + MAX_WINDOW_LINES, len(parts))):
+                if _LEADER.search(self.lines[end]):
+                    break
+                if end > start:
+                    rest += parts[end][2]
+                self.windows.append((start, (number, body + rest, full + rest)))
+
+    def match(self, title):
+        """(best score, first line of a window scoring ACCEPT_SCORE or None, whether a
+        differently numbered heading carries the same title)"""
+        best, first_line, other_heading = 0.0, None, False
+        for line, window in self.windows:
+            score = title.score(window)
+            if score >= ACCEPT_SCORE and first_line is None:
+                first_line = line
+            best = max(best, score)
+            if title.number and window[0] and window[0] != title.number and window[1] == title.body:
+                other_heading = True
+        return best, first_line, other_heading
+
+    def absent(self, title, match):
+        """Whether the title is clearly not on the page, given its match()"""
+        score, _, other_heading = match
+        if score >= REJECT_SCORE:
+            return False
+        # Title text inside a longer line (or a merged header line) is not ruled out,
+        # unless a heading with another clause number explains it ("X.Y.1 General")
+        mentioned = len(title.body) >= MIN_MENTION_CHARS and title.body in self.text
+        return not mentioned or other_heading
+
+@functools.lru_cache(maxsize=PAGE_LINES_CACHE_SIZE)
+def page_lines(page_text):
+    """PageLines of a page text, cached: fixer prompts of neighbouring entries share pages"""
+    return PageLines(page_text)
+
+def title_on_page(title, page):
+    """'yes' / 'no' when the title is clearly (not) on the PageLines page, else None"""
+    title = Title(title)
+    match = page.match(title)
+    if match[0] >= ACCEPT_SCORE:
+        return "yes"
+    return "no" if page.absent(title, match) else None
+
+class TitleIndex:
+    """Lazily built PageLines of a [(page_text, token_length), ...] list, plus its running headers"""
+    def __init__(self, page_list):
+        self.page_list = page_list
+        self._pages = [None] * len(page_list)
+        self._boilerplate = None
+        self._lock = threading.Lock()
+
+    def page(self, page_number):
+        """PageLines of a 1-based page"""
+        index = page_number - 1
+        page = self._pages[index]
+        if page is None:
+            page = self._pages[index] = PageLines(self.page_list[index][0])
+        return page
+
+    def boilerplate(self):
+        """Line keys that repeat on most pages (running headers/footers) and empty keys (page numbers)"""
+        with self._lock:
+            if self._boilerplate is None:
+                num_pages = len(self.page_list)
+                counts = Counter(key for number in range(1, num_pages + 1) for key in set(self.page(number).keys))
+                threshold = max(BOILERPLATE_MIN_PAGES, BOILERPLATE_PAGE_RATIO * num_pages)
+                self._boilerplate = {key for key, count in counts.items() if count >= threshold} | {""}
+            return self._boilerplate
+
+    def title_starts_page(self, title, page_number):
+        """'yes' / 'no' when the page clearly does (not) begin with the title, else None"""
+        page = self.page(page_number)
+        title = Title(title)
+        match = page.match(title)
+        line = match[1]
+        if line is None:
+            return "no" if page.absent(title, match) else None
+        if line == 0:
+            return "yes"
+        if len(self.page_list) < BOILERPLATE_MIN_PAGES:
+            # Too few pages to tell a running header from text above the title
+            return None
+        boilerplate = self.boilerplate()
+        return "yes" if all(key in boilerplate for key in page.keys[:line]) else "no"
+
+_index_cache = IdentityCache(INDEX_CACHE_SIZE)
+
+def title_index(page_list):
+    """Shared TitleIndex of a page list (the last few documents are kept)"""
+    index = _index_cache.get(page_list)
+    if index is None or len(index._pages) != len(page_list):
+        index = TitleIndex(page_list)
+        _index_cache.put(page_list, index)
+    return index
+
+def locate_title(title, content):
+    """Physical index of the one page of a fixer prompt that clearly holds the title, else None"""
+    title = Title(title)
+    scores = [(page_lines(text).match(title)[0], int(number)) for number, text in _PAGE_BLOCK.findall(content)]
+    best = max((score for score, _ in scores), default=0.0)
+    pages = [number for score, number in scores if score == best]
+    return pages[0] if best >= ACCEPT_SCORE and len(pages) == 1 else None
+
+_stats = {check: {"local": 0, "llm": 0} for check in ("appearance", "start", "index_fix")}
+_stats_lock = threading.Lock()
+
+def _count(check, decided):
+    with _stats_lock:
+        _stats[check]["local" if decided else "llm"] += 1
+
+def get_title_match_stats():
+    """Entries decided locally / sent to the LLM, per check"""
+    with _stats_lock:
+        return {check: dict(counts) for check, counts in _stats.items()}
+
+def _local_first(func, decide):
+    """Sync or async wrapper of func that returns decide(...) unless it is None"""
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            result = decide(*args, **kwargs)
+            return result if result is not None else await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        result = decide(*args, **kwargs)
+        return result if result is not None else func(*args, **kwargs)
+    return wrapper
+
+def _decide_title_appearance(item, page_list, start_index=1, *args, **kwargs):
+    page_number = item.get("physical_index")
+    if page_number is None or not 1 <= page_number - start_index + 1 <= len(page_list):
+        return None
+    answer = title_on_page(item["title"], title_index(page_list).page(page_number - start_index + 1))
+    _count("appearance", answer is not None)
+    if answer is None:
+        return None
+    return {"list_index": item.get("list_index"), "answer": answer, "title": item["title"], "page_number": page_number}
+
+def _decide_index_fix(section_title, content, *args, **kwargs):
+    page_number = locate_title(section_title, content)
+    _count("index_fix", page_number is not None)
+    return page_number
+
+def install_title_matcher(page_index_module):
+    """Answer title verification, title-at-page-start and index fixing locally where clear-cut"""
+    page_index_module.check_title_appearance = _local_first(
+        page_index_module.check_title_appearance, _decide_title_appearance)
+    page_index_module.single_toc_item_index_fixer = _local_first(
+        page_index_module.single_toc_item_index_fixer, _decide_index_fix)
+
+    check_in_start_concurrent = page_index_module.check_title_appearance_in_start_concurrent
+
+    @functools.wraps(check_in_start_concurrent)
+    async def check_title_appearance_in_start_concurrent(structure, page_list, model=None, logger=None):
+        index = title_index(page_list)
+        pending = []
+        for item in structure:
+            page_number = item.get("physical_index")
+            answer = None
+            if page_number is not None and 1 <= page_number <= len(page_list):
+                answer = index.title_starts_page(item["title"], page_number)
+                _count("start", answer is not None)
+            if answer is None:
+                pending.append(item)
+            else:
+                item["appear_start"] = answer
+        if pending:
+            # The items are shared with structure, so their appear_start is set in place
+            await check_in_start_concurrent(pending, page_list, model=model, logger=logger)
+        return structure
+
+    page_index_module.check_title_appearance_in_start_concurrent = check_title_appearance_in_start_concurrent
+    return page_index_module
@@ -0,0 +1,70 @@
+"""
+Local table-of-contents page detection
+Upstream PageIndex asks the LLM, page by page, whether each of the first
+--toc-check-pages pages is a table of contents. classify_toc_page() scores the page text
+for dotted leaders ending in a page number, numbered entries ("5.5.1.2 Title 131") and a
+"Contents" heading, and only returns None for pages it cannot call with confidence.
+install_toc_heuristics() wraps toc_detector_single_page of a loaded page_index module so
+only those ambiguous pages reach the model.
+"""
+
+import functools
+import re
+import threading
+
+MIN_LEADER_ENTRIES = 5
+MIN_LEADER_RATIO = 0.25
+MAX_NUMBERED_RATIO_FOR_NO = 0.1
+MIN_LINES = 3
+
+# "Registration procedure ........ 131" (PyPDF2 may put spaces inside the leader)
+_LEADER_ENTRY = re.compile(r"(?:\.\s?){4,}\s*\d{1,4}\s*$")
+# "5.5.1.2 Registration procedure 131", "Annex D (normative): UE policy delivery service 1093"
+_NUMBERED_ENTRY = re.compile(r"^(?:Annex\s+[A-Z]\b|[A-Z]?\d*(?:\.\d+)+|\d+)\s+\S.*\s\d{1,4}$")
+_CONTENTS_HEADING = re.compile(r"^(?:table of )?contents$|^目\s*录$", re.IGNORECASE)
+
+def toc_page_features(text):
+    lines = [line.strip() for line in str(text).splitlines() if line.strip()]
+    return {
+        "lines": len(lines),
+        "leader_entries": sum(1 for line in lines if _LEADER_ENTRY.search(line)),
+        "numbered_entries": sum(1 for line in lines if _NUMBERED_ENTRY.match(line)),
+        "contents_heading": any(_CONTENTS_HEADING.match(line) for line in lines),
+    }
+
+def classify_toc_page(text):
+    """'yes' / 'no' for pages that are clearly (not) a table of contents, None when ambiguous"""
+    features = toc_page_features(text)
+    lines = features["lines"]
+    if lines < MIN_LINES:
+        return "no"
+    if features["leader_entries"] >= MIN_LEADER_ENTRIES and features["leader_entries"] >= MIN_LEADER_RATIO * lines:
+        return "yes"
+    if (features["leader_entries"] == 0 and not features["contents_heading"]
+            and features["numbered_entries"] < MAX_NUMBERED_RATIO_FOR_NO * lines):
+        return "no"
+    return None
+
+_stats = {"local_yes": 0, "local_no": 0, "llm": 0}
+_stats_lock = threading.Lock()
+
+def get_toc_heuristic_stats():
+    """Pages decided locally ('local_yes'/'local_no') and pages sent to the LLM ('llm')"""
+    with _stats_lock:
+        return dict(_stats)
+
+def install_toc_heuristics(page_index_module):
+    """Answer toc_detector_single_page locally for unambiguous pages"""
+    toc_detector_single_page = page_index_module.toc_detector_single_page
+
+    @functools.wraps(toc_detector_single_page)
+    def detect(content, *args, **kwargs):
+        verdict = classify_toc_page(content)
+        with _stats_lock:
+            _stats["llm" if verdict is None else f"local_{verdict}"] += 1
+        if verdict is not None:
+            return verdict
+        return toc_detector_single_page(content, *args, **kwargs)
+
+    page_index_module.toc_detector_single_page = detect
+    return detect
@@ -0,0 +1,60 @@
+"""
+Token counting shared by the PageIndex adapters
+tiktoken's cl100k_base is used as an approximation for every provider. The encoder is
+loaded once per process; count_tokens_batch spreads large batches across threads.
+"""
+
+import functools
+import os
+
+try:
+    import tiktoken
+    HAS_TIKTOKEN = True
+except ImportError:
+    HAS_TIKTOKEN = False
+
+ENCODING_NAME = "cl100k_base"
+DEFAULT_BATCH_THREADS = min(8, os.cpu_count() or 1)
+
+@functools.lru_cache(maxsize=None)
+def get_encoder():
+    """Load the tiktoken encoder once; None if tiktoken or its BPE file is unavailable"""
+    if not HAS_TIKTOKEN:
+        return None
+    try:
+        return tiktoken.get_encoding(ENCODING_NAME)
+    except Exception:
+        return None
+
+def tokenizer_id(approximate=False):
+    """Identifies what count_tokens measures, for caches that store token counts"""
+    if approximate or get_encoder() is None:
+        return "approx-len/4"
+    return f"tiktoken-{tiktoken.__version__}/{ENCODING_NAME}"
+
+def approximate_tokens(text):
+    """Rough estimate (~4 characters per token) for budget decisions that don't need exact counts"""
+    return len(text) // 4 if text else 0
+
+def count_tokens(text, model=None, approximate=False):
+    """
+    Count tokens in text
+    Note: tiktoken is used as approximation for non-OpenAI models
+    """
+    if not text:
+        return 0
+    encoder = None if approximate else get_encoder()
+    if encoder is None:
+        return approximate_tokens(text)
+    return len(encoder.encode_ordinary(str(text)))
+
+def count_tokens_batch(texts, model=None, approximate=False, num_threads=DEFAULT_BATCH_THREADS):
+    """Count tokens for many texts at once using tiktoken's threaded batch encoder"""
+    texts = [str(text) if text else "" for text in texts]
+    encoder = None if approximate else get_encoder()
+    if encoder is None:
+        return [approximate_tokens(text) for text in texts]
+    if num_threads <= 1:
+        return [len(encoder.encode_ordinary(text)) for text in texts]
+    encoded = encoder.encode_ordinary_batch(texts, num_threads=num_threads)
+    return [len(tokens) for tokens in encoded]
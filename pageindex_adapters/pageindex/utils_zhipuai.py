@@ -3,12 +3,6 @@ ZhipuAI (智谱AI) adapter for PageIndex
 This module provides ZhipuAI GLM-4 compatible replacements for OpenAI API calls
 """
 
-try:
-    import tiktoken
-    HAS_TIKTOKEN = True
-except ImportError:
-    HAS_TIKTOKEN = False
-
 import logging
 import os
 from datetime import datetime
@@ -28,10 +22,26 @@ from types import SimpleNamespace as config
 # Import ZhipuAI SDK
 from zhipuai import ZhipuAI
 
+from .token_counter import count_tokens
+from .pdf_document import open_pdf_document
+from .json_logger import JsonLogger
+from .http_client import get_async_http_client, LLMAPIError
+from .llm_scheduler import get_scheduler
+from .retry_policy import get_retry_policy
+from .response_cache import get_response_cache, make_cache_key
+from .content_fingerprint import content_fingerprint
+from .doc_tree import DocTree, find_node_by_id, node_without_children
+from .json_extract import JsonExtractionError, extract_json_with_repairs
+from .summary_packing import (get_summary_packing, packed_summary_prompt, parse_packed_summaries,
+                              record_summary_request, summarize_packed)
+
 # Get API key from environment
 ZHIPUAI_API_KEY = os.getenv("ZHIPUAI_API_KEY")
 CHATGPT_API_KEY = os.getenv("CHATGPT_API_KEY")  # Keep for compatibility
 
+# OpenAI-compatible endpoint, used by the native async path
+ZHIPUAI_API_BASE = "https://open.bigmodel.cn/api/paas/v4"
+
 # Model mapping
 ZHIPUAI_MODEL_MAP = {
     "gpt-4o": "glm-4-flash",
@@ -45,30 +55,67 @@ def get_zhipuai_model_name(openai_model):
     """Convert OpenAI model name to ZhipuAI model name"""
     return ZHIPUAI_MODEL_MAP.get(openai_model, "glm-4-flash")
 
-def count_tokens(text, model=None):
+def call_zhipuai_chat(model_name, messages, api_key=None, temperature=0):
     """
-    Count tokens in text
-    Note: For ZhipuAI, we use tiktoken as approximation
+    Call ZhipuAI chat completions through the official SDK
     """
-    if not text:
-        return 0
-    if HAS_TIKTOKEN:
-        try:
-            enc = tiktoken.get_encoding("cl100k_base")
-            tokens = enc.encode(text)
-            return len(tokens)
-        except Exception as e:
-            # Fallback: rough estimation
-            return len(text) // 4
+    # Initialize ZhipuAI client
+    client = ZhipuAI(api_key=api_key or ZHIPUAI_API_KEY)
+
+    # Call ZhipuAI API
+    response = client.chat.completions.create(
+        model=model_name,
+        messages=messages,
+        temperature=temperature,
+    )
+
+    # Extract response
+    text = response.choices[0].message.content
+    finish_reason = response.choices[0].finish_reason
+
+    # Map finish_reason to OpenAI format
+    if finish_reason == "length":
+        return text, "max_output_reached"
     else:
-        # Fallback: rough estimation
-        return len(text) // 4
+        return text, "finished"
+
+async def call_zhipuai_chat_async(model_name, messages, api_key=None, temperature=0):
+    """
+    Call the OpenAI-compatible chat completions endpoint on the event loop's native async client
+    """
+    if not api_key:
+        api_key = ZHIPUAI_API_KEY
+
+    if not api_key:
+        raise ValueError("ZHIPUAI_API_KEY not set")
+
+    url = f"{ZHIPUAI_API_BASE}/chat/completions"
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}",
+    }
+    payload = {
+        "model": model_name,
+        "messages": messages,
+        "temperature": temperature,
+    }
+
+    client = await get_async_http_client()
+    status_code, response_headers, body = await client.post_json(url, payload, headers=headers)
+
+    if status_code != 200:
+        raise LLMAPIError(f"ZhipuAI API error: {status_code} - {body}", status_code=status_code,
+                          headers=response_headers)
+
+    choice = json.loads(body)["choices"][0]
+    if choice.get("finish_reason") == "length":
+        return choice["message"]["content"], "max_output_reached"
+    return choice["message"]["content"], "finished"
 
 def ChatGPT_API_with_finish_reason(model, prompt, api_key=None, chat_history=None):
     """
     ZhipuAI adapter for ChatGPT API with finish reason
     """
-    max_retries = 10
     zhipuai_model_name = get_zhipuai_model_name(model)
 
     if not api_key:
@@ -77,42 +124,37 @@ def ChatGPT_API_with_finish_reason(model, prompt, api_key=None, chat_history=Non
     if not api_key:
         raise ValueError("ZHIPUAI_API_KEY not set")
 
-    for i in range(max_retries):
-        try:
-            # Initialize ZhipuAI client
-            client = ZhipuAI(api_key=api_key)
-
-            # Build messages
-            messages = []
-            if chat_history:
-                messages = chat_history.copy()
-            messages.append({"role": "user", "content": prompt})
-
-            # Call ZhipuAI API
-            response = client.chat.completions.create(
-                model=zhipuai_model_name,
-                messages=messages,
-                temperature=0,
-            )
-
-            # Extract response
-            text = response.choices[0].message.content
-            finish_reason = response.choices[0].finish_reason
-
-            # Map finish_reason to OpenAI format
-            if finish_reason == "length":
-                return text, "max_output_reached"
-            else:
-                return text, "finished"
+    # Build messages
+    messages = []
+    if chat_history:
+        messages = chat_history.copy()
+    messages.append({"role": "user", "content": prompt})
 
-        except Exception as e:
-            print(f'************* Retrying (ZhipuAI) ************* {e}')
-            logging.error(f"ZhipuAI Error: {e}")
-            if i < max_retries - 1:
-                time.sleep(2)
-            else:
-                logging.error('Max retries reached for prompt: ' + prompt[:100])
-                return "Error", "error"
+    scheduler = get_scheduler()
+    cost = sum(count_tokens(msg["content"]) for msg in messages) if scheduler.tracks_tokens else 0
+
+    def _call():
+        return call_zhipuai_chat(zhipuai_model_name, messages, api_key=api_key, temperature=0)
+
+    cache = get_response_cache()
+    if cache:
+        cache_key = make_cache_key("zhipuai", zhipuai_model_name, 0, chat_history, prompt)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    try:
+        text, finish_reason = get_retry_policy().call(
+            lambda: scheduler.run(_call, cost=cost),
+            label="ZhipuAI"
+        )
+    except Exception:
+        logging.error('Max retries reached for prompt: ' + prompt[:100])
+        return "Error", "error"
+
+    if cache:
+        cache.put(cache_key, (text, finish_reason))
+    return text, finish_reason
 
 def ChatGPT_API(model, prompt, api_key=None, chat_history=None):
     """
@@ -121,11 +163,11 @@ def ChatGPT_API(model, prompt, api_key=None, chat_history=None):
     text, _ = ChatGPT_API_with_finish_reason(model, prompt, api_key, chat_history)
     return text
 
-async def ChatGPT_API_async(model, prompt, api_key=None):
+async def ChatGPT_API_async(model, prompt, api_key=None, use_cache=True):
     """
     Async version for ZhipuAI API
+    use_cache=False skips the prompt-level response cache, for callers that cache the answer under their own key
     """
-    max_retries = 10
     zhipuai_model_name = get_zhipuai_model_name(model)
 
     if not api_key:
@@ -134,32 +176,36 @@ async def ChatGPT_API_async(model, prompt, api_key=None):
     if not api_key:
         raise ValueError("ZHIPUAI_API_KEY not set")
 
-    for i in range(max_retries):
-        try:
-            # Run in executor since ZhipuAI SDK doesn't have native async
-            loop = asyncio.get_event_loop()
-
-            def _generate():
-                client = ZhipuAI(api_key=api_key)
-                messages = [{"role": "user", "content": prompt}]
-                response = client.chat.completions.create(
-                    model=zhipuai_model_name,
-                    messages=messages,
-                    temperature=0,
-                )
-                return response.choices[0].message.content
-
-            result = await loop.run_in_executor(None, _generate)
-            return result
-
-        except Exception as e:
-            print(f'************* Retrying Async (ZhipuAI) ************* {e}')
-            logging.error(f"ZhipuAI Async Error: {e}")
-            if i < max_retries - 1:
-                await asyncio.sleep(2)
-            else:
-                logging.error('Max retries reached for async prompt')
-                return "Error"
+    scheduler = get_scheduler()
+    cost = count_tokens(prompt) if scheduler.tracks_tokens else 0
+
+    async def _call():
+        return await call_zhipuai_chat_async(
+            zhipuai_model_name,
+            [{"role": "user", "content": prompt}],
+            api_key=api_key,
+            temperature=0
+        )
+
+    cache = get_response_cache() if use_cache else None
+    if cache:
+        cache_key = make_cache_key("zhipuai", zhipuai_model_name, 0, None, prompt)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached[0]
+
+    try:
+        text, finish_reason = await get_retry_policy().call_async(
+            lambda: scheduler.run_async(_call, cost=cost),
+            label="ZhipuAI Async"
+        )
+    except Exception:
+        logging.error('Max retries reached for async prompt')
+        return "Error"
+
+    if cache:
+        cache.put(cache_key, (text, finish_reason))
+    return text
 
 # ============================================================================
 # Utility functions from original PageIndex utils.py
@@ -168,32 +214,15 @@ async def ChatGPT_API_async(model, prompt, api_key=None):
 
 def extract_text_from_pdf(pdf_path):
     """Extract all text from a PDF file"""
-    pdf_reader = PyPDF2.PdfReader(pdf_path)
-    text = ""
-    for page_num in range(len(pdf_reader.pages)):
-        page = pdf_reader.pages[page_num]
-        text += page.extract_text()
-    return text
+    return open_pdf_document(pdf_path).extract_text()
 
 def get_pdf_title(pdf_path):
     """Get PDF title from metadata"""
-    pdf_reader = PyPDF2.PdfReader(pdf_path)
-    meta = pdf_reader.metadata
-    title = meta.title if meta and meta.title else 'Untitled'
-    return title
+    return open_pdf_document(pdf_path).title
 
 def get_text_of_pages(pdf_path, start_page, end_page, tag=True):
     """Extract text from specific page range"""
-    pdf_reader = PyPDF2.PdfReader(pdf_path)
-    text = ""
-    for page_num in range(start_page-1, end_page):
-        page = pdf_reader.pages[page_num]
-        page_text = page.extract_text()
-        if tag:
-            text += f"<start_index_{page_num+1}>\n{page_text}\n<end_index_{page_num+1}>\n"
-        else:
-            text += page_text
-    return text
+    return open_pdf_document(pdf_path).text_of_pages(start_page, end_page, tag=tag)
 
 def sanitize_filename(filename, replacement='-'):
     """Sanitize filename by replacing invalid characters"""
@@ -204,10 +233,7 @@ def get_pdf_name(pdf_path):
     if isinstance(pdf_path, str):
         pdf_name = os.path.basename(pdf_path)
     elif isinstance(pdf_path, BytesIO):
-        pdf_reader = PyPDF2.PdfReader(pdf_path)
-        meta = pdf_reader.metadata
-        pdf_name = meta.title if meta and meta.title else 'Untitled'
-        pdf_name = sanitize_filename(pdf_name)
+        pdf_name = sanitize_filename(open_pdf_document(pdf_path).title)
     return pdf_name
 
 def list_to_tree(data):
@@ -266,32 +292,13 @@ def get_json_content(response):
     return json_content
 
 def extract_json(content):
-    """Parse JSON from text, handling common formatting issues"""
-    try:
-        start_idx = content.find("```json")
-        if start_idx != -1:
-            start_idx += 7
-            end_idx = content.rfind("```")
-            json_content = content[start_idx:end_idx].strip()
-        else:
-            json_content = content.strip()
-
-        json_content = json_content.replace('None', 'null')
-        json_content = json_content.replace('\n', ' ').replace('\r', ' ')
-        json_content = ' '.join(json_content.split())
-
-        return json.loads(json_content)
-    except json.JSONDecodeError as e:
-        logging.error(f"Failed to extract JSON: {e}")
-        try:
-            json_content = json_content.replace(',]', ']').replace(',}', '}')
-            return json.loads(json_content)
-        except:
-            logging.error("Failed to parse JSON even after cleanup")
-            return {}
-    except Exception as e:
-        logging.error(f"Unexpected error while extracting JSON: {e}")
-        return {}
+    """Parse JSON from text, repairing common LLM formatting issues (falsy JsonExtractionError on failure)"""
+    result, repairs = extract_json_with_repairs(content)
+    if isinstance(result, JsonExtractionError):
+        logging.error(f"Failed to extract JSON: {result.message} near {result.snippet!r}")
+    elif repairs:
+        logging.debug(f"Repaired JSON: {', '.join(sorted(set(repairs)))}")
+    return result
 
 def write_node_id(data, node_id=0):
     """Recursively assign node IDs to tree structure"""
@@ -337,100 +344,29 @@ def convert_page_to_int(data):
                 pass
     return data
 
-def get_page_tokens(pdf_path, model="gpt-4o-2024-11-20", pdf_parser="PyPDF2"):
-    """Extract text and count tokens for each PDF page"""
-    if pdf_parser == "PyPDF2":
-        pdf_reader = PyPDF2.PdfReader(pdf_path)
-        page_list = []
-        for page_num in range(len(pdf_reader.pages)):
-            page = pdf_reader.pages[page_num]
-            page_text = page.extract_text()
-            token_length = count_tokens(page_text, model)
-            page_list.append((page_text, token_length))
-        return page_list
-    elif pdf_parser == "PyMuPDF":
-        if isinstance(pdf_path, BytesIO):
-            pdf_stream = pdf_path
-            doc = pymupdf.open(stream=pdf_stream, filetype="pdf")
-        elif isinstance(pdf_path, str) and os.path.isfile(pdf_path) and pdf_path.lower().endswith(".pdf"):
-            doc = pymupdf.open(pdf_path)
-        page_list = []
-        for page in doc:
-            page_text = page.get_text()
-            token_length = count_tokens(page_text, model)
-            page_list.append((page_text, token_length))
-        return page_list
-    else:
-        raise ValueError(f"Unsupported PDF parser: {pdf_parser}")
+def get_page_tokens(pdf_path, model="gpt-4o-2024-11-20", pdf_parser=None):
+    """
+    Extract text and count tokens for each PDF page (pdf_parser=None: configured default parser)
+    Running headers/footers are stripped and whitespace collapsed unless page normalization
+    is turned off (configure_page_normalization)
+    """
+    return open_pdf_document(pdf_path, pdf_parser).get_normalized_page_tokens(model)
 
 def structure_to_list(structure):
     """Convert tree structure to flat list of nodes"""
-    if isinstance(structure, dict):
-        nodes = []
-        nodes.append(structure)
-        if 'nodes' in structure:
-            nodes.extend(structure_to_list(structure['nodes']))
-        return nodes
-    elif isinstance(structure, list):
-        nodes = []
-        for item in structure:
-            nodes.extend(structure_to_list(item))
-        return nodes
+    return DocTree(structure).nodes()
 
 def get_nodes(structure):
-    """Get all nodes from structure"""
-    if isinstance(structure, dict):
-        structure_node = copy.deepcopy(structure)
-        structure_node.pop('nodes', None)
-        nodes = [structure_node]
-        for key in list(structure.keys()):
-            if 'nodes' in key:
-                nodes.extend(get_nodes(structure[key]))
-        return nodes
-    elif isinstance(structure, list):
-        nodes = []
-        for item in structure:
-            nodes.extend(get_nodes(item))
-        return nodes
+    """Get all nodes from structure (shallow copies without 'nodes'; text is not duplicated)"""
+    return [node_without_children(node) for node in DocTree(structure).nodes()]
 
 def get_leaf_nodes(structure):
-    """Get only leaf nodes from structure"""
-    if isinstance(structure, dict):
-        if not structure.get('nodes'):
-            structure_node = copy.deepcopy(structure)
-            structure_node.pop('nodes', None)
-            return [structure_node]
-        else:
-            leaf_nodes = []
-            for key in list(structure.keys()):
-                if 'nodes' in key:
-                    leaf_nodes.extend(get_leaf_nodes(structure[key]))
-            return leaf_nodes
-    elif isinstance(structure, list):
-        leaf_nodes = []
-        for item in structure:
-            leaf_nodes.extend(get_leaf_nodes(item))
-        return leaf_nodes
+    """Get only leaf nodes from structure (shallow copies without 'nodes')"""
+    return [node_without_children(node) for node in DocTree(structure).nodes(leaves_only=True)]
 
 def is_leaf_node(data, node_id):
-    """Check if a node is a leaf node"""
-    def find_node(data, node_id):
-        if isinstance(data, dict):
-            if data.get('node_id') == node_id:
-                return data
-            for key in data.keys():
-                if 'nodes' in key:
-                    result = find_node(data[key], node_id)
-                    if result:
-                        return result
-        elif isinstance(data, list):
-            for item in data:
-                result = find_node(item, node_id)
-                if result:
-                    return result
-        return None
-
-    node = find_node(data, node_id)
+    """Check if a node is a leaf node (node_id lookups use a cached index of data)"""
+    node = find_node_by_id(data, node_id)
 
     if node and not node.get('nodes'):
         return True
@@ -442,53 +378,94 @@ def get_last_node(structure):
 
 def get_text_of_pdf_pages(pdf_pages, start_page, end_page):
     """Extract text from PDF page range"""
-    text = ""
-    for page_num in range(start_page-1, end_page):
-        text += pdf_pages[page_num][0]
-    return text
+    return "".join(pdf_pages[page_num][0] for page_num in range(start_page-1, end_page))
 
 def get_text_of_pdf_pages_with_labels(pdf_pages, start_page, end_page):
     """Extract text from PDF pages with page labels"""
-    text = ""
-    for page_num in range(start_page-1, end_page):
-        text += f"<physical_index_{page_num+1}>\n{pdf_pages[page_num][0]}\n<physical_index_{page_num+1}>\n"
-    return text
+    return "".join(
+        f"<physical_index_{page_num+1}>\n{pdf_pages[page_num][0]}\n<physical_index_{page_num+1}>\n"
+        for page_num in range(start_page-1, end_page)
+    )
 
 def get_number_of_pages(pdf_path):
     """Get total number of pages in PDF"""
-    pdf_reader = PyPDF2.PdfReader(pdf_path)
-    num = len(pdf_reader.pages)
-    return num
+    return open_pdf_document(pdf_path).num_pages
 
 def add_node_text(node, pdf_pages):
     """Add text content to nodes from PDF pages"""
-    if isinstance(node, dict):
-        start_page = node.get('start_index')
-        end_page = node.get('end_index')
-        node['text'] = get_text_of_pdf_pages(pdf_pages, start_page, end_page)
-        if 'nodes' in node:
-            add_node_text(node['nodes'], pdf_pages)
-    elif isinstance(node, list):
-        for index in range(len(node)):
-            add_node_text(node[index], pdf_pages)
+    for item in DocTree(node).nodes():
+        item['text'] = get_text_of_pdf_pages(pdf_pages, item.get('start_index'), item.get('end_index'))
     return
 
+def node_summary_cache_key(node, model=None):
+    """Response cache key of a node summary: provider, resolved model and the node text's fingerprint"""
+    return make_cache_key("zhipuai:node-summary", get_zhipuai_model_name(model), 0, None, content_fingerprint(node['text']))
+
 async def generate_node_summary(node, model=None):
-    """Generate summary for a single node"""
+    """
+    Generate summary for a single node
+    With the response cache enabled, summaries are also stored under the node text's
+    revision-independent fingerprint, so unchanged clauses of a new spec release reuse them.
+    """
+    response_cache = get_response_cache()
+    summary_key = None
+    if response_cache is not None:
+        summary_key = node_summary_cache_key(node, model)
+        cached = response_cache.get(summary_key)
+        if cached is not None:
+            return cached[0]
+
     prompt = f"""You are given a part of a document, your task is to generate a description of the partial document about what are main points covered in the partial document.
 
     Partial Document Text: {node['text']}
 
     Directly return the description, do not include any other text.
     """
-    response = await ChatGPT_API_async(model, prompt)
+    # Cached under the node text's fingerprint only, not under the prompt as well
+    record_summary_request()
+    response = await ChatGPT_API_async(model, prompt, use_cache=False)
+    if summary_key is not None and response != "Error":
+        response_cache.put(summary_key, (response, "finished"))
     return response
 
+async def summarize_node_batch(nodes, model=None):
+    """
+    Summaries of several small nodes from one packed request (None where the response has none)
+    Like generate_node_summary, summaries are cached under each node text's fingerprint, so
+    packed and single-node runs reuse each other's results.
+    """
+    response_cache = get_response_cache()
+    keys = [None] * len(nodes)
+    summaries = [None] * len(nodes)
+    if response_cache is not None:
+        for index, node in enumerate(nodes):
+            keys[index] = node_summary_cache_key(node, model)
+            cached = response_cache.get(keys[index])
+            if cached is not None:
+                summaries[index] = cached[0]
+
+    missing = [index for index, summary in enumerate(summaries) if summary is None]
+    if missing:
+        prompt = packed_summary_prompt([nodes[index]['text'] for index in missing])
+        record_summary_request(len(missing))
+        response = await ChatGPT_API_async(model, prompt, use_cache=False)
+        parsed = parse_packed_summaries(response, len(missing)) if response != "Error" else {}
+        for node_id, index in enumerate(missing, 1):
+            summaries[index] = parsed.get(node_id)
+            if response_cache is not None and summaries[index] is not None:
+                response_cache.put(keys[index], (summaries[index], "finished"))
+    return summaries
+
 async def generate_summaries_for_structure(structure, model=None):
-    """Generate summaries for all nodes in structure"""
+    """Generate summaries for all nodes in structure (small nodes share requests when summary packing is on)"""
     nodes = structure_to_list(structure)
-    tasks = [generate_node_summary(node, model=model) for node in nodes]
-    summaries = await asyncio.gather(*tasks)
+    packing = get_summary_packing()
+    if packing["enabled"]:
+        summaries = await summarize_packed(nodes, model, generate_node_summary, summarize_node_batch,
+                                           packing["batch_tokens"])
+    else:
+        tasks = [generate_node_summary(node, model=model) for node in nodes]
+        summaries = await asyncio.gather(*tasks)
 
     for node, summary in zip(nodes, summaries):
         node['summary'] = summary
@@ -568,43 +545,6 @@ def add_preface_if_needed(data):
         data.insert(0, preface_node)
     return data
 
-class JsonLogger:
-    """Logger that writes to JSON files"""
-    def __init__(self, file_path):
-        pdf_name = file_path if isinstance(file_path, str) else 'Untitled'
-        if isinstance(file_path, str):
-            pdf_name = os.path.basename(file_path)
-
-        current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.filename = f"{pdf_name}_{current_time}.json"
-        os.makedirs("./logs", exist_ok=True)
-        self.log_data = []
-
-    def log(self, level, message, **kwargs):
-        if isinstance(message, dict):
-            self.log_data.append(message)
-        else:
-            self.log_data.append({'message': message})
-
-        with open(self._filepath(), "w") as f:
-            json.dump(self.log_data, f, indent=2)
-
-    def info(self, message, **kwargs):
-        self.log("INFO", message, **kwargs)
-
-    def error(self, message, **kwargs):
-        self.log("ERROR", message, **kwargs)
-
-    def debug(self, message, **kwargs):
-        self.log("DEBUG", message, **kwargs)
-
-    def exception(self, message, **kwargs):
-        kwargs["exception"] = True
-        self.log("ERROR", message, **kwargs)
-
-    def _filepath(self):
-        return os.path.join("logs", self.filename)
-
 class ConfigLoader:
     """Configuration loader for PageIndex"""
     def __init__(self, default_path: str = None):
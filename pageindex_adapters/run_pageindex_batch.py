@@ -0,0 +1,280 @@
+"""
+Batch PageIndex ingestion
+Processes many PDF/Markdown documents (directories, globs or files) in one process:
+the provider adapter is patched in once, documents run concurrently on a thread pool,
+and every LLM call goes through the same rate-limited scheduler, HTTP pool and caches.
+Progress is recorded after each document, so re-running the same command skips
+documents that already finished.
+
+Example:
+  python run_pageindex_batch.py --provider gemini "docs/chapters/ts_124501v181200p/*.pdf"
+"""
+
+import argparse
+import asyncio
+import glob
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Only the option helpers are imported up front; load_pageindex() imports the adapter
+from pageindex.runner_args import add_pipeline_arguments, configure_pipeline, install_pipeline_patches
+
+# provider -> (adapter module, default model, API key variable)
+PROVIDERS = {
+    "gemini": ("utils_gemini_rest", "gemini-2.5-flash", "GEMINI_API_KEY"),
+    "zhipuai": ("utils_zhipuai", "glm-4-flash", "ZHIPUAI_API_KEY"),
+}
+DOCUMENT_EXTENSIONS = (".pdf", ".md")
+PROGRESS_FILENAME = "batch_progress.json"
+REPORT_FILENAME = "batch_report.json"
+
+def load_pageindex(provider):
+    """Patch the provider adapter in as pageindex.utils (same steps as run_pageindex_gemini.py)"""
+    for module in [key for key in sys.modules if key.startswith('pageindex')]:
+        del sys.modules[module]
+
+    utils_replacement = importlib.import_module(f"pageindex.{PROVIDERS[provider][0]}")
+    sys.modules['pageindex.utils'] = utils_replacement
+
+    page_index_module = importlib.import_module('pageindex.page_index')
+    page_index_md_module = importlib.import_module('pageindex.page_index_md')
+    importlib.reload(page_index_module)
+    importlib.reload(page_index_md_module)
+    return page_index_module.page_index_main, page_index_md_module.md_to_tree
+
+def collect_documents(inputs):
+    """Expand directories and glob patterns into a sorted, de-duplicated list of documents"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = [os.path.join(item, name) for name in os.listdir(item)]
+        else:
+            candidates = glob.glob(item) or [item]
+        paths.extend(path for path in candidates if path.lower().endswith(DOCUMENT_EXTENSIONS))
+
+    documents = []
+    seen = set()
+    for path in sorted(paths):
+        key = os.path.abspath(path)
+        if key not in seen and os.path.isfile(path):
+            seen.add(key)
+            documents.append(path)
+    return documents
+
+def output_path_for(document, output_dir, provider):
+    base, _ = os.path.splitext(os.path.basename(document))
+    return os.path.join(output_dir, f"{base}_tree_{provider}.json")
+
+class BatchProgress:
+    """Per-document status persisted to a JSON file after every update"""
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    @staticmethod
+    def _source_state(document):
+        stat = os.stat(document)
+        return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+    def is_done(self, document):
+        """Finished before, its output still exists and the source file has not changed since"""
+        entry = self.entries.get(os.path.abspath(document))
+        return (entry is not None and entry["status"] == "done" and os.path.exists(entry["output"])
+                and entry["source"] == self._source_state(document))
+
+    def record(self, document, status, seconds, output=None, error=None, page_normalization=None, outline=None):
+        entry = {
+            "document": document,
+            "status": status,
+            "seconds": round(seconds, 1),
+            "output": output,
+            "error": error,
+            "page_normalization": page_normalization,
+            "outline": outline,
+            "source": self._source_state(document),
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        with self._lock:
+            self.entries[os.path.abspath(document)] = entry
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        return entry
+
+def process_document(document, args, page_index_main, md_to_tree):
+    """Run PageIndex on one document and save its tree; returns the output path"""
+    if document.lower().endswith('.pdf'):
+        opt = SimpleNamespace(
+            model=args.model,
+            toc_check_page_num=args.toc_check_pages,
+            max_page_num_each_node=args.max_pages_per_node,
+            max_token_num_each_node=args.max_tokens_per_node,
+            if_add_node_id=args.if_add_node_id,
+            if_add_node_summary=args.if_add_node_summary,
+            if_add_doc_description=args.if_add_doc_description,
+            if_add_node_text=args.if_add_node_text
+        )
+        result = page_index_main(document, opt)
+    else:
+        result = asyncio.run(md_to_tree(
+            md_path=document,
+            model=args.model,
+            if_thinning=(args.if_thinning.lower() == 'yes'),
+            thinning_threshold=args.thinning_threshold,
+            summary_token_threshold=args.summary_token_threshold,
+            if_add_node_id=(args.if_add_node_id.lower() == 'yes'),
+            if_add_node_summary=(args.if_add_node_summary.lower() == 'yes')
+        ))
+
+    output_file = output_path_for(document, args.output_dir, args.provider)
+    tmp_file = output_file + ".tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, output_file)
+    return output_file
+
+def run_batch(documents, args, progress, page_index_main, md_to_tree):
+    """Process documents on args.docs_concurrency threads; returns one report entry per document"""
+    report = {}
+    pending = []
+    for document in documents:
+        if not args.restart and progress.is_done(document):
+            entry = dict(progress.entries[os.path.abspath(document)], status="skipped")
+            report[document] = entry
+            print(f"⏭  {document} (done in a previous run)")
+        else:
+            pending.append(document)
+
+    from pageindex.identity_cache import clear_identity_caches
+    from pageindex.outline_tree import get_outline_outcome
+    from pageindex.page_normalizer import get_normalization_report
+
+    def worker(document):
+        started = time.monotonic()
+        print(f"▶  {document}")
+        try:
+            output_file = process_document(document, args, page_index_main, md_to_tree)
+        except Exception as e:
+            entry = progress.record(document, "failed", time.monotonic() - started,
+                                    error=f"{type(e).__name__}: {e}")
+            print(f"❌ {document}: {entry['error']}")
+            if args.verbose:
+                traceback.print_exc()
+        else:
+            entry = progress.record(document, "done", time.monotonic() - started, output=output_file,
+                                    page_normalization=get_normalization_report(document),
+                                    outline=get_outline_outcome(document))
+            print(f"✅ {document} -> {output_file} ({entry['seconds']}s)")
+        finally:
+            # Drop the node_id and page list indexes kept for the document; documents still running rebuild theirs
+            clear_identity_caches()
+        report[document] = entry
+
+    with ThreadPoolExecutor(max_workers=args.docs_concurrency, thread_name_prefix="pageindex-doc") as pool:
+        list(pool.map(worker, pending))
+    return [report[document] for document in documents]
+
+def print_report(report):
+    from pageindex.outline_tree import format_outline_outcome
+    from pageindex.page_normalizer import format_report
+
+    print("\n" + "=" * 70)
+    print("Batch report")
+    print("=" * 70)
+    for entry in report:
+        detail = entry["output"] if entry["status"] != "failed" else entry["error"]
+        print(f"  {entry['status']:<8}{entry['seconds']:>8}s  {entry['document']}")
+        print(f"  {'':<16}{detail}")
+        if entry.get("page_normalization"):
+            print(f"  {'':<16}{format_report(entry['page_normalization'])}")
+        if entry.get("outline"):
+            print(f"  {'':<16}{format_outline_outcome(entry['outline'])}")
+    counts = {status: sum(entry["status"] == status for entry in report) for status in ("done", "skipped", "failed")}
+    print(f"\n{counts['done']} done, {counts['skipped']} skipped, {counts['failed']} failed, {len(report)} total")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Process many PDF/Markdown documents with PageIndex under one shared LLM budget'
+    )
+    parser.add_argument('inputs', nargs='+',
+                      help='Documents, directories or glob patterns (quote globs to avoid shell expansion)')
+    parser.add_argument('--provider', choices=sorted(PROVIDERS), default='gemini',
+                      help='LLM adapter to use (default: gemini)')
+    parser.add_argument('--model', type=str, default=None,
+                      help='Model to use (default: gemini-2.5-flash / glm-4-flash)')
+    parser.add_argument('--output-dir', type=str, default='results',
+                      help='Directory for trees, progress file and report (default: results)')
+    parser.add_argument('--docs-concurrency', type=int, default=4,
+                      help='Number of documents processed at the same time (default: 4)')
+    parser.add_argument('--restart', action='store_true',
+                      help='Ignore the progress file and process every document again')
+    parser.add_argument('--verbose', action='store_true',
+                      help='Print tracebacks of failed documents')
+
+    add_pipeline_arguments(parser)
+    args = parser.parse_args()
+
+    _, default_model, api_key_var = PROVIDERS[args.provider]
+    args.model = args.model or default_model
+    # The adapter calls load_dotenv() on import, so check the key afterwards
+    page_index_main, md_to_tree = load_pageindex(args.provider)
+    install_pipeline_patches(args, sys.modules['pageindex.page_index'])
+    if not os.getenv(api_key_var):
+        print(f"ERROR: {api_key_var} not found! Set it in the environment or a .env file.")
+        sys.exit(1)
+
+    from pageindex.retry_policy import get_retry_metrics
+    from pageindex.summary_packing import get_summary_packing_stats
+    from pageindex.title_matcher import get_title_match_stats
+    from pageindex.toc_heuristics import get_toc_heuristic_stats
+    response_cache, _ = configure_pipeline(args)
+
+    documents = collect_documents(args.inputs)
+    if not documents:
+        print("No PDF or Markdown documents matched the given inputs")
+        sys.exit(1)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    progress = BatchProgress(os.path.join(args.output_dir, PROGRESS_FILENAME))
+
+    print("=" * 70)
+    print(f"PageIndex batch: {len(documents)} documents, provider {args.provider}, model {args.model}")
+    print(f"{args.docs_concurrency} documents at a time, {args.max_concurrency} LLM requests in flight")
+    print("=" * 70)
+
+    started = time.monotonic()
+    report = run_batch(documents, args, progress, page_index_main, md_to_tree)
+    print_report(report)
+
+    report_file = os.path.join(args.output_dir, REPORT_FILENAME)
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            "provider": args.provider,
+            "model": args.model,
+            "seconds": round(time.monotonic() - started, 1),
+            "retries": get_retry_metrics(),
+            "cache": response_cache.stats() if response_cache else None,
+            "toc_detection": None if args.no_toc_heuristics else get_toc_heuristic_stats(),
+            "title_matching": None if args.no_title_matcher else get_title_match_stats(),
+            "summary_packing": get_summary_packing_stats() if args.pack_summaries else None,
+            "documents": report,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"Report saved to: {report_file}")
+
+    if any(entry["status"] == "failed" for entry in report):
+        sys.exit(2)
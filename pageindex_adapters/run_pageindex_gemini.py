@@ -37,6 +37,7 @@ importlib.reload(page_index_md_module)
 # STEP 5: Now import the functions - they will automatically use the Gemini adapter
 from pageindex.page_index import page_index_main
 from pageindex.page_index_md import md_to_tree
+from pageindex.runner_args import add_pipeline_arguments, configure_pipeline, install_pipeline_patches
 
 if __name__ == "__main__":
     # Set up argument parser
@@ -53,31 +54,25 @@ if __name__ == "__main__":
         help='Gemini model to use (default: gemini-2.5-flash)'
     )
 
-    parser.add_argument('--toc-check-pages', type=int, default=20,
-                      help='Number of pages to check for table of contents (PDF only)')
-    parser.add_argument('--max-pages-per-node', type=int, default=10,
-                      help='Maximum number of pages per node (PDF only)')
-    parser.add_argument('--max-tokens-per-node', type=int, default=20000,
-                      help='Maximum number of tokens per node (PDF only)')
-
-    parser.add_argument('--if-add-node-id', type=str, default='yes',
-                      help='Whether to add node id to the node')
-    parser.add_argument('--if-add-node-summary', type=str, default='yes',
-                      help='Whether to add summary to the node')
-    parser.add_argument('--if-add-doc-description', type=str, default='no',
-                      help='Whether to add doc description to the doc')
-    parser.add_argument('--if-add-node-text', type=str, default='no',
-                      help='Whether to add text to the node')
-
-    # Markdown specific arguments
-    parser.add_argument('--if-thinning', type=str, default='no',
-                      help='Whether to apply tree thinning for markdown (markdown only)')
-    parser.add_argument('--thinning-threshold', type=int, default=5000,
-                      help='Minimum token threshold for thinning (markdown only)')
-    parser.add_argument('--summary-token-threshold', type=int, default=200,
-                      help='Token threshold for generating summaries (markdown only)')
+    add_pipeline_arguments(parser)
+
+    # Stage checkpoints (PDF only)
+    parser.add_argument('--resume', type=str, default=None, metavar='RUN_ID',
+                      help='Resume an interrupted PDF run from <runs-dir>/RUN_ID (--pdf_path defaults to the run\'s PDF)')
+    parser.add_argument('--runs-dir', type=str, default='runs',
+                      help='Directory of PDF run checkpoints (default: runs)')
+    parser.add_argument('--no-checkpoint', action='store_true',
+                      help='Do not checkpoint the pipeline stages of PDF runs')
     args = parser.parse_args()
 
+    response_cache, page_cache = configure_pipeline(args)
+
+    checkpoint = None
+    if args.resume:
+        from pageindex.run_checkpoint import RunCheckpoint
+        checkpoint = RunCheckpoint.resume(args.resume, args.runs_dir)
+        args.pdf_path = args.pdf_path or checkpoint.info["doc"]
+
     # Validate that exactly one file type is specified
     if not args.pdf_path and not args.md_path:
         raise ValueError("Either --pdf_path or --md_path must be specified")
@@ -131,6 +126,20 @@ if __name__ == "__main__":
             if_add_node_text=args.if_add_node_text
         )
 
+        if checkpoint is not None:
+            # Different options would miss every stored stage
+            opt, changed = checkpoint.resumed_options(opt)
+            if changed:
+                print(f"Resuming with the options stored for run {checkpoint.run_id}; ignoring changed {', '.join(changed)}")
+        if checkpoint is None and not args.no_checkpoint:
+            from pageindex.run_checkpoint import RunCheckpoint
+            checkpoint = RunCheckpoint.create(args.pdf_path, opt, args.runs_dir)
+        if checkpoint is not None:
+            from pageindex.run_checkpoint import install_checkpoints
+            install_checkpoints(checkpoint, page_index_module, utils_replacement)
+            print(f"Run ID: {checkpoint.run_id} (continue an interrupted run with --resume {checkpoint.run_id})")
+        install_pipeline_patches(args, page_index_module)
+
         result = page_index_main(args.pdf_path, opt)
 
         # Save result
@@ -139,6 +148,34 @@ if __name__ == "__main__":
 
         with open(output_file, 'w', encoding='utf-8') as f:
             json.dump(result, f, indent=2, ensure_ascii=False)
+        if checkpoint is not None:
+            checkpoint.mark_finished(output_file)
+            checkpoint.close()
+            print(f"Checkpoint: reused {checkpoint.stage_hits} stage results, {checkpoint.summary_hits} node summaries")
+        from pageindex.page_normalizer import format_report, get_normalization_report
+        page_report = get_normalization_report(args.pdf_path)
+        if page_report:
+            print(f"Page normalization: {format_report(page_report)}")
+        if args.outline_first:
+            from pageindex.outline_tree import format_outline_outcome, get_outline_outcome
+            outline = get_outline_outcome(args.pdf_path)
+            if outline:
+                print(f"Outline: {format_outline_outcome(outline)}")
+        if not args.no_toc_heuristics:
+            from pageindex.toc_heuristics import get_toc_heuristic_stats
+            toc_stats = get_toc_heuristic_stats()
+            print(f"TOC detection: {toc_stats['local_yes'] + toc_stats['local_no']} pages decided locally, "
+                  f"{toc_stats['llm']} sent to the LLM")
+        if not args.no_title_matcher:
+            from pageindex.title_matcher import get_title_match_stats
+            for check, counts in get_title_match_stats().items():
+                if counts["local"] or counts["llm"]:
+                    print(f"Title matching ({check}): {counts['local']} entries decided locally, {counts['llm']} sent to the LLM")
+        if args.pack_summaries:
+            from pageindex.summary_packing import get_summary_packing_stats
+            packing = get_summary_packing_stats()
+            print(f"Summary packing: {packing['nodes']} nodes in {packing['packed_requests']} packed and "
+                  f"{packing['single_requests']} single requests ({packing['splits']} batches split)")
 
         print("\n" + "=" * 70)
         print(f"✅ Success! Tree structure saved to: {output_file}")
@@ -194,3 +231,16 @@ if __name__ == "__main__":
         print("\n" + "=" * 70)
         print(f"✅ Success! Tree structure saved to: {output_file}")
         print("=" * 70)
+
+    if response_cache:
+        stats = response_cache.stats()
+        print(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['entries']} entries ({stats['bytes'] / 1024 / 1024:.1f} MB)")
+    if page_cache:
+        stats = page_cache.stats()
+        print(f"Page cache: {stats['hits']} hits, {stats['misses']} misses, {stats['documents']} documents")
+
+    from pageindex.retry_policy import get_retry_metrics
+    retries = get_retry_metrics()
+    print(f"LLM calls: {retries['calls']} ({retries['retries']} retries, {retries['backoff_seconds']:.1f}s backoff, "
+          f"{retries['failed_calls']} failed, {retries['fatal_errors']} fatal errors)")
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from pageindex.content_fingerprint import content_fingerprint, normalize_text
+
+OLD = "ETSI TS 124 501 V18.11.0 (2025-07)\n132\n3GPP TS 24.501 version 18.11.0 Release 18\n5.1 General\nText"
+NEW = "ETSI TS 124 501 V18.12.0 (2025-10)\n133\n3GPP TS 24.501 version 18.12.0 Release 18\n5.1  General\nText"
+
+
+def test_release_details_and_page_numbers_are_ignored():
+    assert normalize_text(OLD) == normalize_text(NEW)
+    assert content_fingerprint(OLD) == content_fingerprint(NEW)
+
+
+def test_changed_text_changes_the_fingerprint():
+    assert content_fingerprint(OLD) != content_fingerprint(OLD.replace("Text", "Changed text"))
+
+
+def test_node_summary_keys_depend_on_the_provider(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "test")
+    monkeypatch.setenv("ZHIPUAI_API_KEY", "test")
+    gemini = pytest.importorskip("pageindex.utils_gemini_rest")
+    zhipuai = pytest.importorskip("pageindex.utils_zhipuai")
+    node = {"text": OLD}
+    assert gemini.node_summary_cache_key(node) != zhipuai.node_summary_cache_key(node)
+    assert gemini.node_summary_cache_key(node) == gemini.node_summary_cache_key({"text": NEW})
+    # Keyed by the model actually called, so None and its OpenAI alias share summaries
+    assert gemini.node_summary_cache_key(node, "gpt-4o") == gemini.node_summary_cache_key(node, None)
+
+
+@pytest.mark.parametrize("module_name, call_name", [
+    ("pageindex.utils_gemini_rest", "call_gemini_rest_async"),
+    ("pageindex.utils_zhipuai", "call_zhipuai_chat_async"),
+])
+def test_node_summary_is_cached_once(monkeypatch, tmp_path, module_name, call_name):
+    monkeypatch.setenv("GEMINI_API_KEY", "test")
+    monkeypatch.setenv("ZHIPUAI_API_KEY", "test")
+    utils = pytest.importorskip(module_name)
+    from pageindex.response_cache import configure_response_cache
+
+    calls = []
+
+    async def fake_call(*args, **kwargs):
+        calls.append(args)
+        return "summary", "stop"
+
+    monkeypatch.setattr(utils, call_name, fake_call)
+    monkeypatch.setattr(utils, "ZHIPUAI_API_KEY", "test", raising=False)
+    cache = configure_response_cache(cache_dir=str(tmp_path))
+    try:
+        assert asyncio.run(utils.generate_node_summary({"text": OLD})) == "summary"
+        # One lookup and one entry per node, not a second pair under the prompt
+        assert cache.stats()["misses"] == 1 and cache.stats()["entries"] == 1
+        assert asyncio.run(utils.generate_node_summary({"text": NEW})) == "summary"
+        assert cache.stats()["hits"] == 1 and len(calls) == 1
+    finally:
+        configure_response_cache(enabled=False)
@@ -0,0 +1,102 @@
+import json
+
+from pageindex.doc_tree import DocTree, find_node_by_id, node_without_children
+from pageindex.identity_cache import IdentityCache, clear_identity_caches
+
+
+def make_structure():
+    return [
+        {"title": "1", "node_id": "0000", "nodes": [
+            {"title": "1.1", "node_id": "0001"},
+            {"title": "1.2", "node_id": "0002", "nodes": [{"title": "1.2.1", "node_id": "0003"}]},
+        ]},
+        {"title": "2", "node_id": "0004"},
+    ]
+
+
+def test_preorder_walk_does_not_copy():
+    structure = make_structure()
+    tree = DocTree(structure)
+    nodes = tree.nodes()
+    assert [node["node_id"] for node in nodes] == ["0000", "0001", "0002", "0003", "0004"]
+    assert nodes[0] is structure[0]
+    assert [node["node_id"] for node in tree.nodes(leaves_only=True)] == ["0001", "0003", "0004"]
+
+
+def test_parent_child_and_leaf_queries():
+    tree = DocTree(make_structure())
+    assert tree.parent("0003").node_id == "0002"
+    assert tree.parent("0000") is None
+    assert [child.node_id for child in tree.children("0000")] == ["0001", "0002"]
+    assert tree.is_leaf("0003") and not tree.is_leaf("0002") and not tree.is_leaf("9999")
+    assert [node.node_id for node in tree.ancestors("0003")] == ["0002", "0000"]
+
+
+def test_json_round_trip():
+    structure = make_structure()
+    copied = DocTree(structure).to_structure()
+    assert json.loads(json.dumps(copied)) == structure
+    assert copied[0] is not structure[0] and copied[0]["nodes"] is not structure[0]["nodes"]
+    assert DocTree(structure[0]).to_structure() == structure[0]
+
+
+def test_node_without_children():
+    node = make_structure()[0]
+    assert node_without_children(node) == {"title": "1", "node_id": "0000"}
+
+
+def test_find_node_by_id():
+    structure = make_structure()
+    assert find_node_by_id(structure, "0003")["title"] == "1.2.1"
+    assert find_node_by_id(structure, "9999") is None
+
+
+def test_removed_node_is_not_returned():
+    structure = make_structure()
+    assert find_node_by_id(structure, "0003") is not None
+    structure[0]["nodes"][1]["nodes"].pop()
+    assert find_node_by_id(structure, "0003") is None
+
+
+def test_node_under_a_removed_ancestor_is_not_returned():
+    structure = make_structure()
+    assert find_node_by_id(structure, "0003") is not None
+    structure[0]["nodes"] = [structure[0]["nodes"][0]]
+    assert find_node_by_id(structure, "0003") is None
+
+
+def test_replaced_node_is_returned_fresh():
+    structure = make_structure()
+    assert "nodes" not in find_node_by_id(structure, "0004")
+    structure[1] = {"title": "2", "node_id": "0004", "nodes": [{"title": "2.1", "node_id": "0005"}]}
+    assert find_node_by_id(structure, "0004") is structure[1]
+    assert find_node_by_id(structure, "0005")["title"] == "2.1"
+
+
+def test_structures_of_several_documents_are_kept_apart():
+    first, second = make_structure(), make_structure()
+    second[1]["title"] = "other"
+    assert find_node_by_id(first, "0004")["title"] == "2"
+    assert find_node_by_id(second, "0004")["title"] == "other"
+    assert find_node_by_id(first, "0004") is first[1]
+
+
+def test_sibling_inserted_before_a_cached_node():
+    structure = make_structure()
+    assert find_node_by_id(structure, "0004") is structure[1]
+    structure.insert(0, {"title": "0", "node_id": "0009"})
+    assert find_node_by_id(structure, "0004") is structure[2]
+    assert find_node_by_id(structure, "0009") is structure[0]
+
+
+def test_identity_cache_keeps_the_most_recent_keys():
+    cache = IdentityCache(size=2)
+    first, second, third = [], [], []
+    cache.put(first, 1)
+    cache.put(second, 2)
+    assert cache.get(first) == 1
+    cache.put(third, 3)
+    assert cache.get(second) is None and cache.get(first) == 1 and cache.get(third) == 3
+    assert cache.get([]) is None
+    clear_identity_caches()
+    assert len(cache) == 0
@@ -0,0 +1,58 @@
+import pytest
+
+from pageindex.json_extract import JsonExtractionError, extract_json, extract_json_with_repairs
+
+
+def test_well_formed_response_is_not_repaired():
+    value, repairs = extract_json_with_repairs('```json\n{"toc_detected": "yes"}\n```')
+    assert value == {"toc_detected": "yes"} and repairs == []
+
+
+def test_truncated_array_drops_the_unfinished_object():
+    response = '[{"structure": "1", "title": "Scope"}, {"structure": "2", "title": "Refer'
+    value, repairs = extract_json_with_repairs(response)
+    assert value == [{"structure": "1", "title": "Scope"}]
+    assert "truncated" in repairs
+
+
+def test_truncated_after_a_comma():
+    assert extract_json('[{"a": 1}, {"a": 2},') == [{"a": 1}, {"a": 2}]
+
+
+def test_truncated_object_keeps_complete_members():
+    assert extract_json('{"thinking": "done", "answer": "ye') == {"thinking": "done"}
+
+
+def test_truncated_after_a_key():
+    assert extract_json('{"thinking": "done", "answer":') == {"thinking": "done"}
+
+
+def test_truncated_first_member_keeps_the_partial_value():
+    assert extract_json('{"thinking": "the title appears at the st') == {"thinking": "the title appears at the st"}
+
+
+def test_truncated_nested_structure():
+    response = '{"table_of_contents": [{"structure": "1", "page": 5}, {"structure": "1.1", "page"'
+    assert extract_json(response) == {"table_of_contents": [{"structure": "1", "page": 5}]}
+
+
+def test_truncated_inside_a_fence():
+    assert extract_json('```json\n[{"node_id": 1, "summary": "a"}, {"node_id": 2') == [{"node_id": 1, "summary": "a"}]
+
+
+def test_common_repairs_combined():
+    response = "{'items': [None, True, 'quoted',], \"text\": \"line\nbreak\",}"
+    value, repairs = extract_json_with_repairs(response)
+    assert value == {"items": [None, True, "quoted"], "text": "line\nbreak"}
+    assert "trailing comma" in repairs and "single-quoted string" in repairs
+
+
+def test_lone_opening_bracket_is_closed():
+    assert extract_json("Answer: {") == {}
+
+
+@pytest.mark.parametrize("response", ["", None, "I could not find a table of contents.", "{'a': }"])
+def test_unrecoverable_response_is_a_falsy_error(response):
+    value = extract_json(response)
+    assert value == {} and not value
+    assert isinstance(value, JsonExtractionError)
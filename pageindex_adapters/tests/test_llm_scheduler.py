@@ -0,0 +1,157 @@
+import asyncio
+import threading
+import time
+
+from pageindex.llm_scheduler import RequestScheduler, SchedulerDeadlockError
+
+
+def run_with_timeout(coro_func, timeout=5):
+    """Result of asyncio.run(coro_func()) in a helper thread; fails instead of hanging"""
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(value=asyncio.run(coro_func())), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "event loop deadlocked"
+    return result["value"]
+
+
+def test_sync_call_inside_coroutine_does_not_deadlock_on_its_own_loop():
+    scheduler = RequestScheduler(max_concurrency=1)
+
+    async def holder():
+        async def call():
+            await asyncio.sleep(0.1)
+            return "async"
+        return await scheduler.run_async(call)
+
+    async def sync_caller():
+        await asyncio.sleep(0.01)  # let holder take the only slot first
+        try:
+            return scheduler.run(lambda: "sync")
+        except SchedulerDeadlockError:
+            return "rejected"
+
+    async def main():
+        return await asyncio.gather(holder(), sync_caller())
+
+    assert run_with_timeout(main) == ["async", "rejected"]
+    assert scheduler.in_flight == 0
+
+
+def test_sync_call_inside_coroutine_waits_for_slots_of_other_threads():
+    scheduler = RequestScheduler(max_concurrency=1)
+    taken = threading.Event()
+    peak = []
+
+    def other_document():
+        def call():
+            taken.set()
+            threading.Event().wait(0.1)
+        scheduler.run(call)
+
+    async def main():
+        thread = threading.Thread(target=other_document)
+        thread.start()
+        taken.wait()
+
+        def call():
+            peak.append(scheduler.in_flight)
+            return "sync"
+        result = scheduler.run(call)
+        thread.join()
+        return result
+
+    assert run_with_timeout(main) == "sync"
+    assert peak == [1]
+    assert scheduler.in_flight == 0
+
+
+def test_async_waiters_are_admitted_in_order():
+    scheduler = RequestScheduler(max_concurrency=1)
+    order = []
+
+    async def call(index):
+        async def request():
+            order.append(index)
+            await asyncio.sleep(0.001)
+        await scheduler.run_async(request)
+
+    async def main():
+        await asyncio.gather(*(call(index) for index in range(50)))
+        return order
+
+    assert run_with_timeout(main) == list(range(50))
+    assert scheduler.in_flight == 0
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    scheduler = RequestScheduler(max_concurrency=1)
+
+    async def main():
+        release = asyncio.Event()
+
+        async def hold():
+            await release.wait()
+        holder = asyncio.create_task(scheduler.run_async(hold))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(scheduler.acquire_async())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        release.set()
+        await holder
+        # The slot is free again: a new caller is admitted at once
+        await asyncio.wait_for(scheduler.acquire_async(), 1)
+        scheduler.release()
+        return len(scheduler._waiters)
+
+    assert run_with_timeout(main) == 0
+    assert scheduler.in_flight == 0
+
+
+def test_rpm_wait_wakes_the_queue():
+    scheduler = RequestScheduler(max_concurrency=4, rpm=600)
+    scheduler.request_bucket.tokens = 0  # next request in 0.1 s
+
+    async def main():
+        started = time.monotonic()
+        await asyncio.gather(*(scheduler.run_async(lambda: asyncio.sleep(0)) for _ in range(2)))
+        return time.monotonic() - started
+
+    assert 0.15 <= run_with_timeout(main) < 1
+    assert scheduler.in_flight == 0
+
+
+def test_sync_callers_off_the_loop_respect_the_limit():
+    scheduler = RequestScheduler(max_concurrency=1)
+    peak = []
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            peak.append(scheduler.in_flight)
+        threading.Event().wait(0.02)
+
+    threads = [threading.Thread(target=scheduler.run, args=(call,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == 1
+    assert scheduler.in_flight == 0
+
+
+def test_throttle_error_halves_the_limit():
+    class Throttled(Exception):
+        status_code = 429
+
+    scheduler = RequestScheduler(max_concurrency=8)
+
+    def fail():
+        raise Throttled()
+
+    try:
+        scheduler.run(fail)
+    except Throttled:
+        pass
+    assert scheduler.limit == 4
+    assert scheduler.throttled == 1
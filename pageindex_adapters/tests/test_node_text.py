@@ -0,0 +1,18 @@
+import json
+
+import pytest
+
+PAGES = [("page one\n", 3), ("page two\n", 3), ("page three\n", 3)]
+
+
+@pytest.mark.parametrize("utils_name", ["pageindex.utils_gemini_rest", "pageindex.utils_zhipuai"])
+def test_add_node_text_stores_plain_strings(utils_name):
+    utils = pytest.importorskip(utils_name)
+    structure = [{"title": "A", "start_index": 1, "end_index": 3,
+                  "nodes": [{"title": "B", "start_index": 2, "end_index": 2}]}]
+    utils.add_node_text(structure, PAGES)
+    parent = structure[0]
+    assert type(parent["text"]) is str and type(parent["nodes"][0]["text"]) is str
+    assert parent["text"] == "page one\npage two\npage three\n"
+    assert parent["nodes"][0]["text"] == "page two\n"
+    json.dumps(structure)
@@ -0,0 +1,74 @@
+import asyncio
+from types import SimpleNamespace
+
+import pymupdf
+
+from pageindex.outline_tree import get_outline_outcome, install_outline_first
+
+TITLES = ["1 Scope", "2 References", "3 Definitions", "3.1 Terms"]
+
+
+def make_pdf(path, with_outline=True):
+    pdf = pymupdf.open()
+    for title in TITLES:
+        page = pdf.new_page()
+        page.insert_text((72, 72), "3GPP TS 24.501 V18.12.0 (2025-03)")
+        page.insert_text((72, 100), title)
+        page.insert_text((72, 130), f"Body text of {title}.")
+    if with_outline:
+        pdf.set_toc([[1, "1 Scope", 1], [1, "2 References", 2], [1, "3 Definitions", 3], [2, "3.1 Terms", 4]])
+    pdf.save(path)
+    with pdf:
+        return [(page.get_text(), 10) for page in pdf]
+
+
+def fake_page_index(calls):
+    async def tree_parser(page_list, opt, doc=None, logger=None):
+        calls.append(doc)
+        return "llm tree"
+
+    return SimpleNamespace(
+        tree_parser=tree_parser,
+        add_preface_if_needed=lambda items: items,
+        post_processing=lambda items, total_pages: items,
+    )
+
+
+class ListLogger:
+    def __init__(self):
+        self.records = []
+
+    def info(self, record):
+        self.records.append(record)
+
+
+def test_outline_tree_is_reported_through_logger_and_outcome(tmp_path, capsys):
+    path = str(tmp_path / "spec.pdf")
+    page_list = make_pdf(path)
+    calls = []
+    module = fake_page_index(calls)
+    install_outline_first(module)
+    logger = ListLogger()
+
+    items = asyncio.run(module.tree_parser(page_list, None, doc=path, logger=logger))
+
+    assert [item["structure"] for item in items] == ["1", "2", "3", "3.1"]
+    assert [item["physical_index"] for item in items] == [1, 2, 3, 4]
+    assert calls == []
+    assert capsys.readouterr().out == ""
+    assert logger.records == [get_outline_outcome(path)]
+    assert get_outline_outcome(path)["outline_first"] is True
+
+
+def test_missing_outline_falls_back_to_llm(tmp_path, capsys):
+    path = str(tmp_path / "plain.pdf")
+    page_list = make_pdf(path, with_outline=False)
+    calls = []
+    module = fake_page_index(calls)
+    install_outline_first(module)
+
+    assert asyncio.run(module.tree_parser(page_list, None, doc=path)) == "llm tree"
+    assert calls == [path]
+    assert capsys.readouterr().out == ""
+    outcome = get_outline_outcome(path)
+    assert outcome == {"outline_first": False, "reason": "outline has 0 entries"}
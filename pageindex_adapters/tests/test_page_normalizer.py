@@ -0,0 +1,64 @@
+from pageindex.page_normalizer import (find_boilerplate, line_key, normalize_page_list, page_lines,
+                                       strip_boilerplate)
+
+HEADER = "ETSI TS 124 501 V18.12.0 (2025-10)"
+FOOTER = "3GPP TS 24.501 version 18.12.0 Release 18"
+WORDS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel"]
+
+
+def body(page):
+    return "\n".join(f"{WORDS[(page + line) % len(WORDS)]} {WORDS[line]} text" for line in range(6))
+
+
+def make_pages(count, extra=""):
+    return [(f"{HEADER}\n{number}\n{body(page)}\n{extra}{FOOTER}\n", 0)
+            for page, number in enumerate(range(132, 132 + count))]
+
+
+def test_line_key_keeps_separate_digit_groups():
+    assert line_key("Page 132") == line_key("Page  133")
+    assert line_key("8 7 6 5 4 3 2 1") == "########"
+    assert line_key("- 12 -") == "-#-"
+
+
+def test_running_header_footer_and_page_number_are_stripped():
+    normalized = normalize_page_list(make_pages(5))
+    assert [text for text, _ in normalized] == [body(page) + "\n" for page in range(5)]
+
+
+def test_bit_number_row_above_the_footer_is_kept():
+    # Other pages put their page number in the bottom lines
+    lines = page_lines(f"{body(0)}\nOctet 1\n8 7 6 5 4 3 2 1\n{FOOTER}")
+    bottom = {line_key("133"), line_key(FOOTER)}
+    assert strip_boilerplate(lines, set(), bottom)[-2:] == ["Octet 1", "8 7 6 5 4 3 2 1"]
+
+
+def test_bit_number_row_on_every_page_is_kept():
+    normalized = normalize_page_list(make_pages(5, extra="8 7 6 5 4 3 2 1\n"))
+    assert all(text.endswith("8 7 6 5 4 3 2 1\n") for text, _ in normalized)
+
+
+def test_clause_numbers_are_never_boilerplate():
+    pages = [(f"{HEADER}\n8.2.{page}\n{body(page)}\n", 0) for page in range(5)]
+    top, _ = find_boilerplate([page_lines(text) for text, _ in pages])
+    assert line_key("8.2.1") not in top
+    assert all(text.startswith("8.2.") for text, _ in normalize_page_list(pages))
+
+
+def test_lines_on_few_pages_are_kept():
+    pages = make_pages(5)
+    pages[0] = (pages[0][0].replace(FOOTER, "Table 1 (continued)\n" + FOOTER), 0)
+    assert normalize_page_list(pages)[0][0].endswith("Table 1 (continued)\n")
+
+
+def test_too_few_pages_are_left_alone():
+    pages = make_pages(2)
+    assert [text for text, _ in normalize_page_list(pages)][0].startswith(HEADER)
+
+
+def test_known_tokens_skip_recounting():
+    assert [tokens for _, tokens in normalize_page_list(make_pages(4), known_tokens=[7] * 4)] == [7] * 4
+
+
+def test_split_numbers_in_a_text_header_still_match():
+    assert line_key("ETSI TS 124 501 V18.12.0 (2025-10) 1 08") == line_key("ETSI TS 124 501 V18.12 .0 (2025-10) 109")
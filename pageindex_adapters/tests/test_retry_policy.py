@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from pageindex.retry_policy import RetryPolicy, get_retry_metrics, parse_retry_after
+
+
+class HttpError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.headers = {"Retry-After": retry_after} if retry_after is not None else {}
+
+
+def flaky(errors, result="ok"):
+    errors = list(errors)
+
+    def func():
+        if errors:
+            raise errors.pop(0)
+        return result
+    return func
+
+
+def test_retryable_errors_are_retried_and_counted():
+    before = get_retry_metrics()
+    policy = RetryPolicy(base_delay=0.001, max_delay=0.001)
+    assert policy.call(flaky([HttpError(429), HttpError(503)])) == "ok"
+    after = get_retry_metrics()
+    assert after["calls"] - before["calls"] == 1
+    assert after["retries"] - before["retries"] == 2
+
+
+def test_fatal_errors_are_not_retried():
+    before = get_retry_metrics()
+    policy = RetryPolicy(base_delay=0.001, max_delay=0.001)
+    with pytest.raises(HttpError):
+        policy.call(flaky([HttpError(403)]))
+    after = get_retry_metrics()
+    assert after["retries"] == before["retries"]
+    assert after["fatal_errors"] - before["fatal_errors"] == 1
+
+
+def test_attempts_are_bounded():
+    policy = RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.001)
+    with pytest.raises(HttpError):
+        policy.call(flaky([HttpError(500)] * 5))
+
+
+def test_async_call_retries():
+    policy = RetryPolicy(base_delay=0.001, max_delay=0.001)
+    func = flaky([ConnectionError("reset")])
+
+    async def coro_func():
+        return func()
+
+    assert asyncio.run(policy.call_async(coro_func)) == "ok"
+
+
+def test_retry_after_is_a_lower_bound():
+    policy = RetryPolicy(base_delay=0.001, max_delay=0.001)
+    assert policy.retry_after(HttpError(429, "7")) == 7.0
+    assert parse_retry_after("not a date") is None
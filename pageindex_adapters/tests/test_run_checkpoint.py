@@ -0,0 +1,89 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from pageindex.run_checkpoint import RunCheckpoint
+
+PAGES = [("page one", 2), ("page two", 2)]
+
+
+def test_stage_result_is_reused(tmp_path):
+    checkpoint = RunCheckpoint.create("doc.pdf", SimpleNamespace(model="m"), str(tmp_path))
+    calls = []
+
+    def check_toc(page_list, opt):
+        calls.append(len(page_list))
+        return {"toc_content": None}
+
+    stage = checkpoint.wrap_stage("check_toc", check_toc)
+    opt = SimpleNamespace(model="m")
+    assert stage(list(PAGES), opt) == stage(list(PAGES), opt) == {"toc_content": None}
+    assert calls == [2]
+    assert checkpoint.stage_hits == 1
+    stage(PAGES + [("page three", 2)], opt)
+    assert calls == [2, 3]
+    checkpoint.close()
+
+
+def test_page_list_is_hashed_once(tmp_path, monkeypatch):
+    checkpoint = RunCheckpoint.create("doc.pdf", None, str(tmp_path))
+    page_list = list(PAGES)
+    key = checkpoint._page_list_key(page_list)
+    # A second hash of the pages would now fail
+    monkeypatch.setattr("pageindex.run_checkpoint.hashlib.sha256", None)
+    assert checkpoint._page_list_key(page_list) is key
+    checkpoint.close()
+
+
+def test_async_stage(tmp_path):
+    checkpoint = RunCheckpoint.create("doc.pdf", None, str(tmp_path))
+
+    async def verify_toc(page_list, toc, start_index=1):
+        return len(toc)
+
+    stage = checkpoint.wrap_stage("verify_toc", verify_toc)
+    assert asyncio.run(stage(PAGES, [1, 2])) == 2
+    assert asyncio.run(stage(PAGES, [1, 2])) == 2
+    assert checkpoint.stage_hits == 1
+    checkpoint.close()
+
+
+def test_resume_keeps_the_stored_options(tmp_path):
+    created = RunCheckpoint.create("doc.pdf", SimpleNamespace(model="m", max_page_num_each_node=10), str(tmp_path))
+    created.close()
+    resumed = RunCheckpoint.resume(created.run_id, str(tmp_path))
+    opt, changed = resumed.resumed_options(SimpleNamespace(model="m", max_page_num_each_node=20))
+    assert opt.max_page_num_each_node == 10
+    assert changed == ["max_page_num_each_node"]
+    resumed.close()
+
+
+def test_summaries_survive_a_restart(tmp_path):
+    checkpoint = RunCheckpoint.create("doc.pdf", None, str(tmp_path))
+
+    async def summarize(node, model=None):
+        return "summary of " + node["text"]
+
+    wrapped = checkpoint.wrap_summary(summarize)
+    assert asyncio.run(wrapped({"text": "clause"}, model="m")) == "summary of clause"
+    checkpoint.close()
+
+    resumed = RunCheckpoint.resume(checkpoint.run_id, str(tmp_path))
+
+    async def fail(node, model=None):
+        raise AssertionError("summary should come from the checkpoint")
+
+    assert asyncio.run(resumed.wrap_summary(fail)({"text": "clause"}, model="m")) == "summary of clause"
+    assert resumed.summary_hits == 1
+    resumed.close()
+
+
+def test_unserializable_stage_result_is_not_stored(tmp_path):
+    checkpoint = RunCheckpoint.create("doc.pdf", None, str(tmp_path))
+    stage = checkpoint.wrap_stage("check_toc", lambda page_list: object())
+    with pytest.raises(TypeError):
+        stage(PAGES)
+    assert os.listdir(checkpoint.stage_dir) == []
+    checkpoint.close()
@@ -0,0 +1,38 @@
+import argparse
+
+import pytest
+
+from pageindex import http_client, llm_scheduler
+from pageindex.runner_args import add_pipeline_arguments, configure_pipeline
+
+
+@pytest.fixture
+def restore_settings():
+    pool_size = http_client._client_options["pool_size"]
+    yield
+    http_client.configure_http_client(pool_size=pool_size)
+    llm_scheduler.configure_scheduler()
+
+
+def parse(argv):
+    return add_pipeline_arguments(argparse.ArgumentParser()).parse_args(argv)
+
+
+def test_defaults_match_page_index_config():
+    args = parse([])
+    assert (args.toc_check_pages, args.max_pages_per_node, args.max_tokens_per_node) == (20, 10, 20000)
+    assert args.http_pool_size is None
+    assert not args.outline_first and not args.no_toc_heuristics
+
+
+def test_http_pool_size_defaults_to_max_concurrency(tmp_path, restore_settings):
+    configure_pipeline(parse(["--max-concurrency", "6", "--no-cache", "--no-page-cache", "--cache-dir", str(tmp_path)]))
+    assert http_client._client_options["pool_size"] == 6
+    assert llm_scheduler.get_scheduler().max_concurrency == 6
+
+
+def test_http_pool_size_option(tmp_path, restore_settings):
+    response_cache, page_cache = configure_pipeline(
+        parse(["--http-pool-size", "3", "--no-cache", "--no-page-cache", "--cache-dir", str(tmp_path)]))
+    assert http_client._client_options["pool_size"] == 3
+    assert response_cache is None and page_cache is None
@@ -0,0 +1,70 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from split_pdf_by_chapters import compute_outline_ranges, select_split_units
+
+
+def make_nodes(entries):
+    """Nodes as get_outline_nodes builds them, from (level, title, start_page) in outline order"""
+    nodes, parents = [], []
+    for level, title, start_page in entries:
+        del parents[level:]
+        parent = parents[-1] if parents else None
+        node = {"id": len(nodes), "title": title, "level": level, "children": [],
+                "parent": parent["id"] if parent else None, "start_page": start_page}
+        if parent:
+            parent["children"].append(node["id"])
+        nodes.append(node)
+        parents.append(node)
+    return nodes
+
+
+def ranges(nodes):
+    return {node["title"]: (node["start_page"], node["end_page"]) for node in nodes}
+
+
+def test_nested_outline_ranges():
+    nodes = make_nodes([
+        (0, "1 Scope", 0),
+        (0, "5 Procedures", 2),
+        (1, "5.1 General", 3),
+        (2, "5.1.1 Overview", 3),
+        (1, "5.2 Registration", 6),
+        (0, "Annex A", 9),
+    ])
+    compute_outline_ranges(nodes, 12)
+    assert ranges(nodes) == {
+        "1 Scope": (0, 1),
+        "5 Procedures": (2, 8),
+        "5.1 General": (3, 5),
+        "5.1.1 Overview": (3, 5),
+        "5.2 Registration": (6, 8),
+        "Annex A": (9, 11),
+    }
+
+
+def test_entries_sharing_a_page_keep_their_start_page():
+    nodes = make_nodes([(0, "1", 4), (0, "2", 4), (0, "3", 4)])
+    compute_outline_ranges(nodes, 5)
+    assert ranges(nodes) == {"1": (4, 4), "2": (4, 4), "3": (4, 4)}
+
+
+def test_last_entry_ends_at_the_last_page():
+    nodes = make_nodes([(0, "1", 0), (1, "1.1", 1), (2, "1.1.1", 2)])
+    compute_outline_ranges(nodes, 3)
+    assert ranges(nodes) == {"1": (0, 2), "1.1": (1, 2), "1.1.1": (2, 2)}
+
+
+def test_end_page_never_precedes_the_start_page():
+    nodes = make_nodes([(0, "Only", 7)])
+    compute_outline_ranges(nodes, 1)
+    assert ranges(nodes) == {"Only": (7, 7)}
+
+
+def test_split_units_at_depth_two_keep_the_introduction():
+    nodes = make_nodes([(0, "1 Scope", 0), (0, "5 Procedures", 2), (1, "5.1", 4), (1, "5.2", 6)])
+    compute_outline_ranges(nodes, 10)
+    units = [(node["title"], start, end) for node, start, end in select_split_units(nodes, depth=2)]
+    assert units == [("1 Scope", 0, 1), ("5 Procedures", 2, 3), ("5.1", 4, 5), ("5.2", 6, 9)]
@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+from pageindex.summary_packing import (get_summary_packing_stats, pack_nodes, parse_packed_summaries,
+                                       record_summary_request, summarize_packed)
+
+
+def test_parse_plain_array():
+    response = '[{"node_id": 1, "summary": " first "}, {"node_id": 2, "summary": "second"}]'
+    assert parse_packed_summaries(response, 2) == {1: "first", 2: "second"}
+
+
+def test_parse_fenced_and_wrapped_response():
+    response = 'Here you go:\n```json\n{"summaries": [{"node_id": "2", "summary": "second"}]}\n```'
+    assert parse_packed_summaries(response, 2) == {2: "second"}
+
+
+def test_parse_single_object():
+    assert parse_packed_summaries('{"node_id": 1, "summary": "only"}', 1) == {1: "only"}
+
+
+def test_parse_drops_bad_entries():
+    response = ('[{"node_id": 0, "summary": "out of range"}, {"node_id": 3, "summary": "out of range"},'
+                ' {"node_id": "x", "summary": "bad id"}, {"node_id": 1, "summary": "  "},'
+                ' {"node_id": 2}, "not an object", {"node_id": 2, "summary": "kept"}]')
+    assert parse_packed_summaries(response, 2) == {2: "kept"}
+
+
+def test_parse_truncated_response_keeps_complete_entries():
+    response = '[{"node_id": 1, "summary": "first"}, {"node_id": 2, "summary": "sec'
+    assert parse_packed_summaries(response, 2) == {1: "first"}
+
+
+@pytest.mark.parametrize("response", ["Error", "", "no json here", "[1, 2, 3]"])
+def test_parse_unusable_response(response):
+    assert parse_packed_summaries(response, 3) == {}
+
+
+def test_pack_nodes_first_fit_decreasing():
+    assert pack_nodes([300, 700, 200, 800], 1000) == [[0, 1], [2, 3]]
+    # Oversized nodes get a bin of their own
+    assert pack_nodes([5000, 10, 10], 1000) == [[0], [1, 2]]
+    assert pack_nodes([1] * 5, 1000, max_nodes=2) == [[0, 1], [2, 3], [4]]
+
+
+def run_packed(nodes, batch_responses, batch_tokens=1000):
+    """summaries and the stats delta; batch_responses(texts) gives the packed answer per batch"""
+    batches, singles = [], []
+
+    async def summarize_node(node, model=None):
+        record_summary_request()
+        singles.append(node["text"])
+        return f"single {node['text']}"
+
+    async def summarize_batch(batch, model=None):
+        texts = [node["text"] for node in batch]
+        record_summary_request(len(batch))
+        batches.append(texts)
+        return batch_responses(texts)
+
+    before = get_summary_packing_stats()
+    summaries = asyncio.run(summarize_packed(nodes, None, summarize_node, summarize_batch, batch_tokens))
+    after = get_summary_packing_stats()
+    return summaries, batches, singles, {name: after[name] - before[name] for name in after}
+
+
+def test_all_nodes_summarized_in_one_request():
+    nodes = [{"text": f"node {i}"} for i in range(4)]
+    summaries, batches, singles, stats = run_packed(nodes, lambda texts: [f"packed {t}" for t in texts])
+    assert summaries == [f"packed node {i}" for i in range(4)]
+    assert len(batches) == 1 and singles == []
+    assert stats == {"nodes": 4, "packed_requests": 1, "packed_nodes": 4, "single_requests": 0, "splits": 0}
+
+
+def test_missing_node_is_asked_again_alone():
+    nodes = [{"text": f"node {i}"} for i in range(4)]
+    summaries, batches, singles, stats = run_packed(
+        nodes, lambda texts: [None if t == "node 2" else f"packed {t}" for t in texts])
+    assert summaries == ["packed node 0", "packed node 1", "single node 2", "packed node 3"]
+    assert singles == ["node 2"]
+    assert stats["splits"] == 1 and stats["single_requests"] == 1
+
+
+def test_unparseable_batch_is_split_in_halves():
+    nodes = [{"text": f"node {i}"} for i in range(4)]
+    # The first (full) batch fails entirely; the halves succeed
+    summaries, batches, singles, stats = run_packed(
+        nodes, lambda texts: [None] * len(texts) if len(texts) == 4 else [f"packed {t}" for t in texts])
+    assert summaries == [f"packed node {i}" for i in range(4)]
+    assert sorted(batches[1:]) == [["node 0", "node 1"], ["node 2", "node 3"]]
+    assert singles == []
+    assert stats["splits"] == 1 and stats["packed_requests"] == 3
+
+
+def test_failing_batches_end_in_single_requests():
+    nodes = [{"text": f"node {i}"} for i in range(3)]
+    summaries, batches, singles, stats = run_packed(nodes, lambda texts: [None] * len(texts))
+    assert summaries == [f"single node {i}" for i in range(3)]
+    assert sorted(singles) == ["node 0", "node 1", "node 2"]
+    assert stats["single_requests"] == 3
+
+
+def test_oversized_node_gets_its_own_request():
+    nodes = [{"text": "word " * 2000}, {"text": "small a"}, {"text": "small b"}]
+    summaries, batches, singles, stats = run_packed(nodes, lambda texts: [f"packed {t}" for t in texts], batch_tokens=100)
+    assert singles == [nodes[0]["text"]]
+    assert batches == [["small a", "small b"]]
+    assert summaries[1:] == ["packed small a", "packed small b"]
+
+
+def test_batches_answered_from_the_cache_are_not_counted(monkeypatch, tmp_path):
+    monkeypatch.setenv("GEMINI_API_KEY", "test")
+    utils = pytest.importorskip("pageindex.utils_gemini_rest")
+    from pageindex.response_cache import configure_response_cache
+
+    calls = []
+
+    async def fake_call(model, prompt, **kwargs):
+        calls.append(prompt)
+        return '[{"node_id": 1, "summary": "a"}, {"node_id": 2, "summary": "b"}]', "STOP"
+
+    monkeypatch.setattr(utils, "call_gemini_rest_async", fake_call)
+    nodes = [{"text": "first node"}, {"text": "second node"}]
+    configure_response_cache(cache_dir=str(tmp_path))
+    try:
+        before = get_summary_packing_stats()
+        assert asyncio.run(utils.summarize_node_batch(nodes)) == ["a", "b"]
+        assert asyncio.run(utils.summarize_node_batch(nodes)) == ["a", "b"]
+        after = get_summary_packing_stats()
+    finally:
+        configure_response_cache(enabled=False)
+    assert len(calls) == 1
+    assert after["packed_requests"] - before["packed_requests"] == 1
+    assert after["packed_nodes"] - before["packed_nodes"] == 2
@@ -2,27 +2,72 @@
 """
 PDF 按章节切割工具
 根据 PDF 书签（大纲）将文档切割成多个独立的章节文件
+
+- 所有章节共用一个只读 PdfReader，每个章节写完立即落盘（先写 .part 再改名）
+- 章节文件各自携带所用的字体、图片等资源；需要跨章节共用资源时用 --virtual：
+  只生成页码范围清单 manifest.json，不复制任何页面（"虚拟章节"）
+- --dedup 写出前合并章节内完全相同的对象（需要 pypdf 的 compress_identical_objects），默认关闭：
+  在 1202 页的 TS 24.501 上输出大小不变，耗时和峰值内存反而更高
+- --jobs N 用 N 个进程并行写章节，每个进程以只读 mmap 打开源 PDF；默认 1：
+  每个进程都要重新解析源 PDF，在上述规范上 2/4 个进程都比顺序写出慢
+- --depth N 按第 N 级书签切割（如把第 5 章再切成 5.1…5.6）；
+  manifest.json 同时记录完整大纲（层级、页码范围、父子关系），下游无需再读 PDF 书签
+- --incremental 按页计算文本指纹并与上次的 manifest.json 比较，只重写内容变化的章节，
+  未变化的章节沿用（必要时改名），并列出需要重新生成的 *_Summary.md
 """
 
+import argparse
+import hashlib
+import json
+import mmap
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from pypdf import PdfReader, PdfWriter
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "pageindex_adapters"))
+# 与节点摘要缓存共用同一套指纹规则：去掉版本号、发布日期和单独成行的页码，
+# 新版本规范中内容未修改的页面，指纹与旧版本相同
+from pageindex.content_fingerprint import normalize_text
 
-def get_chapter_ranges(pdf_reader):
-    """
-    从 PDF 书签中提取章节信息
-    返回格式: [(章节名称, 起始页码, 结束页码), ...]
-    """
-    outlines = pdf_reader.outline
-    total_pages = len(pdf_reader.pages)
+try:
+    import pymupdf
+    HAS_PYMUPDF = True
+except ImportError:
+    HAS_PYMUPDF = False
 
-    if not outlines:
-        print("警告: PDF 没有书签信息，无法自动按章节切割")
-        return []
+MANIFEST_FILENAME = "manifest.json"
+
+def get_outline_nodes(pdf_reader):
+    """
+    从 PDF 书签中提取大纲节点（按文档顺序）
+    返回格式: [{"id", "title", "level", "parent", "children", "start_page"}, ...]，页码 0 起始
 
-    chapters = []
+    书签的目标页通过"页面对象编号 -> 页码"映射一次性查出，
+    不再对每个书签调用 get_destination_page_number
+    """
+    page_index = {}
+    for page_num, page in enumerate(pdf_reader.pages):
+        if page.indirect_reference is not None:
+            page_index[page.indirect_reference.idnum] = page_num
+
+    def destination_page(item):
+        page = getattr(item, "page", None)
+        idnum = getattr(page, "idnum", None)
+        if idnum in page_index:
+            return page_index[idnum]
+        if isinstance(page, int):
+            return page
+        try:
+            return pdf_reader.get_destination_page_number(item)
+        except Exception:
+            return None
+
+    nodes = []
+    # parents[level] 为当前各层级最近的节点；嵌套列表总是紧跟在其父书签之后
+    parents = []
 
     def extract_bookmarks(bookmarks, level=0):
         """递归提取书签信息"""
@@ -30,30 +75,85 @@ def get_chapter_ranges(pdf_reader):
             if isinstance(item, list):
                 # 嵌套的书签
                 extract_bookmarks(item, level + 1)
-            else:
-                # 单个书签
-                title = item.title
-                page_num = pdf_reader.get_destination_page_number(item)
-                chapters.append((title, page_num, level))
+                continue
+            page_num = destination_page(item)
+            if page_num is None:
+                continue
+            del parents[level:]
+            parent = parents[-1] if parents else None
+            node = {
+                "id": len(nodes),
+                "title": item.title,
+                "level": len(parents),
+                "parent": parent["id"] if parent else None,
+                "children": [],
+                "start_page": page_num,
+            }
+            if parent:
+                parent["children"].append(node["id"])
+            nodes.append(node)
+            parents.append(node)
+
+    extract_bookmarks(pdf_reader.outline)
+    return nodes
+
+
+def compute_outline_ranges(nodes, total_pages):
+    """
+    一次遍历计算每个节点的结束页（0 起始，含），写入 node["end_page"]
+
+    用栈保存尚未结束的节点：遇到层级不高于栈顶的节点时，栈顶节点在其前一页结束。
+    与下一个节点起始于同一页的节点至少保留自己的起始页。
+    """
+    stack = []
+    for node in nodes:
+        while stack and stack[-1]["level"] >= node["level"]:
+            closed = stack.pop()
+            closed["end_page"] = max(closed["start_page"], node["start_page"] - 1)
+        stack.append(node)
+    for node in stack:
+        node["end_page"] = max(node["start_page"], total_pages - 1)
+    return nodes
+
+
+def select_split_units(nodes, depth=1):
+    """
+    选出要写成独立文件的节点
+    depth=1 只按顶级章节切割；depth=2 把有子节点的顶级章节再按其子节点切割，依此类推。
+    被切开的节点若在第一个子节点之前还有页面，这些页面单独作为一个单元（引言部分）。
+    返回格式: [(节点, 起始页码, 结束页码), ...]，页码 0 起始
+    """
+    units = []
+
+    def visit(node):
+        children = [nodes[child] for child in node["children"]]
+        if node["level"] >= depth - 1 or not children:
+            units.append((node, node["start_page"], node["end_page"]))
+            return
+        if children[0]["start_page"] > node["start_page"]:
+            units.append((node, node["start_page"], children[0]["start_page"] - 1))
+        for child in children:
+            visit(child)
 
-    extract_bookmarks(outlines)
+    for node in nodes:
+        if node["parent"] is None:
+            visit(node)
+    return units
 
-    # 计算每个章节的页面范围
-    chapter_ranges = []
-    for i, (title, start_page, level) in enumerate(chapters):
-        # 只处理顶级章节（level 0）
-        if level == 0:
-            # 找到下一个同级或更高级的章节
-            end_page = total_pages - 1
-            for j in range(i + 1, len(chapters)):
-                next_title, next_page, next_level = chapters[j]
-                if next_level <= level:
-                    end_page = next_page - 1
-                    break
 
-            chapter_ranges.append((title, start_page, end_page))
+def get_chapter_ranges(pdf_reader, depth=1):
+    """
+    从 PDF 书签中提取章节信息
+    返回格式: [(章节名称, 起始页码, 结束页码), ...]
+    """
+    nodes = get_outline_nodes(pdf_reader)
 
-    return chapter_ranges
+    if not nodes:
+        print("警告: PDF 没有书签信息，无法自动按章节切割")
+        return []
+
+    compute_outline_ranges(nodes, len(pdf_reader.pages))
+    return [(node["title"], start_page, end_page) for node, start_page, end_page in select_split_units(nodes, depth)]
 
 
 def sanitize_filename(filename):
@@ -73,13 +173,215 @@ def sanitize_filename(filename):
     return filename
 
 
-def split_pdf_by_chapters(pdf_path, output_dir=None):
+def chapter_filename(idx, title, width=2):
+    """章节文件名: NN_标题.pdf"""
+    return f"{idx:0{width}d}_{sanitize_filename(title)}.pdf"
+
+
+def write_chapter(reader, start_page, end_page, output_path, dedup=False):
+    """
+    将 [start_page, end_page]（0 起始，含两端）写成独立 PDF，返回写出的字节数
+    先写入临时文件再重命名，中断时不会留下半个章节文件
+    """
+    writer = PdfWriter()
+    writer.append(reader, pages=(start_page, end_page + 1), import_outline=False)
+    if dedup and hasattr(writer, "compress_identical_objects"):
+        writer.compress_identical_objects()
+
+    tmp_path = output_path.with_name(output_path.name + ".part")
+    with open(tmp_path, 'wb') as output_file:
+        writer.write(output_file)
+    os.replace(tmp_path, output_path)
+    return output_path.stat().st_size
+
+
+_worker_reader = None
+
+
+def _init_split_worker(pdf_path):
+    """工作进程初始化：以只读 mmap 打开源 PDF，进程内所有章节共用"""
+    global _worker_reader
+    with open(pdf_path, 'rb') as f:
+        source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    _worker_reader = PdfReader(source)
+
+
+def _write_chapter_job(start_page, end_page, output_path, dedup):
+    started = time.perf_counter()
+    size = write_chapter(_worker_reader, start_page, end_page, Path(output_path), dedup)
+    return size, time.perf_counter() - started
+
+
+def write_chapters_parallel(pdf_path, jobs_list, jobs, dedup=False):
+    """
+    在 jobs 个进程中写出章节
+    jobs_list: [(start_page, end_page, output_path), ...]；按页数从多到少提交以均衡负载，
+    结果按输入顺序返回 [(字节数, 耗时秒), ...]
+    """
+    order = sorted(range(len(jobs_list)), key=lambda i: jobs_list[i][0] - jobs_list[i][1])
+    results = [None] * len(jobs_list)
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_split_worker,
+                             initargs=(str(pdf_path),)) as pool:
+        futures = {i: pool.submit(_write_chapter_job, *jobs_list[i], dedup) for i in order}
+        for i, future in futures.items():
+            results[i] = future.result()
+    return results
+
+
+def extract_page_texts(pdf_path, reader):
+    """提取每页文本；安装了 PyMuPDF 时用它提取（比 pypdf 快一个数量级）"""
+    if HAS_PYMUPDF:
+        with pymupdf.open(pdf_path) as doc:
+            return [page.get_text() for page in doc]
+    return [page.extract_text() for page in reader.pages]
+
+
+def page_fingerprint(text):
+    """页面文本指纹（忽略版本号、日期、页码和空白差异）"""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()[:16]
+
+
+def chapter_fingerprint(page_fingerprints):
+    return hashlib.sha256("".join(page_fingerprints).encode("ascii")).hexdigest()
+
+
+def load_manifest(output_dir):
+    """读取上次切割的 manifest.json，不存在时返回 None"""
+    manifest_path = Path(output_dir) / MANIFEST_FILENAME
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def reuse_unchanged_chapters(chapters, previous, output_dir):
+    """
+    与上次的清单逐章比较（按标题和层级匹配），为每章设置 status:
+    unchanged（沿用旧文件）、renamed（内容相同但编号变化，旧文件改名）、changed、new。
+    旧清单中不再使用的章节文件会被删除（虚拟章节模式下不改动任何文件）。
+    返回上次清单中的章节: {章节序号: (旧章节, 新章节或 None)}
+    """
+    old_chapters = previous.get("chapters", []) if previous else []
+    old_by_key = {}
+    for old in old_chapters:
+        old_by_key.setdefault((old["title"], old.get("level", 0)), []).append(old)
+
+    matches = {old["index"]: (old, None) for old in old_chapters}
+    renames = []
+    for entry in chapters:
+        candidates = old_by_key.get((entry["title"], entry["level"]))
+        if not candidates:
+            entry["status"] = "new"
+            continue
+        old = candidates.pop(0)
+        matches[old["index"]] = (old, entry)
+        old_file = old.get("file")
+        same_content = old.get("fingerprint") == entry["fingerprint"]
+        if entry["file"] is None and same_content:
+            entry["status"] = "unchanged"
+            continue
+        if not same_content or entry["file"] is None or not old_file or not (output_dir / old_file).exists():
+            entry["status"] = "changed"
+            old_pages = set(old.get("page_fingerprints", []))
+            new_pages = set(entry["page_fingerprints"])
+            entry["changed_pages"] = sum(fp not in old_pages for fp in entry["page_fingerprints"])
+            entry["removed_pages"] = sum(fp not in new_pages for fp in old.get("page_fingerprints", []))
+            continue
+        entry["status"] = "unchanged" if old_file == entry["file"] else "renamed"
+        entry["bytes"] = old.get("bytes", (output_dir / old_file).stat().st_size)
+        entry["seconds"] = 0.0
+        if old_file != entry["file"]:
+            renames.append((old_file, entry["file"]))
+
+    # 先移到临时名再改为新名，避免编号整体平移时互相覆盖
+    for old_file, _ in renames:
+        os.replace(output_dir / old_file, output_dir / (old_file + ".reuse"))
+    for old_file, new_file in renames:
+        os.replace(output_dir / (old_file + ".reuse"), output_dir / new_file)
+
+    kept = {entry["file"] for entry in chapters if entry["file"]}
+    if kept:
+        for old in old_chapters:
+            old_file = old.get("file")
+            if old_file and old_file not in kept and (output_dir / old_file).exists():
+                os.remove(output_dir / old_file)
+    return matches
+
+
+def find_stale_summaries(output_dir, matches):
+    """
+    找出需要重新生成或改名的 NN_*_Summary.md（NN 为上次切割时的章节序号）
+    返回格式: [{"summary", "chapter", "reason"}, ...]
+    """
+    stale = []
+    for summary_path in sorted(Path(output_dir).glob("*_Summary.md")):
+        prefix = summary_path.name.split("_", 1)[0]
+        if not prefix.isdigit() or int(prefix) not in matches:
+            continue
+        old, entry = matches[int(prefix)]
+        if entry is None:
+            reason = "章节已删除"
+        elif entry["status"] in ("changed", "new"):
+            reason = "内容已变化"
+        elif entry["index"] != old["index"]:
+            reason = f"章节编号变为 {entry['file'].split('_', 1)[0]}"
+        else:
+            continue
+        stale.append({"summary": summary_path.name, "chapter": old["title"], "reason": reason})
+    return stale
+
+
+def outline_manifest(nodes):
+    """大纲节点转为清单格式，页码为 1 起始"""
+    return [
+        {
+            "id": node["id"],
+            "title": node["title"],
+            "level": node["level"],
+            "parent": node["parent"],
+            "children": node["children"],
+            "start_page": node["start_page"] + 1,
+            "end_page": node["end_page"] + 1,
+        }
+        for node in nodes
+    ]
+
+
+def write_manifest(output_dir, pdf_path, total_pages, chapters, virtual, depth=1, outline=None,
+                   stale_summaries=None):
+    """写出章节清单，页码为 1 起始"""
+    manifest = {
+        "source": str(pdf_path),
+        "total_pages": total_pages,
+        "virtual": virtual,
+        "depth": depth,
+        "chapters": chapters,
+        "outline": outline or [],
+    }
+    if stale_summaries is not None:
+        manifest["stale_summaries"] = stale_summaries
+    manifest_path = output_dir / MANIFEST_FILENAME
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest_path
+
+
+def split_pdf_by_chapters(pdf_path, output_dir=None, virtual=False, dedup=False, jobs=1, depth=1,
+                          incremental=False):
     """
     按章节切割 PDF 文件
 
     Args:
         pdf_path: PDF 文件路径
         output_dir: 输出目录，默认为 PDF 文件同目录下的 'chapters' 文件夹
+        virtual: 只写 manifest.json（页码范围），不生成章节 PDF
+        dedup: 写出前合并章节内重复的对象
+        jobs: 并行写章节的进程数，1 为在当前进程中顺序写出
+        depth: 切割深度，1 为只按顶级章节切割
+        incremental: 与输出目录中上次的 manifest.json 比较，只重写内容变化的章节
+
+    Returns:
+        章节清单列表，失败时返回 None
     """
     pdf_path = Path(pdf_path)
 
@@ -100,57 +402,118 @@ def split_pdf_by_chapters(pdf_path, output_dir=None):
 
     # 读取 PDF
     reader = PdfReader(pdf_path)
-    print(f"总页数: {len(reader.pages)}")
+    total_pages = len(reader.pages)
+    print(f"总页数: {total_pages}")
 
     # 获取章节范围
-    chapter_ranges = get_chapter_ranges(reader)
-
-    if not chapter_ranges:
+    nodes = get_outline_nodes(reader)
+    if not nodes:
+        print("警告: PDF 没有书签信息，无法自动按章节切割")
         print("无法提取章节信息，尝试其他方法...")
         print("\n提示: 可以手动指定章节页码范围")
         return
 
-    print(f"\n找到 {len(chapter_ranges)} 个章节:\n")
+    compute_outline_ranges(nodes, total_pages)
+    units = select_split_units(nodes, depth)
+    print(f"\n大纲共 {len(nodes)} 个节点，按深度 {depth} 切割为 {len(units)} 个章节:\n")
+
+    # 文件名只由章节序号和标题决定，与写出顺序、进程数无关
+    width = max(2, len(str(len(units))))
+    chapters = [
+        {
+            "index": idx,
+            "title": node["title"],
+            "node_id": node["id"],
+            "level": node["level"],
+            "start_page": start_page + 1,
+            "end_page": end_page + 1,
+            "file": None if virtual else chapter_filename(idx, node["title"], width),
+        }
+        for idx, (node, start_page, end_page) in enumerate(units, 1)
+    ]
+
+    stale_summaries = None
+    if incremental:
+        print("正在计算页面指纹...")
+        page_fingerprints = [page_fingerprint(text) for text in extract_page_texts(pdf_path, reader)]
+        for entry in chapters:
+            entry["page_fingerprints"] = page_fingerprints[entry["start_page"] - 1:entry["end_page"]]
+            entry["fingerprint"] = chapter_fingerprint(entry["page_fingerprints"])
+        matches = reuse_unchanged_chapters(chapters, load_manifest(output_dir), output_dir)
+        stale_summaries = find_stale_summaries(output_dir, matches)
+
+    to_write = [entry for entry in chapters if entry.get("status") not in ("unchanged", "renamed")]
 
     # 切割每个章节
-    for idx, (title, start_page, end_page) in enumerate(chapter_ranges, 1):
-        print(f"[{idx}/{len(chapter_ranges)}] {title}")
-        print(f"    页码范围: {start_page + 1} - {end_page + 1}")
-
-        # 创建新的 PDF
-        writer = PdfWriter()
-
-        # 添加页面
-        for page_num in range(start_page, end_page + 1):
-            writer.add_page(reader.pages[page_num])
-
-        # 生成文件名
-        safe_title = sanitize_filename(title)
-        output_filename = f"{idx:02d}_{safe_title}.pdf"
-        output_path = output_dir / output_filename
-
-        # 保存文件
-        with open(output_path, 'wb') as output_file:
-            writer.write(output_file)
-
-        print(f"    已保存: {output_filename}")
-
-    print(f"\n完成! 所有章节已保存到: {output_dir}")
+    if not virtual and jobs > 1 and to_write:
+        print(f"使用 {jobs} 个进程并行写出章节...")
+        jobs_list = [(entry["start_page"] - 1, entry["end_page"] - 1, str(output_dir / entry["file"]))
+                     for entry in to_write]
+        for entry, (size, seconds) in zip(to_write, write_chapters_parallel(pdf_path, jobs_list, jobs, dedup)):
+            entry["bytes"] = size
+            entry["seconds"] = round(seconds, 3)
+
+    for entry in chapters:
+        print(f"[{entry['index']}/{len(chapters)}] {entry['title']}")
+        print(f"    页码范围: {entry['start_page']} - {entry['end_page']}")
+        if entry.get("status") == "changed":
+            print(f"    内容变化: 新增或修改 {entry['changed_pages']} 页，删除 {entry['removed_pages']} 页")
+        if virtual:
+            continue
+        if entry.get("status") == "unchanged":
+            print(f"    未变化，沿用: {entry['file']}")
+            continue
+        if entry.get("status") == "renamed":
+            print(f"    未变化，编号变化后改名为: {entry['file']}")
+            continue
+        if jobs <= 1:
+            started = time.perf_counter()
+            entry["bytes"] = write_chapter(reader, entry["start_page"] - 1, entry["end_page"] - 1,
+                                           output_dir / entry["file"], dedup)
+            entry["seconds"] = round(time.perf_counter() - started, 3)
+        print(f"    已保存: {entry['file']} ({entry['seconds']:.2f}s)")
+
+    manifest_path = write_manifest(output_dir, pdf_path, total_pages, chapters, virtual,
+                                   depth=depth, outline=outline_manifest(nodes), stale_summaries=stale_summaries)
+    if incremental:
+        rewritten = sum(entry["status"] in ("changed", "new") for entry in chapters)
+        print(f"\n增量切割: {rewritten} 个章节有变化，{len(chapters) - rewritten} 个章节沿用")
+        for stale in stale_summaries:
+            print(f"    需更新摘要: {stale['summary']}（{stale['reason']}）")
+    if virtual:
+        print(f"\n完成! 虚拟章节清单已保存到: {manifest_path}")
+    else:
+        print(f"\n完成! 所有章节已保存到: {output_dir}")
+    return chapters
 
 
 def main():
     """主函数"""
-    if len(sys.argv) < 2:
-        print("用法: python split_pdf_by_chapters.py <PDF文件路径> [输出目录]")
-        print("\n示例:")
-        print("  python split_pdf_by_chapters.py docs/document.pdf")
-        print("  python split_pdf_by_chapters.py docs/document.pdf output/")
-        sys.exit(1)
-
-    pdf_path = sys.argv[1]
-    output_dir = sys.argv[2] if len(sys.argv) > 2 else None
-
-    split_pdf_by_chapters(pdf_path, output_dir)
+    parser = argparse.ArgumentParser(
+        description="根据 PDF 书签将文档切割成多个章节文件",
+        epilog="示例:\n"
+               "  python split_pdf_by_chapters.py docs/document.pdf\n"
+               "  python split_pdf_by_chapters.py docs/document.pdf output/\n"
+               "  python split_pdf_by_chapters.py docs/document.pdf --virtual",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("pdf_path", help="PDF 文件路径")
+    parser.add_argument("output_dir", nargs="?", default=None,
+                        help="输出目录（默认: PDF 同目录下的 chapters/<文件名>）")
+    parser.add_argument("--virtual", action="store_true",
+                        help="只生成页码范围清单 manifest.json，不写章节 PDF")
+    parser.add_argument("--dedup", action="store_true",
+                        help="写出前合并章节内的重复对象（更慢、占用内存更多，只对对象重复的 PDF 有用）")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="并行写章节的进程数（默认: 1；每个进程都要重新解析源 PDF，小文档上反而更慢）")
+    parser.add_argument("--depth", "-d", type=int, default=1,
+                        help="切割深度，2 表示把有子书签的顶级章节再按子书签切割（默认: 1）")
+    parser.add_argument("--incremental", action="store_true",
+                        help="与输出目录中上次的 manifest.json 比较，只重写内容变化的章节")
+    args = parser.parse_args()
+
+    split_pdf_by_chapters(args.pdf_path, args.output_dir, virtual=args.virtual, dedup=args.dedup,
+                          jobs=args.jobs, depth=args.depth, incremental=args.incremental)
 
 
 if __name__ == "__main__":